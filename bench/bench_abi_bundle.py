@@ -0,0 +1,46 @@
+"""Time to create the 'ffi' of an ABI-mode module with many declarations:
+executing the .py file written by emit_python_code(), compared with
+loading the file written by emit_abi_bundle(), read or mmap'ed.
+"""
+from benchlib import bench, report
+import os, mmap, tempfile
+import cffi, _cffi_backend
+
+N = 2000
+
+def main():
+    ffibuilder = cffi.FFI()
+    ffibuilder.cdef(''.join([
+        "struct s%d { int a, b; double c; };\n"
+        "typedef struct s%d t%d;\n"
+        "int f%d(t%d *, int);\n"
+        "enum e%d { E%d_A, E%d_B };\n" % ((i,) * 8) for i in range(N)]))
+    ffibuilder.set_source('_bench_abi_bundle', None)
+    tmpdir = tempfile.mkdtemp(prefix='cffi-bench-')
+    py_file = os.path.join(tmpdir, '_bench_abi_bundle.py')
+    bundle_file = os.path.join(tmpdir, '_bench_abi_bundle.cffiabi')
+    ffibuilder.emit_python_code(py_file)
+    ffibuilder.emit_abi_bundle(bundle_file)
+    with open(py_file) as f:
+        code = compile(f.read(), py_file, 'exec')
+
+    def load_py():
+        exec(code, {})
+
+    def load_bundle():
+        with open(bundle_file, 'rb') as f:
+            data = f.read()
+        _cffi_backend.FFI('_bench_abi_bundle', _bundle=data)
+
+    def load_mmap():
+        with open(bundle_file, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _cffi_backend.FFI('_bench_abi_bundle', _bundle=data)
+
+    print('%d structs, typedefs, functions and enums' % (N,))
+    report('.py module (already compiled)', bench(load_py, number=20))
+    report('ABI bundle, read()', bench(load_bundle, number=20))
+    report('ABI bundle, mmap()', bench(load_mmap, number=20))
+
+if __name__ == '__main__':
+    main()
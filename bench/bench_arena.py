@@ -0,0 +1,28 @@
+"""Allocating 100 small structs with ffi.new(), compared with allocating
+them from an ffi.arena() that is closed afterwards.
+"""
+from benchlib import bench, report
+import cffi
+
+N = 100
+
+def main():
+    ffi = cffi.FFI()
+    ffi.cdef("struct point { double x, y; int tag; };")
+    BPointPtr = ffi.typeof("struct point *")
+    new = ffi.new
+    arena = ffi.arena
+
+    def with_new():
+        items = [new(BPointPtr) for i in range(N)]
+
+    def with_arena():
+        with arena() as a:
+            anew = a.new
+            items = [anew(BPointPtr) for i in range(N)]
+
+    report('%d x ffi.new()' % N, bench(with_new, number=10000))
+    report('%d x arena.new() + close()' % N, bench(with_arena, number=10000))
+
+if __name__ == '__main__':
+    main()
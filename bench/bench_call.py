@@ -0,0 +1,38 @@
+"""Per-call overhead of calling C functions with 0 to 4 scalar arguments
+in ABI mode (ffi.dlopen()).  Most of the time measured is the overhead of
+cdata_call() itself: argument conversion, the exchange buffer, and
+releasing the GIL around ffi_call().
+"""
+from benchlib import build_library, bench, report
+import cffi
+
+SOURCE = """
+int f0(void) { return 42; }
+int f1(int a) { return a; }
+int f2(int a, int b) { return a + b; }
+int f3(int a, int b, int c) { return a + b + c; }
+int f4(int a, int b, int c, int d) { return a + b + c + d; }
+double d4(double a, double b, double c, double d) { return a + b + c + d; }
+"""
+
+def main():
+    ffi = cffi.FFI()
+    ffi.cdef("""
+        int f0(void);
+        int f1(int);
+        int f2(int, int);
+        int f3(int, int, int);
+        int f4(int, int, int, int);
+        double d4(double, double, double, double);
+    """)
+    lib = ffi.dlopen(build_library('bench_call', SOURCE))
+    f0, f1, f2, f3, f4, d4 = lib.f0, lib.f1, lib.f2, lib.f3, lib.f4, lib.d4
+    report('int f0(void)', bench(lambda: f0()))
+    report('int f1(int)', bench(lambda: f1(1)))
+    report('int f2(int, int)', bench(lambda: f2(1, 2)))
+    report('int f3(int, int, int)', bench(lambda: f3(1, 2, 3)))
+    report('int f4(int, int, int, int)', bench(lambda: f4(1, 2, 3, 4)))
+    report('double d4(double x 4)', bench(lambda: d4(1.0, 2.0, 3.0, 4.0)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""ffi.call_many() compared with a Python loop calling the same C
+function, here a small hash function applied to 10**6 integers.
+"""
+from benchlib import build_library, bench, report
+import cffi
+
+SOURCE = """
+unsigned int hash32(unsigned int x)
+{
+    x = ((x >> 16) ^ x) * 0x45d9f3b;
+    x = ((x >> 16) ^ x) * 0x45d9f3b;
+    return (x >> 16) ^ x;
+}
+"""
+
+N = 10**6
+
+def main():
+    ffi = cffi.FFI()
+    ffi.cdef("unsigned int hash32(unsigned int);")
+    lib = ffi.dlopen(build_library('bench_call_many', SOURCE))
+    hash32 = lib.hash32
+    data = ffi.new("unsigned int[]", list(range(N)))
+    result = ffi.new("unsigned int[]", N)
+
+    def python_loop():
+        for i in range(N):
+            result[i] = hash32(data[i])
+
+    def batch():
+        ffi.call_many(hash32, [data], result)
+
+    report('Python loop, per item', bench(python_loop, number=1, repeat=3) / N)
+    report('ffi.call_many(), per item', bench(batch, number=1, repeat=3) / N)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+"""Creating and dropping a callback with ffi.callback(), compared with
+acquiring and releasing one from ffi.callback_pool().
+"""
+from benchlib import bench, report
+import cffi
+
+def main():
+    ffi = cffi.FFI()
+    cdecl = "int(*)(int, int)"
+    BFunc = ffi.typeof(cdecl)
+    pool = ffi.callback_pool(BFunc, 16)
+    acquire, release = pool.acquire, pool.release
+    def func(a, b):
+        return a + b
+
+    def new_callback():
+        ffi.callback(BFunc, func)
+
+    def pooled_callback():
+        release(acquire(func))
+
+    report('ffi.callback()', bench(new_callback, number=100000))
+    report('pool.acquire() + pool.release()',
+           bench(pooled_callback, number=100000))
+
+if __name__ == '__main__':
+    main()
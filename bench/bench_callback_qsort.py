@@ -0,0 +1,75 @@
+"""qsort() of 10**5 ints with a Python comparator: the cost of one C to
+Python callback invocation.  In ABI mode, qsort() is called with the GIL
+released, so every callback must reacquire it.  In API mode, with
+cdef(..., release_gil=False), qsort() runs with the GIL held and the
+callbacks find it already acquired.  The callback is either an
+ffi.callback() or an extern "Python" function.
+"""
+from benchlib import bench, build_module, report
+import random
+import cffi
+
+N = 10**5
+
+CDEF = """
+    void qsort(void *base, size_t nmemb, size_t size,
+               int (*compar)(const void *, const void *));
+"""
+
+def main():
+    ffi = cffi.FFI()
+    ffi.cdef(CDEF)
+    libc = ffi.dlopen(None)
+
+    ffi_api = cffi.FFI()
+    ffi_api.cdef(CDEF, release_gil=False)
+    ffi_api.cdef('extern "Python" int py_compare(const void *, const void *);')
+    lib_api = build_module(ffi_api, '_bench_callback_qsort', """
+        #include <stdlib.h>
+        static int py_compare(const void *, const void *);
+    """)
+    ffi_api = __import__('_bench_callback_qsort').ffi
+
+    values = list(range(N))
+    random.seed(42)
+    random.shuffle(values)
+
+    def make_compare(ffi):
+        def compare(a, b):
+            x = ffi.cast("int *", a)[0]
+            y = ffi.cast("int *", b)[0]
+            return (x > y) - (x < y)
+        return compare
+
+    ncalls = [0]
+    def count_calls(a, b):
+        ncalls[0] += 1
+        return compare(a, b)
+    compare = make_compare(ffi)
+    data = ffi.new("int[]", values)
+    libc.qsort(data, N, ffi.sizeof("int"),
+               ffi.callback("int(*)(const void *, const void *)",
+                            count_calls))
+    assert list(data) == sorted(values)
+
+    def run(ffi, qsort, callback):
+        def f():
+            data = ffi.new("int[]", values)
+            qsort(data, N, ffi.sizeof("int"), callback)
+        return bench(f, number=1, repeat=5) / ncalls[0]
+
+    cb = ffi.callback("int(*)(const void *, const void *)",
+                      make_compare(ffi))
+    report('ABI mode, ffi.callback(), per call', run(ffi, libc.qsort, cb))
+
+    cb_api = ffi_api.callback("int(*)(const void *, const void *)",
+                              make_compare(ffi_api))
+    report('API mode, GIL held, ffi.callback(), per call',
+           run(ffi_api, lib_api.qsort, cb_api))
+
+    ffi_api.def_extern("py_compare")(make_compare(ffi_api))
+    report('API mode, GIL held, extern "Python", per call',
+           run(ffi_api, lib_api.qsort, lib_api.py_compare))
+
+if __name__ == '__main__':
+    main()
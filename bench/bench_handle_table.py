@@ -0,0 +1,32 @@
+"""Creating a handle, passing it through C as a 'void *', looking it up
+and releasing it: ffi.new_handle()/ffi.from_handle() compared with
+ffi.handle_table().
+"""
+from benchlib import bench, report
+import cffi
+
+def main():
+    ffi = cffi.FFI()
+    BVoidP = ffi.typeof("void *")
+    obj = object()
+    live = set()
+    new_handle, from_handle, cast = ffi.new_handle, ffi.from_handle, ffi.cast
+    table = ffi.handle_table()
+    tnew, trelease = table.new, table.release
+
+    def with_new_handle():
+        h = new_handle(obj)
+        live.add(h)                 # keep it alive until released
+        p = cast(BVoidP, h)         # what C gives back to the callback
+        x = from_handle(p)
+        live.discard(p)
+
+    def with_handle_table():
+        p = cast(BVoidP, tnew(obj))
+        x = trelease(p)
+
+    report('new_handle() + from_handle()', bench(with_new_handle))
+    report('table.new() + table.release()', bench(with_handle_table))
+
+if __name__ == '__main__':
+    main()
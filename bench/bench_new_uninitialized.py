@@ -0,0 +1,30 @@
+"""Allocating a big buffer and filling its first 64KB, like a read()
+that returns less than requested, with ffi.new() and with
+ffi.new_uninitialized().
+"""
+from benchlib import bench, report
+import cffi
+
+DATA = b"x" * 65536
+
+def main():
+    ffi = cffi.FFI()
+    BCharArray = ffi.typeof("char[]")
+
+    for size_mb in [4, 64]:
+        size = size_mb * 1024 * 1024
+
+        def with_new():
+            p = ffi.new(BCharArray, size)
+            ffi.memmove(p, DATA, len(DATA))
+
+        def with_new_uninitialized():
+            p = ffi.new_uninitialized(BCharArray, size)
+            ffi.memmove(p, DATA, len(DATA))
+
+        report('%dMB: ffi.new()' % size_mb, bench(with_new, number=200))
+        report('%dMB: ffi.new_uninitialized()' % size_mb,
+               bench(with_new_uninitialized, number=200))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""Calling trivial C functions in API mode, with the default wrappers
+(which release the GIL and save/restore errno around the call) and with
+wrappers generated from 'cdef(..., release_gil=False)'.
+"""
+from benchlib import build_module, bench, report
+import cffi
+
+CDEF = """
+    int get_value(void);
+    int add_int(int, int);
+"""
+
+SOURCE = """
+static int value = 42;
+int get_value(void) { return value; }
+int add_int(int a, int b) { return a + b; }
+"""
+
+def main():
+    libs = []
+    for release_gil in [True, False]:
+        ffi = cffi.FFI()
+        ffi.cdef(CDEF, release_gil=release_gil)
+        name = '_bench_release_gil_%s' % ('yes' if release_gil else 'no',)
+        libs.append(('release_gil=%s' % (release_gil,),
+                     build_module(ffi, name, SOURCE)))
+    for label, lib in libs:
+        get_value = lib.get_value
+        add_int = lib.add_int
+        report('get_value(), %s' % (label,), bench(lambda: get_value()))
+        report('add_int(2, 3), %s' % (label,), bench(lambda: add_int(2, 3)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,20 @@
+"""ffi.unpack() of a large 'double[]', returning a list or, with
+'as_array=True', an array.array.
+"""
+from benchlib import bench, report
+import cffi
+
+N = 10**7
+
+def main():
+    ffi = cffi.FFI()
+    data = ffi.new("double[]", N)
+
+    report('ffi.unpack(), list, per item',
+           bench(lambda: ffi.unpack(data, N), number=1, repeat=3) / N)
+    report('ffi.unpack(as_array=True), per item',
+           bench(lambda: ffi.unpack(data, N, as_array=True),
+                 number=1, repeat=3) / N)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Helpers shared by the benchmark scripts in this directory.
+
+The benchmarks are plain scripts, run e.g. with:
+
+    python bench/bench_call.py
+
+They import 'cffi' and '_cffi_backend' from the current sys.path, so run
+them once against each build that you want to compare.
+"""
+import os, sys, tempfile, timeit
+from distutils.ccompiler import new_compiler
+from distutils.sysconfig import customize_compiler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..'))
+
+_tmpdir = None
+
+def build_library(name, source):
+    """Compile 'source' into a shared library and return its path,
+    suitable for ffi.dlopen()."""
+    global _tmpdir
+    if _tmpdir is None:
+        _tmpdir = tempfile.mkdtemp(prefix='cffi-bench-')
+    c_file = os.path.join(_tmpdir, name + '.c')
+    with open(c_file, 'w') as f:
+        f.write(source)
+    compiler = new_compiler()
+    customize_compiler(compiler)
+    objects = compiler.compile([c_file], output_dir=_tmpdir,
+                               extra_preargs=['-O2', '-fPIC'])
+    lib_file = compiler.library_filename(name, lib_type='shared',
+                                         output_dir=_tmpdir)
+    compiler.link_shared_object(objects, lib_file)
+    return lib_file
+
+def build_module(ffi, name, source):
+    """Compile 'ffi' in API mode (ffi.set_source()) and return the 'lib'
+    object of the resulting extension module."""
+    global _tmpdir
+    if _tmpdir is None:
+        _tmpdir = tempfile.mkdtemp(prefix='cffi-bench-')
+    ffi.set_source(name, source, extra_compile_args=['-O2'])
+    ffi.compile(tmpdir=_tmpdir)
+    if _tmpdir not in sys.path:
+        sys.path.insert(0, _tmpdir)
+    return __import__(name).lib
+
+def bench(func, number=1000000, repeat=5):
+    """Return the best time per call of 'func()', in nanoseconds."""
+    timer = timeit.Timer(func)
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+def report(label, ns):
+    print('%-40s %10.1f ns' % (label, ns))
@@ -14,6 +14,7 @@
 #include <errno.h>
 #include <ffi.h>
 #include <sys/mman.h>
+#include <time.h>
 #endif
 
 /* this block of #ifs should be kept exactly identical between
@@ -179,6 +180,7 @@
 #define CT_LAZY_FIELD_LIST     0x01000000
 #define CT_WITH_PACKED_CHANGE  0x02000000
 #define CT_IS_SIGNED_WCHAR     0x04000000
+#define CT_IS_VARIADIC         0x08000000
 #define CT_PRIMITIVE_ANY  (CT_PRIMITIVE_SIGNED |        \
                            CT_PRIMITIVE_UNSIGNED |      \
                            CT_PRIMITIVE_CHAR |          \
@@ -196,6 +198,7 @@ typedef struct _ctypedescr {
                                           ptrs: lazily, ctypedescr of array */
     void *ct_extra;                    /* structs: first field (not a ref!)
                                           function types: cif_description
+                                          variadic functions: varargs_cache
                                           primitives: prebuilt "cif" object */
 
     PyObject *ct_weakreflist;    /* weakref support */
@@ -238,15 +241,18 @@ static PyTypeObject CField_Type;
 static PyTypeObject CData_Type;
 static PyTypeObject CDataOwning_Type;
 static PyTypeObject CDataOwningGC_Type;
+static PyTypeObject CDataOwningMmap_Type;
 static PyTypeObject CDataGCP_Type;
 
 #define CTypeDescr_Check(ob)  (Py_TYPE(ob) == &CTypeDescr_Type)
 #define CData_Check(ob)       (Py_TYPE(ob) == &CData_Type ||            \
                                Py_TYPE(ob) == &CDataOwning_Type ||      \
                                Py_TYPE(ob) == &CDataOwningGC_Type ||    \
+                               Py_TYPE(ob) == &CDataOwningMmap_Type ||  \
                                Py_TYPE(ob) == &CDataGCP_Type)
 #define CDataOwn_Check(ob)    (Py_TYPE(ob) == &CDataOwning_Type ||      \
-                               Py_TYPE(ob) == &CDataOwningGC_Type)
+                               Py_TYPE(ob) == &CDataOwningGC_Type ||    \
+                               Py_TYPE(ob) == &CDataOwningMmap_Type)
 
 typedef union {
     unsigned char m_char;
@@ -291,6 +297,7 @@ typedef struct {
     Py_ssize_t length;     /* same as CDataObject_own_length up to here */
     PyObject *origobj;
     PyObject *destructor;
+    Py_ssize_t external_size;   /* 'size' given to ffi.gc(), or 0 */
 } CDataObject_gcp;
 
 typedef struct {
@@ -301,7 +308,8 @@ typedef struct {
 typedef struct {
     ffi_cif cif;
     /* the following information is used when doing the call:
-       - a buffer of size 'exchange_size' is malloced
+       - a buffer of size 'exchange_size' is allocated (on the stack if
+         it is small enough)
        - the arguments are converted from Python objects to raw data
        - the i'th raw data is stored at 'buffer + exchange_offset_arg[1+i]'
        - the call is done
@@ -310,6 +318,28 @@ typedef struct {
     Py_ssize_t exchange_offset_arg[1];
 } cif_description_t;
 
+/* Variadic function types have no cif_description of their own: the
+   cif depends on the types of the arguments actually passed in the '...'
+   part.  Instead, their 'ct_extra' points to a small cache of the
+   non-variadic function types built for the most recent calls (each of
+   which owns a prepared cif_description), most recently used first. */
+#define VARARGS_CACHE_SIZE    8
+
+typedef struct {
+    Py_ssize_t vc_hits, vc_misses;
+    CTypeDescrObject *vc_fixed[VARARGS_CACHE_SIZE];
+} varargs_cache_t;
+
+static void varargs_cache_clear(CTypeDescrObject *ct)
+{
+    varargs_cache_t *cache = (varargs_cache_t *)ct->ct_extra;
+    int i;
+    if (cache == NULL)
+        return;
+    for (i = 0; i < VARARGS_CACHE_SIZE; i++)
+        Py_CLEAR(cache->vc_fixed[i]);
+}
+
 #define ADD_WRAPAROUND(x, y)  ((Py_ssize_t)(((size_t)(x)) + ((size_t)(y))))
 #define MUL_WRAPAROUND(x, y)  ((Py_ssize_t)(((size_t)(x)) * ((size_t)(y))))
 
@@ -334,11 +364,14 @@ typedef struct {
 
 #include "../cffi/_cffi_errors.h"
 
+struct _cffi_arena_s;    /* ArenaObject, see below */
 typedef struct _cffi_allocator_s {
     PyObject *ca_alloc, *ca_free;
     int ca_dont_clear;
+    struct _cffi_arena_s *ca_arena;     /* if non-NULL, allocate from it */
 } cffi_allocator_t;
-static const cffi_allocator_t default_allocator = { NULL, NULL, 0 };
+static const cffi_allocator_t default_allocator = { NULL, NULL, 0, NULL };
+static const cffi_allocator_t nonzero_allocator = { NULL, NULL, 1, NULL };
 static PyObject *FFIError;
 static PyObject *unique_cache;
 
@@ -410,6 +443,8 @@ ctypedescr_dealloc(CTypeDescrObject *ct)
     }
     Py_XDECREF(ct->ct_itemdescr);
     Py_XDECREF(ct->ct_stuff);
+    if (ct->ct_flags & CT_IS_VARIADIC)
+        varargs_cache_clear(ct);
     if (ct->ct_flags & CT_FUNCTIONPTR)
         PyObject_Free(ct->ct_extra);
     Py_TYPE(ct)->tp_free((PyObject *)ct);
@@ -420,6 +455,12 @@ ctypedescr_traverse(CTypeDescrObject *ct, visitproc visit, void *arg)
 {
     Py_VISIT(ct->ct_itemdescr);
     Py_VISIT(ct->ct_stuff);
+    if ((ct->ct_flags & CT_IS_VARIADIC) && ct->ct_extra != NULL) {
+        varargs_cache_t *cache = (varargs_cache_t *)ct->ct_extra;
+        int i;
+        for (i = 0; i < VARARGS_CACHE_SIZE; i++)
+            Py_VISIT(cache->vc_fixed[i]);
+    }
     return 0;
 }
 
@@ -428,6 +469,8 @@ ctypedescr_clear(CTypeDescrObject *ct)
 {
     Py_CLEAR(ct->ct_itemdescr);
     Py_CLEAR(ct->ct_stuff);
+    if (ct->ct_flags & CT_IS_VARIADIC)
+        varargs_cache_clear(ct);
     return 0;
 }
 
@@ -564,7 +607,8 @@ static PyObject *ctypeget_result(CTypeDescrObject *ct, void *context)
 static PyObject *ctypeget_ellipsis(CTypeDescrObject *ct, void *context)
 {
     if (ct->ct_flags & CT_FUNCTIONPTR) {
-        PyObject *res = ct->ct_extra ? Py_False : Py_True;
+        PyObject *res = (ct->ct_extra && !(ct->ct_flags & CT_IS_VARIADIC)) ?
+                            Py_False : Py_True;
         Py_INCREF(res);
         return res;
     }
@@ -1930,6 +1974,71 @@ static void gcp_finalize(PyObject *destructor, PyObject *origobj)
     Py_XDECREF(origobj);
 }
 
+/* ffi.gc(cdata, destructor, size) says that the returned object keeps
+   alive 'size' bytes of external memory, until the destructor is
+   called.  We keep track of the total, and when it grew too much since
+   the last time, we force a full collection, like the GC would do by
+   itself if the memory had been allocated by Python objects.  The next
+   collection occurs when the total grew again by as much as what is
+   left after the collection, or by GC_PRESSURE_MIN_THRESHOLD.  When
+   the total goes down, the threshold is lowered in the same way, so
+   that a past peak does not delay the collections forever. */
+
+#define GC_PRESSURE_MIN_THRESHOLD   (64 * 1024 * 1024)
+
+static Py_ssize_t gc_pressure_total = 0;
+static Py_ssize_t gc_pressure_threshold = GC_PRESSURE_MIN_THRESHOLD;
+static Py_ssize_t gc_pressure_collections = 0;
+
+static Py_ssize_t gc_pressure_next_threshold(void)
+{
+    Py_ssize_t left = gc_pressure_total, grow = GC_PRESSURE_MIN_THRESHOLD;
+
+    if (left > grow)
+        grow = left;
+    if (grow > PY_SSIZE_T_MAX - left)
+        grow = PY_SSIZE_T_MAX - left;
+    return left + grow;
+}
+
+static void gc_pressure_remove(CDataObject_gcp *cd)
+{
+    Py_ssize_t threshold;
+
+    if (cd->external_size == 0)
+        return;
+    gc_pressure_total -= cd->external_size;
+    cd->external_size = 0;
+
+    threshold = gc_pressure_next_threshold();
+    if (gc_pressure_threshold > threshold)
+        gc_pressure_threshold = threshold;
+}
+
+static void gc_pressure_add(CDataObject_gcp *cd, Py_ssize_t size)
+{
+    if (size <= 0)
+        return;
+    if (size > PY_SSIZE_T_MAX - gc_pressure_total)
+        size = PY_SSIZE_T_MAX - gc_pressure_total;
+    cd->external_size = size;
+    gc_pressure_total += size;
+
+    if (gc_pressure_total > gc_pressure_threshold) {
+        gc_pressure_collections++;
+        PyGC_Collect();
+        gc_pressure_threshold = gc_pressure_next_threshold();
+    }
+}
+
+static PyObject *b_get_gc_pressure_stats(PyObject *self, PyObject *noarg)
+{
+    return Py_BuildValue("{s:n,s:n,s:n}",
+                         "external_bytes", gc_pressure_total,
+                         "threshold", gc_pressure_threshold,
+                         "collections", gc_pressure_collections);
+}
+
 #ifdef Py_TPFLAGS_HAVE_FINALIZE     /* CPython >= 3.4 */
 static void cdatagcp_finalize(CDataObject_gcp *cd)
 {
@@ -1937,6 +2046,7 @@ static void cdatagcp_finalize(CDataObject_gcp *cd)
     PyObject *origobj = cd->origobj;
     cd->destructor = NULL;
     cd->origobj = NULL;
+    gc_pressure_remove(cd);
     gcp_finalize(destructor, origobj);
 }
 #endif
@@ -1945,6 +2055,7 @@ static void cdatagcp_dealloc(CDataObject_gcp *cd)
 {
     PyObject *destructor = cd->destructor;
     PyObject *origobj = cd->origobj;
+    gc_pressure_remove(cd);
     cdata_dealloc((CDataObject *)cd);
 
     gcp_finalize(destructor, origobj);
@@ -2096,8 +2207,9 @@ static PyObject *cdataowninggc_repr(CDataObject *cd)
         PyObject *args = (PyObject *)closure->user_data;
         if (args == NULL)
             return cdata_repr(cd);
-        else
-            return _cdata_repr2(cd, "calling", PyTuple_GET_ITEM(args, 1));
+        if (PyList_Check(args))     /* from a callback pool */
+            args = PyList_GET_ITEM(args, 0);
+        return _cdata_repr2(cd, "calling", PyTuple_GET_ITEM(args, 1));
     }
     else if (cd->c_type->ct_flags & CT_IS_UNSIZED_CHAR_A) {  /* from_buffer */
         Py_buffer *view = ((CDataObject_owngc_frombuf *)cd)->bufferview;
@@ -2887,15 +2999,113 @@ _prepare_pointer_call_argument(CTypeDescrObject *ctptr, PyObject *init,
     return convert_from_object((char *)output_data, ctptr, init);
 }
 
+static PyObject *new_function_type(PyObject *fargs, CTypeDescrObject *fresult,
+                                   int ellipsis, int fabi);       /*forward*/
+
+static CTypeDescrObject *_get_varargs_ctype(PyObject *obj, Py_ssize_t i)
+{
+    /* returns a borrowed reference to the ctype with which 'obj', the
+       i'th argument, is passed in the '...' part of a call */
+    CTypeDescrObject *ct;
+
+    if (!CData_Check(obj)) {
+        PyErr_Format(PyExc_TypeError,
+                     "argument %zd passed in the variadic part "
+                     "needs to be a cdata object (got %.200s)",
+                     i + 1, Py_TYPE(obj)->tp_name);
+        return NULL;
+    }
+    ct = ((CDataObject *)obj)->c_type;
+    if (ct->ct_flags & (CT_PRIMITIVE_CHAR | CT_PRIMITIVE_UNSIGNED |
+                        CT_PRIMITIVE_SIGNED)) {
+        if (ct->ct_size < (Py_ssize_t)sizeof(int))
+            ct = _get_ct_int();   /* may be NULL */
+    }
+    else if (ct->ct_flags & CT_ARRAY) {
+        ct = (CTypeDescrObject *)ct->ct_stuff;
+    }
+    return ct;
+}
+
+static CTypeDescrObject *
+varargs_cache_lookup(CTypeDescrObject *ct, Py_ssize_t nargs,
+                     CTypeDescrObject **vargtypes)
+{
+    /* returns a new reference to the cached non-variadic function type
+       whose arguments are the declared ones followed by 'vargtypes', or
+       NULL if not found (without setting an exception) */
+    varargs_cache_t *cache = (varargs_cache_t *)ct->ct_extra;
+    Py_ssize_t nargs_declared = PyTuple_GET_SIZE(ct->ct_stuff) - 2;
+    Py_ssize_t j;
+    int i;
+
+    if (cache == NULL)
+        return NULL;
+    for (i = 0; i < VARARGS_CACHE_SIZE; i++) {
+        CTypeDescrObject *fixed = cache->vc_fixed[i];
+        if (fixed == NULL)
+            break;
+        if (PyTuple_GET_SIZE(fixed->ct_stuff) != 2 + nargs)
+            continue;
+        for (j = nargs_declared; j < nargs; j++) {
+            if (PyTuple_GET_ITEM(fixed->ct_stuff, 2 + j) !=
+                    (PyObject *)vargtypes[j - nargs_declared])
+                break;
+        }
+        if (j == nargs) {
+            /* found: move it to the front */
+            for (; i > 0; i--)
+                cache->vc_fixed[i] = cache->vc_fixed[i - 1];
+            cache->vc_fixed[0] = fixed;
+            cache->vc_hits++;
+            Py_INCREF(fixed);
+            return fixed;
+        }
+    }
+    cache->vc_misses++;
+    return NULL;
+}
+
+static int varargs_cache_store(CTypeDescrObject *ct, CTypeDescrObject *fixed)
+{
+    varargs_cache_t *cache = (varargs_cache_t *)ct->ct_extra;
+    int i;
+
+    if (cache == NULL) {
+        cache = PyObject_Malloc(sizeof(varargs_cache_t));
+        if (cache == NULL) {
+            PyErr_NoMemory();
+            return -1;
+        }
+        memset(cache, 0, sizeof(varargs_cache_t));
+        cache->vc_misses = 1;    /* the miss that leads us here */
+        ct->ct_extra = cache;
+    }
+    /* evict the least recently used entry, and insert 'fixed' first */
+    Py_XDECREF(cache->vc_fixed[VARARGS_CACHE_SIZE - 1]);
+    for (i = VARARGS_CACHE_SIZE - 1; i > 0; i--)
+        cache->vc_fixed[i] = cache->vc_fixed[i - 1];
+    Py_INCREF(fixed);
+    cache->vc_fixed[0] = fixed;
+    return 0;
+}
+
+/* exchange buffers up to this size are allocated on the C stack of
+   cdata_call(); bigger ones (e.g. for structs passed by value) are
+   malloced */
+#define CALL_SMALL_BUFFER_SIZE    256
+
 static PyObject*
 cdata_call(CDataObject *cd, PyObject *args, PyObject *kwds)
 {
+    union_alignment small_buffer[CALL_SMALL_BUFFER_SIZE /
+                                 sizeof(union_alignment)];
     char *buffer;
     void** buffer_array;
     cif_description_t *cif_descr;
     Py_ssize_t i, nargs, nargs_declared;
     PyObject *signature, *res = NULL, *fvarargs;
-    CTypeDescrObject *fresult;
+    CTypeDescrObject *fresult, *fixedct;
     char *resultdata;
     char *errormsg;
 
@@ -2916,11 +3126,12 @@ cdata_call(CDataObject *cd, PyObject *args, PyObject *kwds)
     nargs_declared = PyTuple_GET_SIZE(signature) - 2;
     fresult = (CTypeDescrObject *)PyTuple_GET_ITEM(signature, 1);
     fvarargs = NULL;
+    fixedct = NULL;
     buffer = NULL;
 
     cif_descr = (cif_description_t *)cd->c_type->ct_extra;
 
-    if (cif_descr != NULL) {
+    if (cif_descr != NULL && !(cd->c_type->ct_flags & CT_IS_VARIADIC)) {
         /* regular case: this function does not take '...' arguments */
         if (nargs != nargs_declared) {
             errormsg = "'%s' expects %zd arguments, got %zd";
@@ -2932,61 +3143,73 @@ cdata_call(CDataObject *cd, PyObject *args, PyObject *kwds)
     }
     else {
         /* call of a variadic function */
+        CTypeDescrObject **vargtypes;
         ffi_abi fabi;
         if (nargs < nargs_declared) {
             errormsg = "'%s' expects at least %zd arguments, got %zd";
             goto bad_number_of_arguments;
         }
-        fvarargs = PyTuple_New(nargs);
-        if (fvarargs == NULL)
-            goto error;
-        for (i = 0; i < nargs_declared; i++) {
-            PyObject *o = PyTuple_GET_ITEM(signature, 2 + i);
-            Py_INCREF(o);
-            PyTuple_SET_ITEM(fvarargs, i, o);
-        }
+        vargtypes = alloca((nargs - nargs_declared) *
+                           sizeof(CTypeDescrObject *));
         for (i = nargs_declared; i < nargs; i++) {
-            PyObject *obj = PyTuple_GET_ITEM(args, i);
-            CTypeDescrObject *ct;
-
-            if (CData_Check(obj)) {
-                ct = ((CDataObject *)obj)->c_type;
-                if (ct->ct_flags & (CT_PRIMITIVE_CHAR | CT_PRIMITIVE_UNSIGNED |
-                                    CT_PRIMITIVE_SIGNED)) {
-                    if (ct->ct_size < (Py_ssize_t)sizeof(int)) {
-                        ct = _get_ct_int();
-                        if (ct == NULL)
-                            goto error;
-                    }
-                }
-                else if (ct->ct_flags & CT_ARRAY) {
-                    ct = (CTypeDescrObject *)ct->ct_stuff;
-                }
-                Py_INCREF(ct);
-            }
-            else {
-                PyErr_Format(PyExc_TypeError,
-                             "argument %zd passed in the variadic part "
-                             "needs to be a cdata object (got %.200s)",
-                             i + 1, Py_TYPE(obj)->tp_name);
+            CTypeDescrObject *ct = _get_varargs_ctype(
+                                       PyTuple_GET_ITEM(args, i), i);
+            if (ct == NULL)
                 goto error;
-            }
-            PyTuple_SET_ITEM(fvarargs, i, (PyObject *)ct);
+            vargtypes[i - nargs_declared] = ct;
         }
+        /* look for a function type with all these arguments, built and
+           cached by a previous call of the same shape */
+        if (cd->c_type->ct_flags & CT_IS_VARIADIC)
+            fixedct = varargs_cache_lookup(cd->c_type, nargs, vargtypes);
+
+        if (fixedct == NULL) {
+            fvarargs = PyTuple_New(nargs);
+            if (fvarargs == NULL)
+                goto error;
+            for (i = 0; i < nargs_declared; i++) {
+                PyObject *o = PyTuple_GET_ITEM(signature, 2 + i);
+                Py_INCREF(o);
+                PyTuple_SET_ITEM(fvarargs, i, o);
+            }
+            for (i = nargs_declared; i < nargs; i++) {
+                PyObject *o = (PyObject *)vargtypes[i - nargs_declared];
+                Py_INCREF(o);
+                PyTuple_SET_ITEM(fvarargs, i, o);
+            }
 #if PY_MAJOR_VERSION < 3
-        fabi = PyInt_AS_LONG(PyTuple_GET_ITEM(signature, 0));
+            fabi = PyInt_AS_LONG(PyTuple_GET_ITEM(signature, 0));
 #else
-        fabi = PyLong_AS_LONG(PyTuple_GET_ITEM(signature, 0));
+            fabi = PyLong_AS_LONG(PyTuple_GET_ITEM(signature, 0));
 #endif
-        cif_descr = fb_prepare_cif(fvarargs, fresult, fabi);
-        if (cif_descr == NULL)
-            goto error;
+            fixedct = (CTypeDescrObject *)new_function_type(fvarargs, fresult,
+                                                            0, fabi);
+            if (fixedct == NULL)
+                goto error;
+            if (fixedct->ct_extra == NULL) {
+                /* unsupported argument or return type: call
+                   fb_prepare_cif() again to get the exception */
+                cif_descr = fb_prepare_cif(fvarargs, fresult, fabi);
+                assert(cif_descr == NULL);
+                goto error;
+            }
+            if ((cd->c_type->ct_flags & CT_IS_VARIADIC) &&
+                    varargs_cache_store(cd->c_type, fixedct) < 0)
+                goto error;
+        }
+        signature = fixedct->ct_stuff;
+        cif_descr = (cif_description_t *)fixedct->ct_extra;
     }
 
-    buffer = PyObject_Malloc(cif_descr->exchange_size);
-    if (buffer == NULL) {
-        PyErr_NoMemory();
-        goto error;
+    if (cif_descr->exchange_size <= (Py_ssize_t)sizeof(small_buffer)) {
+        buffer = (char *)small_buffer;
+    }
+    else {
+        buffer = PyObject_Malloc(cif_descr->exchange_size);
+        if (buffer == NULL) {
+            PyErr_NoMemory();
+            goto error;
+        }
     }
 
     buffer_array = (void **)buffer;
@@ -2998,10 +3221,7 @@ cdata_call(CDataObject *cd, PyObject *args, PyObject *kwds)
 
         buffer_array[i] = data;
 
-        if (i < nargs_declared)
-            argtype = (CTypeDescrObject *)PyTuple_GET_ITEM(signature, 2 + i);
-        else
-            argtype = (CTypeDescrObject *)PyTuple_GET_ITEM(fvarargs, i);
+        argtype = (CTypeDescrObject *)PyTuple_GET_ITEM(signature, 2 + i);
 
         if (argtype->ct_flags & CT_POINTER) {
             char *tmpbuf;
@@ -3057,13 +3277,10 @@ cdata_call(CDataObject *cd, PyObject *args, PyObject *kwds)
     /* fall-through */
 
  error:
-    if (buffer)
+    if (buffer && buffer != (char *)small_buffer)
         PyObject_Free(buffer);
-    if (fvarargs != NULL) {
-        Py_DECREF(fvarargs);
-        if (cif_descr != NULL)  /* but only if fvarargs != NULL, if variadic */
-            PyObject_Free(cif_descr);
-    }
+    Py_XDECREF(fvarargs);
+    Py_XDECREF(fixedct);
     return res;
 }
 
@@ -3244,6 +3461,94 @@ static PyTypeObject CDataOwning_Type = {
     free,                                       /* tp_free */
 };
 
+/* Big allocations that don't need to be cleared are done with mmap()
+   instead of malloc(): the pages are only committed when they are
+   written to, and they are returned to the OS as soon as the object is
+   freed.  The whole CDataOwningMmap object lives in the mapping, after
+   a header that records the size of the mapping. */
+
+#define CFFI_MMAP_THRESHOLD   (1024 * 1024)
+
+#if !defined(MS_WIN32) && !defined(MAP_ANONYMOUS) && defined(MAP_ANON)
+# define MAP_ANONYMOUS MAP_ANON
+#endif
+
+typedef union {
+    size_t mh_size;             /* total size of the mapping */
+    union_alignment mh_alignment;
+} mmap_header_t;
+
+static void *cdataowningmmap_alloc(Py_ssize_t size)
+{
+    mmap_header_t *h;
+    size_t total = sizeof(mmap_header_t) + (size_t)size;
+#ifdef MS_WIN32
+    h = (mmap_header_t *)VirtualAlloc(NULL, total, MEM_COMMIT | MEM_RESERVE,
+                                      PAGE_READWRITE);
+    if (h == NULL)
+        return NULL;
+#else
+    h = (mmap_header_t *)mmap(NULL, total, PROT_READ | PROT_WRITE,
+                              MAP_PRIVATE | MAP_ANONYMOUS, -1, 0);
+    if (h == (mmap_header_t *)MAP_FAILED)
+        return NULL;
+#endif
+    h->mh_size = total;
+    return h + 1;
+}
+
+static void cdataowningmmap_free(void *p)
+{
+    mmap_header_t *h = ((mmap_header_t *)p) - 1;
+#ifdef MS_WIN32
+    VirtualFree(h, 0, MEM_RELEASE);
+#else
+    munmap(h, h->mh_size);
+#endif
+}
+
+static PyTypeObject CDataOwningMmap_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    "_cffi_backend.CDataOwnMmap",
+    sizeof(CDataObject),
+    0,
+    (destructor)cdataowning_dealloc,            /* tp_dealloc */
+    0,                                          /* tp_print */
+    0,                                          /* tp_getattr */
+    0,                                          /* tp_setattr */
+    0,                                          /* tp_compare */
+    (reprfunc)cdataowning_repr,                 /* tp_repr */
+    0,                                          /* tp_as_number */
+    0,                                          /* tp_as_sequence */
+    &CDataOwn_as_mapping,                       /* tp_as_mapping */
+    0,                                          /* tp_hash */
+    0,                                          /* tp_call */
+    0,                                          /* tp_str */
+    0,                                          /* tp_getattro */
+    0,                                          /* tp_setattro */
+    0,                                          /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_CHECKTYPES, /* tp_flags */
+    0,                                          /* tp_doc */
+    0,                                          /* tp_traverse */
+    0,                                          /* tp_clear */
+    0,                                          /* tp_richcompare */
+    0,                                          /* tp_weaklistoffset */
+    0,                                          /* tp_iter */
+    0,                                          /* tp_iternext */
+    0,                                          /* tp_methods */
+    0,                                          /* tp_members */
+    0,                                          /* tp_getset */
+    &CDataOwning_Type,                          /* tp_base */
+    0,                                          /* tp_dict */
+    0,                                          /* tp_descr_get */
+    0,                                          /* tp_descr_set */
+    0,                                          /* tp_dictoffset */
+    0,                                          /* tp_init */
+    0,                                          /* tp_alloc */
+    0,                                          /* tp_new */
+    cdataowningmmap_free,                       /* tp_free */
+};
+
 static PyTypeObject CDataOwningGC_Type = {
     PyVarObject_HEAD_INIT(NULL, 0)
     "_cffi_backend.CDataOwnGC",
@@ -3432,11 +3737,18 @@ static CDataObject *allocate_owning_object(Py_ssize_t size,
                                            int dont_clear)
 {
     CDataObject *cd;
-    if (dont_clear)
-        cd = malloc(size);
+    PyTypeObject *type = &CDataOwning_Type;
+    if (dont_clear) {
+        if (size >= CFFI_MMAP_THRESHOLD) {
+            cd = cdataowningmmap_alloc(size);
+            type = &CDataOwningMmap_Type;
+        }
+        else
+            cd = malloc(size);
+    }
     else
         cd = calloc(size, 1);
-    if (PyObject_Init((PyObject *)cd, &CDataOwning_Type) == NULL)
+    if (PyObject_Init((PyObject *)cd, type) == NULL)
         return NULL;
 
     Py_INCREF(ct);
@@ -3487,11 +3799,14 @@ static CDataObject *allocate_gcp_object(CDataObject *origobj,
     cd->head.c_weakreflist = NULL;
     cd->origobj = (PyObject *)origobj;
     cd->destructor = destructor;
+    cd->external_size = 0;
 
     PyObject_GC_Track(cd);
     return (CDataObject *)cd;
 }
 
+static char *arena_alloc(struct _cffi_arena_s *arena, Py_ssize_t size);
+
 static CDataObject *allocate_with_allocator(Py_ssize_t basesize,
                                             Py_ssize_t datasize,
                                             CTypeDescrObject *ct,
@@ -3499,7 +3814,29 @@ static CDataObject *allocate_with_allocator(Py_ssize_t basesize,
 {
     CDataObject *cd;
 
-    if (allocator->ca_alloc == NULL) {
+    if (allocator->ca_arena != NULL) {
+        /* a non-owning cdata pointing inside the arena, which it keeps
+           alive.  The memory is already zero: it comes from calloc()
+           and arena memory is never reused. */
+        CDataObject_gcp *gcp;
+        char *data = arena_alloc(allocator->ca_arena, datasize);
+        if (data == NULL)
+            return NULL;
+        gcp = PyObject_GC_New(CDataObject_gcp, &CDataGCP_Type);
+        if (gcp == NULL)
+            return NULL;
+        Py_INCREF(allocator->ca_arena);
+        Py_INCREF(ct);
+        gcp->head.c_data = data;
+        gcp->head.c_type = ct;
+        gcp->head.c_weakreflist = NULL;
+        gcp->origobj = (PyObject *)allocator->ca_arena;
+        gcp->destructor = NULL;
+        gcp->external_size = 0;
+        PyObject_GC_Track(gcp);
+        cd = (CDataObject *)gcp;
+    }
+    else if (allocator->ca_alloc == NULL) {
         cd = allocate_owning_object(basesize + datasize, ct,
                                     allocator->ca_dont_clear);
         if (cd == NULL)
@@ -3604,11 +3941,12 @@ static PyObject *direct_newp(CTypeDescrObject *ct, PyObject *init,
         return NULL;
     }
 
-    if (ct->ct_flags & CT_IS_PTR_TO_OWNED) {
+    if ((ct->ct_flags & CT_IS_PTR_TO_OWNED) && allocator->ca_arena == NULL) {
         /* common case of ptr-to-struct (or ptr-to-union): for this case
            we build two objects instead of one, with the memory-owning
            one being really the struct (or union) and the returned one
-           having a strong reference to it */
+           having a strong reference to it.  Not needed with an arena,
+           because the memory is owned by the arena anyway. */
         CDataObject *cds;
 
         cds = allocate_with_allocator(dataoffset, datasize, ct->ct_itemdescr,
@@ -3660,87 +3998,394 @@ static PyObject *b_newp(PyObject *self, PyObject *args)
     return direct_newp(ct, init, &default_allocator);
 }
 
-static int
-_my_PyObject_AsBool(PyObject *ob)
+static PyObject *b_newp_uninitialized(PyObject *self, PyObject *args)
 {
-    /* convert and cast a Python object to a boolean.  Accept an integer
-       or a float object, up to a CData 'long double'. */
-    PyObject *io;
-    PyNumberMethods *nb;
-    int res;
+    CTypeDescrObject *ct;
+    PyObject *init = Py_None;
+    if (!PyArg_ParseTuple(args, "O!|O:newp_uninitialized",
+                          &CTypeDescr_Type, &ct, &init))
+        return NULL;
+    return direct_newp(ct, init, &nonzero_allocator);
+}
 
-#if PY_MAJOR_VERSION < 3
-    if (PyInt_Check(ob)) {
-        return PyInt_AS_LONG(ob) != 0;
-    }
-    else
-#endif
-    if (PyLong_Check(ob)) {
-        return _PyLong_Sign(ob) != 0;
+/* An arena: ffi.new()-like allocations that are slices of big blocks
+   obtained with calloc().  The cdata objects returned do not own their
+   memory, but keep the arena alive.  All the blocks are freed at once
+   by close(), or when the arena is deallocated. */
+
+#define ARENA_DEFAULT_BLOCK_SIZE   65536
+
+struct arena_block_s {
+    struct arena_block_s *ab_next;
+    union_alignment ab_data;            /* the data starts here */
+};
+typedef struct {
+    char c;
+    union_alignment u;
+} arena_align_t;
+#define ARENA_ALIGN          ((Py_ssize_t)offsetof(arena_align_t, u))
+#define ARENA_BLOCK_HEADER   ((Py_ssize_t)offsetof(struct arena_block_s, \
+                                                   ab_data))
+
+typedef struct _cffi_arena_s {
+    PyObject_HEAD
+    struct arena_block_s *ar_blocks;    /* linked list of all blocks */
+    char *ar_cur, *ar_end;              /* free part of the current block */
+    Py_ssize_t ar_block_size;
+    Py_ssize_t ar_allocated;            /* total of the allocated sizes */
+    Py_ssize_t ar_reserved;             /* total of the block sizes */
+    Py_ssize_t ar_nblocks;
+    PyObject *ar_typeof;                /* converts a cdecl, or NULL */
+    int ar_closed;
+} ArenaObject;
+
+static PyTypeObject Arena_Type;
+
+static char *arena_alloc(ArenaObject *arena, Py_ssize_t size)
+{
+    char *p;
+    struct arena_block_s *block;
+    Py_ssize_t blocksize;
+
+    if (arena->ar_closed) {
+        PyErr_SetString(PyExc_ValueError, "this arena was closed");
+        return NULL;
     }
-    else if (PyFloat_Check(ob)) {
-        return PyFloat_AS_DOUBLE(ob) != 0.0;
+    if (size > PY_SSIZE_T_MAX - ARENA_BLOCK_HEADER - ARENA_ALIGN) {
+        PyErr_NoMemory();
+        return NULL;
     }
-    else if (CData_Check(ob)) {
-        CDataObject *cd = (CDataObject *)ob;
-        if (cd->c_type->ct_flags & CT_PRIMITIVE_FLOAT) {
-            /*READ(cd->c_data, cd->c_type->ct_size)*/
-            if (cd->c_type->ct_flags & CT_IS_LONGDOUBLE) {
-                /* 'long double' objects: return the answer directly */
-                return read_raw_longdouble_data(cd->c_data) != 0.0;
-            }
-            else {
-                /* 'float'/'double' objects: return the answer directly */
-                return read_raw_float_data(cd->c_data,
-                                           cd->c_type->ct_size) != 0.0;
-            }
-        }
+    size = (size + ARENA_ALIGN - 1) & ~(ARENA_ALIGN - 1);
+    if (size == 0)
+        size = ARENA_ALIGN;     /* return distinct pointers */
+
+    if (size <= arena->ar_end - arena->ar_cur) {
+        /* fast path */
+        p = arena->ar_cur;
+        arena->ar_cur += size;
+        arena->ar_allocated += size;
+        return p;
     }
-    nb = ob->ob_type->tp_as_number;
-    if (nb == NULL || (nb->nb_float == NULL && nb->nb_int == NULL)) {
-        PyErr_SetString(PyExc_TypeError, "integer/float expected");
-        return -1;
+
+    /* big allocations get a block of their own, to avoid wasting the
+       rest of the current block */
+    blocksize = arena->ar_block_size;
+    if (size > blocksize / 4)
+        blocksize = size;
+
+    block = calloc(ARENA_BLOCK_HEADER + blocksize, 1);
+    if (block == NULL) {
+        PyErr_NoMemory();
+        return NULL;
     }
-    if (nb->nb_float && !CData_Check(ob))
-        io = (*nb->nb_float) (ob);
-    else
-        io = (*nb->nb_int) (ob);
-    if (io == NULL)
-        return -1;
+    block->ab_next = arena->ar_blocks;
+    arena->ar_blocks = block;
+    arena->ar_reserved += blocksize;
+    arena->ar_nblocks++;
 
-    if (PyIntOrLong_Check(io) || PyFloat_Check(io)) {
-        res = _my_PyObject_AsBool(io);
+    p = (char *)&block->ab_data;
+    if (blocksize > size) {
+        arena->ar_cur = p + size;
+        arena->ar_end = p + blocksize;
     }
-    else {
-        PyErr_SetString(PyExc_TypeError, "integer/float conversion failed");
-        res = -1;
+    arena->ar_allocated += size;
+    return p;
+}
+
+static void arena_free_blocks(ArenaObject *arena)
+{
+    struct arena_block_s *block = arena->ar_blocks;
+    while (block != NULL) {
+        struct arena_block_s *next = block->ab_next;
+        free(block);
+        block = next;
     }
-    Py_DECREF(io);
-    return res;
+    arena->ar_blocks = NULL;
+    arena->ar_cur = NULL;
+    arena->ar_end = NULL;
 }
 
-static CDataObject *_new_casted_primitive(CTypeDescrObject *ct)
+static PyObject *new_arena_object(Py_ssize_t block_size, PyObject *typeof_fn)
 {
-    int dataoffset = offsetof(CDataObject_casted_primitive, alignment);
-    CDataObject *cd = (CDataObject *)PyObject_Malloc(dataoffset + ct->ct_size);
-    if (PyObject_Init((PyObject *)cd, &CData_Type) == NULL)
+    ArenaObject *arena;
+
+    if (block_size < 0) {
+        PyErr_SetString(PyExc_ValueError, "negative block_size");
         return NULL;
-    Py_INCREF(ct);
-    cd->c_type = ct;
-    cd->c_data = ((char*)cd) + dataoffset;
-    cd->c_weakreflist = NULL;
-    return cd;
+    }
+    if (block_size == 0)
+        block_size = ARENA_DEFAULT_BLOCK_SIZE;
+
+    arena = PyObject_GC_New(ArenaObject, &Arena_Type);
+    if (arena == NULL)
+        return NULL;
+    arena->ar_blocks = NULL;
+    arena->ar_cur = NULL;
+    arena->ar_end = NULL;
+    arena->ar_block_size = block_size;
+    arena->ar_allocated = 0;
+    arena->ar_reserved = 0;
+    arena->ar_nblocks = 0;
+    Py_XINCREF(typeof_fn);
+    arena->ar_typeof = typeof_fn;
+    arena->ar_closed = 0;
+    PyObject_GC_Track(arena);
+    return (PyObject *)arena;
+}
+
+static PyObject *b_new_arena(PyObject *self, PyObject *args)
+{
+    Py_ssize_t block_size = 0;
+    PyObject *typeof_fn = Py_None;
+
+    if (!PyArg_ParseTuple(args, "|nO:new_arena", &block_size, &typeof_fn))
+        return NULL;
+    if (typeof_fn == Py_None)
+        typeof_fn = NULL;
+    return new_arena_object(block_size, typeof_fn);
 }
 
-static CDataObject *cast_to_integer_or_char(CTypeDescrObject *ct, PyObject *ob)
+static PyObject *arena_new(ArenaObject *arena, PyObject *args, PyObject *kwds)
 {
-    unsigned PY_LONG_LONG value;
-    CDataObject *cd;
+    PyObject *arg, *init = Py_None, *res;
+    cffi_allocator_t alloc1;
+    static char *keywords[] = {"cdecl", "init", NULL};
 
-    if (CData_Check(ob) &&
-        ((CDataObject *)ob)->c_type->ct_flags &
-                                 (CT_POINTER|CT_FUNCTIONPTR|CT_ARRAY)) {
-        value = (Py_intptr_t)((CDataObject *)ob)->c_data;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O|O:new", keywords,
+                                     &arg, &init))
+        return NULL;
+
+    alloc1.ca_alloc = NULL;
+    alloc1.ca_free = NULL;
+    alloc1.ca_dont_clear = 0;
+    alloc1.ca_arena = arena;
+
+    if (CTypeDescr_Check(arg))
+        return direct_newp((CTypeDescrObject *)arg, init, &alloc1);
+
+    if (arena->ar_typeof == NULL) {
+        PyErr_Format(PyExc_TypeError, "expected a ctype object, got '%.200s'",
+                     Py_TYPE(arg)->tp_name);
+        return NULL;
+    }
+    arg = PyObject_CallFunctionObjArgs(arena->ar_typeof, arg, NULL);
+    if (arg == NULL)
+        return NULL;
+    if (!CTypeDescr_Check(arg)) {
+        PyErr_Format(PyExc_TypeError, "typeof() must return a ctype object "
+                     "(got %.200s)", Py_TYPE(arg)->tp_name);
+        Py_DECREF(arg);
+        return NULL;
+    }
+    res = direct_newp((CTypeDescrObject *)arg, init, &alloc1);
+    Py_DECREF(arg);
+    return res;
+}
+
+static PyObject *arena_close(ArenaObject *arena, PyObject *noarg)
+{
+    arena_free_blocks(arena);
+    arena->ar_closed = 1;
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+static PyObject *arena_enter(ArenaObject *arena, PyObject *noarg)
+{
+    if (arena->ar_closed) {
+        PyErr_SetString(PyExc_ValueError, "this arena was closed");
+        return NULL;
+    }
+    Py_INCREF(arena);
+    return (PyObject *)arena;
+}
+
+static PyObject *arena_exit(ArenaObject *arena, PyObject *args)
+{
+    return arena_close(arena, NULL);
+}
+
+static PyObject *arena_get_allocated(ArenaObject *arena, void *closure)
+{
+    return PyInt_FromSsize_t(arena->ar_allocated);
+}
+
+static PyObject *arena_get_reserved(ArenaObject *arena, void *closure)
+{
+    return PyInt_FromSsize_t(arena->ar_reserved);
+}
+
+static PyObject *arena_get_blocks(ArenaObject *arena, void *closure)
+{
+    return PyInt_FromSsize_t(arena->ar_nblocks);
+}
+
+static PyObject *arena_get_closed(ArenaObject *arena, void *closure)
+{
+    return PyBool_FromLong(arena->ar_closed);
+}
+
+static PyObject *arena_repr(ArenaObject *arena)
+{
+    if (arena->ar_closed)
+        return PyText_FromString("<_cffi_backend.Arena closed>");
+    return PyText_FromFormat("<_cffi_backend.Arena %zd/%zd bytes>",
+                             arena->ar_allocated, arena->ar_reserved);
+}
+
+static int arena_traverse(ArenaObject *arena, visitproc visit, void *arg)
+{
+    Py_VISIT(arena->ar_typeof);
+    return 0;
+}
+
+static int arena_clear(ArenaObject *arena)
+{
+    Py_CLEAR(arena->ar_typeof);
+    return 0;
+}
+
+static void arena_dealloc(ArenaObject *arena)
+{
+    PyObject_GC_UnTrack(arena);
+    arena_clear(arena);
+    arena_free_blocks(arena);
+    PyObject_GC_Del(arena);
+}
+
+static PyMethodDef arena_methods[] = {
+    {"new",       (PyCFunction)arena_new,   METH_VARARGS | METH_KEYWORDS},
+    {"close",     (PyCFunction)arena_close, METH_NOARGS},
+    {"__enter__", (PyCFunction)arena_enter, METH_NOARGS},
+    {"__exit__",  (PyCFunction)arena_exit,  METH_VARARGS},
+    {NULL,        NULL}         /* sentinel */
+};
+
+static PyGetSetDef arena_getsets[] = {
+    {"allocated", (getter)arena_get_allocated, NULL,
+                                  "number of bytes allocated so far"},
+    {"reserved", (getter)arena_get_reserved, NULL,
+                                  "number of bytes in the blocks"},
+    {"blocks", (getter)arena_get_blocks, NULL, "number of blocks"},
+    {"closed", (getter)arena_get_closed, NULL, "true after close()"},
+    {NULL}                        /* sentinel */
+};
+
+static PyTypeObject Arena_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    "_cffi_backend.Arena",              /* tp_name */
+    sizeof(ArenaObject),                /* tp_basicsize */
+    0,                                  /* tp_itemsize */
+    /* methods */
+    (destructor)arena_dealloc,          /* tp_dealloc */
+    0,                                  /* tp_print */
+    0,                                  /* tp_getattr */
+    0,                                  /* tp_setattr */
+    0,                                  /* tp_compare */
+    (reprfunc)arena_repr,               /* tp_repr */
+    0,                                  /* tp_as_number */
+    0,                                  /* tp_as_sequence */
+    0,                                  /* tp_as_mapping */
+    0,                                  /* tp_hash */
+    0,                                  /* tp_call */
+    0,                                  /* tp_str */
+    PyObject_GenericGetAttr,            /* tp_getattro */
+    0,                                  /* tp_setattro */
+    0,                                  /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC, /* tp_flags */
+    0,                                  /* tp_doc */
+    (traverseproc)arena_traverse,       /* tp_traverse */
+    (inquiry)arena_clear,               /* tp_clear */
+    0,                                  /* tp_richcompare */
+    0,                                  /* tp_weaklistoffset */
+    0,                                  /* tp_iter */
+    0,                                  /* tp_iternext */
+    arena_methods,                      /* tp_methods */
+    0,                                  /* tp_members */
+    arena_getsets,                      /* tp_getset */
+};
+
+static int
+_my_PyObject_AsBool(PyObject *ob)
+{
+    /* convert and cast a Python object to a boolean.  Accept an integer
+       or a float object, up to a CData 'long double'. */
+    PyObject *io;
+    PyNumberMethods *nb;
+    int res;
+
+#if PY_MAJOR_VERSION < 3
+    if (PyInt_Check(ob)) {
+        return PyInt_AS_LONG(ob) != 0;
+    }
+    else
+#endif
+    if (PyLong_Check(ob)) {
+        return _PyLong_Sign(ob) != 0;
+    }
+    else if (PyFloat_Check(ob)) {
+        return PyFloat_AS_DOUBLE(ob) != 0.0;
+    }
+    else if (CData_Check(ob)) {
+        CDataObject *cd = (CDataObject *)ob;
+        if (cd->c_type->ct_flags & CT_PRIMITIVE_FLOAT) {
+            /*READ(cd->c_data, cd->c_type->ct_size)*/
+            if (cd->c_type->ct_flags & CT_IS_LONGDOUBLE) {
+                /* 'long double' objects: return the answer directly */
+                return read_raw_longdouble_data(cd->c_data) != 0.0;
+            }
+            else {
+                /* 'float'/'double' objects: return the answer directly */
+                return read_raw_float_data(cd->c_data,
+                                           cd->c_type->ct_size) != 0.0;
+            }
+        }
+    }
+    nb = ob->ob_type->tp_as_number;
+    if (nb == NULL || (nb->nb_float == NULL && nb->nb_int == NULL)) {
+        PyErr_SetString(PyExc_TypeError, "integer/float expected");
+        return -1;
+    }
+    if (nb->nb_float && !CData_Check(ob))
+        io = (*nb->nb_float) (ob);
+    else
+        io = (*nb->nb_int) (ob);
+    if (io == NULL)
+        return -1;
+
+    if (PyIntOrLong_Check(io) || PyFloat_Check(io)) {
+        res = _my_PyObject_AsBool(io);
+    }
+    else {
+        PyErr_SetString(PyExc_TypeError, "integer/float conversion failed");
+        res = -1;
+    }
+    Py_DECREF(io);
+    return res;
+}
+
+static CDataObject *_new_casted_primitive(CTypeDescrObject *ct)
+{
+    int dataoffset = offsetof(CDataObject_casted_primitive, alignment);
+    CDataObject *cd = (CDataObject *)PyObject_Malloc(dataoffset + ct->ct_size);
+    if (PyObject_Init((PyObject *)cd, &CData_Type) == NULL)
+        return NULL;
+    Py_INCREF(ct);
+    cd->c_type = ct;
+    cd->c_data = ((char*)cd) + dataoffset;
+    cd->c_weakreflist = NULL;
+    return cd;
+}
+
+static CDataObject *cast_to_integer_or_char(CTypeDescrObject *ct, PyObject *ob)
+{
+    unsigned PY_LONG_LONG value;
+    CDataObject *cd;
+
+    if (CData_Check(ob) &&
+        ((CDataObject *)ob)->c_type->ct_flags &
+                                 (CT_POINTER|CT_FUNCTIONPTR|CT_ARRAY)) {
+        value = (Py_intptr_t)((CDataObject *)ob)->c_data;
     }
 #if PY_MAJOR_VERSION < 3
     else if (PyString_Check(ob)) {
@@ -5550,6 +6195,8 @@ static PyObject *new_function_type(PyObject *fargs,   /* tuple */
 
         fct->ct_extra = (char *)cif_descr;
     }
+    else
+        fct->ct_flags |= CT_IS_VARIADIC;
 
     /* build the signature, given by a tuple of ctype objects */
     fct->ct_stuff = PyTuple_New(2 + funcbuilder.nargs);
@@ -5601,6 +6248,53 @@ static PyObject *b_new_function_type(PyObject *self, PyObject *args)
     return new_function_type(fargs, fresult, ellipsis, fabi);
 }
 
+static PyObject *b_get_varargs_cache_stats(PyObject *self, PyObject *arg)
+{
+    CTypeDescrObject *ct = (CTypeDescrObject *)arg;
+    varargs_cache_t *cache;
+    Py_ssize_t hits = 0, misses = 0, size = 0;
+
+    if (!CTypeDescr_Check(arg) || !(ct->ct_flags & CT_IS_VARIADIC)) {
+        PyErr_SetString(PyExc_TypeError,
+                        "expected a ctype of a function with '...'");
+        return NULL;
+    }
+    cache = (varargs_cache_t *)ct->ct_extra;
+    if (cache != NULL) {
+        hits = cache->vc_hits;
+        misses = cache->vc_misses;
+        while (size < VARARGS_CACHE_SIZE && cache->vc_fixed[size] != NULL)
+            size++;
+    }
+    return Py_BuildValue("{s:n,s:n,s:n,s:i}", "hits", hits, "misses", misses,
+                         "size", size, "maxsize", VARARGS_CACHE_SIZE);
+}
+
+static PyObject *b_get_closure_stats(PyObject *self, PyObject *noarg)
+{
+#ifdef CFFI_TRUST_LIBFFI
+    PyErr_SetString(PyExc_NotImplementedError,
+                    "the closures are allocated by libffi on this platform");
+    return NULL;
+#else
+    Py_ssize_t pages, live, free, chunks, pages_released;
+
+    PyThread_acquire_lock(closure_lock, WAIT_LOCK);
+    pages = closure_stats.pages;
+    live = closure_stats.live;
+    free = closure_stats.free;
+    chunks = num_closure_chunks;
+    pages_released = closure_stats.pages_released;
+    PyThread_release_lock(closure_lock);
+
+    return Py_BuildValue("{s:n,s:n,s:n,s:n,s:n,s:n}",
+                         "pages", pages, "chunks", chunks,
+                         "live", live, "free", free,
+                         "pages_released", pages_released,
+                         "page_size", _pagesize);
+#endif
+}
+
 static int convert_from_object_fficallback(char *result,
                                            CTypeDescrObject *ctype,
                                            PyObject *pyobj,
@@ -5687,6 +6381,33 @@ static void _my_PyErr_WriteUnraisable(PyObject *t, PyObject *v, PyObject *tb,
     Py_XDECREF(tb);
 }
 
+/* Calling the Python function of a callback without building a tuple
+   of arguments, if the Python version supports it. */
+#if PY_VERSION_HEX >= 0x03090000
+#  define CFFI_VECTORCALL(f, args, n)  PyObject_Vectorcall(f, args, n, NULL)
+#elif PY_VERSION_HEX >= 0x03080000
+#  define CFFI_VECTORCALL(f, args, n)  _PyObject_Vectorcall(f, args, n, NULL)
+#elif PY_VERSION_HEX >= 0x03060000
+#  define CFFI_VECTORCALL(f, args, n)  _PyObject_FastCall(f, args, n)
+#endif
+#define CALLBACK_MAX_STACK_ARGS   8
+
+static PyObject *convert_callback_arg(int decode_args_from_libffi,
+                                      char *args, Py_ssize_t i,
+                                      CTypeDescrObject *a_ct)
+{
+    char *a_src;
+    if (decode_args_from_libffi) {
+        a_src = ((void **)args)[i];
+    }
+    else {
+        a_src = args + i * 8;
+        if (a_ct->ct_flags & (CT_IS_LONGDOUBLE | CT_STRUCT | CT_UNION))
+            a_src = *(char **)a_src;
+    }
+    return convert_to_object(a_src, a_ct);
+}
+
 static void general_invoke_callback(int decode_args_from_libffi,
                                     void *result, char *args, void *userdata)
 {
@@ -5706,30 +6427,42 @@ static void general_invoke_callback(int decode_args_from_libffi,
     Py_INCREF(cb_args);
 
     n = PyTuple_GET_SIZE(signature) - 2;
-    py_args = PyTuple_New(n);
-    if (py_args == NULL)
-        goto error;
+#ifdef CFFI_VECTORCALL
+    if (n <= CALLBACK_MAX_STACK_ARGS) {
+        /* fast path: the arguments are in a C array */
+        PyObject *stack_args[CALLBACK_MAX_STACK_ARGS];
+        Py_ssize_t j;
 
-    for (i=0; i<n; i++) {
-        char *a_src;
-        PyObject *a;
-        CTypeDescrObject *a_ct = SIGNATURE(2 + i);
-
-        if (decode_args_from_libffi) {
-            a_src = ((void **)args)[i];
-        }
-        else {
-            a_src = args + i * 8;
-            if (a_ct->ct_flags & (CT_IS_LONGDOUBLE | CT_STRUCT | CT_UNION))
-                a_src = *(char **)a_src;
-        }
-        a = convert_to_object(a_src, a_ct);
-        if (a == NULL)
+        stack_args[0] = NULL;   /* if n == 0; avoids a gcc warning */
+        for (i=0; i<n; i++) {
+            stack_args[i] = convert_callback_arg(decode_args_from_libffi,
+                                                 args, i, SIGNATURE(2 + i));
+            if (stack_args[i] == NULL)
+                break;
+        }
+        if (i == n)
+            py_res = CFFI_VECTORCALL(py_ob, stack_args, n);
+        for (j=0; j<i; j++)
+            Py_DECREF(stack_args[j]);
+        if (i < n)
             goto error;
-        PyTuple_SET_ITEM(py_args, i, a);
     }
+    else
+#endif
+    {
+        py_args = PyTuple_New(n);
+        if (py_args == NULL)
+            goto error;
 
-    py_res = PyObject_Call(py_ob, py_args, NULL);
+        for (i=0; i<n; i++) {
+            PyObject *a = convert_callback_arg(decode_args_from_libffi,
+                                               args, i, SIGNATURE(2 + i));
+            if (a == NULL)
+                goto error;
+            PyTuple_SET_ITEM(py_args, i, a);
+        }
+        py_res = PyObject_Call(py_ob, py_args, NULL);
+    }
     if (py_res == NULL)
         goto error;
     if (convert_from_object_fficallback(result, SIGNATURE(1), py_res,
@@ -5866,24 +6599,18 @@ static PyObject *prepare_callback_info_tuple(CTypeDescrObject *ct,
     return infotuple;
 }
 
-static PyObject *b_callback(PyObject *self, PyObject *args)
+static PyObject *make_callback_closure(CTypeDescrObject *ct,
+                                       PyObject *infotuple,
+                                       void (*handler)(ffi_cif *, void *,
+                                                       void **, void *))
 {
-    CTypeDescrObject *ct;
+    /* Steals a reference to 'infotuple', which becomes the closure's
+       'user_data' and is passed to 'handler' */
     CDataObject_closure *cd;
-    PyObject *ob, *error_ob = Py_None, *onerror_ob = Py_None;
-    PyObject *infotuple;
     cif_description_t *cif_descr;
     ffi_closure *closure;
     void *closure_exec;
 
-    if (!PyArg_ParseTuple(args, "O!O|OO:callback", &CTypeDescr_Type, &ct, &ob,
-                          &error_ob, &onerror_ob))
-        return NULL;
-
-    infotuple = prepare_callback_info_tuple(ct, ob, error_ob, onerror_ob, 1);
-    if (infotuple == NULL)
-        return NULL;
-
 #ifdef CFFI_TRUST_LIBFFI
     closure = ffi_closure_alloc(sizeof(ffi_closure), &closure_exec);
 #else
@@ -5892,6 +6619,9 @@ static PyObject *b_callback(PyObject *self, PyObject *args)
 #endif
     if (closure == NULL) {
         Py_DECREF(infotuple);
+        PyErr_SetString(PyExc_MemoryError,
+                        "cannot allocate write+execute memory for "
+                        "ffi.callback()");
         return NULL;
     }
     cd = PyObject_GC_New(CDataObject_closure, &CDataOwningGC_Type);
@@ -5905,7 +6635,7 @@ static PyObject *b_callback(PyObject *self, PyObject *args)
     PyObject_GC_Track(cd);
 
     cif_descr = (cif_description_t *)ct->ct_extra;
-    if (cif_descr == NULL) {
+    if (cif_descr == NULL || (ct->ct_flags & CT_IS_VARIADIC)) {
         PyErr_Format(PyExc_NotImplementedError,
                      "%s: callback with unsupported argument or "
                      "return type or with '...'", ct->ct_name);
@@ -5913,10 +6643,10 @@ static PyObject *b_callback(PyObject *self, PyObject *args)
     }
 #ifdef CFFI_TRUST_LIBFFI
     if (ffi_prep_closure_loc(closure, &cif_descr->cif,
-                         invoke_callback, infotuple, closure_exec) != FFI_OK) {
+                             handler, infotuple, closure_exec) != FFI_OK) {
 #else
     if (ffi_prep_closure(closure, &cif_descr->cif,
-                         invoke_callback, infotuple) != FFI_OK) {
+                         handler, infotuple) != FFI_OK) {
 #endif
         PyErr_SetString(PyExc_SystemError,
                         "libffi failed to build this callback");
@@ -5953,50 +6683,487 @@ static PyObject *b_callback(PyObject *self, PyObject *args)
     return NULL;
 }
 
-static PyObject *b_new_enum_type(PyObject *self, PyObject *args)
+static PyObject *b_callback(PyObject *self, PyObject *args)
 {
-    char *ename;
-    PyObject *enumerators, *enumvalues;
-    PyObject *dict1 = NULL, *dict2 = NULL, *combined = NULL, *tmpkey = NULL;
-    int name_size;
-    CTypeDescrObject *td, *basetd;
-    Py_ssize_t i, n;
+    CTypeDescrObject *ct;
+    PyObject *ob, *error_ob = Py_None, *onerror_ob = Py_None;
+    PyObject *infotuple;
 
-    if (!PyArg_ParseTuple(args, "sO!O!O!:new_enum_type",
-                          &ename,
-                          &PyTuple_Type, &enumerators,
-                          &PyTuple_Type, &enumvalues,
-                          &CTypeDescr_Type, &basetd))
+    if (!PyArg_ParseTuple(args, "O!O|OO:callback", &CTypeDescr_Type, &ct, &ob,
+                          &error_ob, &onerror_ob))
         return NULL;
 
-    n = PyTuple_GET_SIZE(enumerators);
-    if (n != PyTuple_GET_SIZE(enumvalues)) {
-        PyErr_SetString(PyExc_ValueError,
-                        "tuple args must have the same size");
+    infotuple = prepare_callback_info_tuple(ct, ob, error_ob, onerror_ob, 1);
+    if (infotuple == NULL)
         return NULL;
-    }
 
-    if (!(basetd->ct_flags & (CT_PRIMITIVE_SIGNED|CT_PRIMITIVE_UNSIGNED))) {
-        PyErr_SetString(PyExc_TypeError,
-                        "expected a primitive signed or unsigned base type");
-        return NULL;
-    }
+    return make_callback_closure(ct, infotuple, invoke_callback);
+}
 
-    dict1 = PyDict_New();
-    if (dict1 == NULL)
-        goto error;
-    dict2 = PyDict_New();
-    if (dict2 == NULL)
-        goto error;
+/* Native callbacks: closures of the function type 'ct' that call a C
+   function 'target' directly, passing a fixed pointer as an extra first
+   argument.  They never enter Python and don't need the GIL.  The
+   closure's 'user_data' is the tuple (ct, target, ptr_bytes, userdata),
+   where 'ptr_bytes' holds the pointer value and 'userdata' is the
+   object it comes from, kept alive. */
 
-    for (i=n; --i >= 0; ) {
-        long long lvalue;
-        PyObject *value = PyTuple_GET_ITEM(enumvalues, i);
-        tmpkey = PyTuple_GET_ITEM(enumerators, i);
-        Py_INCREF(tmpkey);
-        if (!PyText_Check(tmpkey)) {
-#if PY_MAJOR_VERSION < 3
-            if (PyUnicode_Check(tmpkey)) {
+static void invoke_native_callback(ffi_cif *cif, void *result, void **args,
+                                   void *userdata)
+{
+    /* Called without the GIL: only reads fields of immutable objects
+       kept alive by the closure */
+    PyObject *info = (PyObject *)userdata;
+    CDataObject *target = (CDataObject *)PyTuple_GET_ITEM(info, 1);
+    cif_description_t *target_cif =
+        (cif_description_t *)target->c_type->ct_extra;
+    unsigned int i, n = cif->nargs;
+    void **target_args = alloca((n + 1) * sizeof(void *));
+
+    target_args[0] = PyBytes_AS_STRING(PyTuple_GET_ITEM(info, 2));
+    for (i = 0; i < n; i++)
+        target_args[i + 1] = args[i];
+    ffi_call(&target_cif->cif, (void (*)(void))target->c_data, result,
+             target_args);
+}
+
+static PyObject *b_native_callback(PyObject *self, PyObject *args)
+{
+    CTypeDescrObject *ct, *target_ct, *ptr_ct;
+    CDataObject *target;
+    PyObject *userdata_ob, *ptr_bytes, *infotuple;
+    Py_ssize_t i, nargs;
+
+    if (!PyArg_ParseTuple(args, "O!OO:native_callback", &CTypeDescr_Type, &ct,
+                          &target, &userdata_ob))
+        return NULL;
+
+    if (!(ct->ct_flags & CT_FUNCTIONPTR)) {
+        PyErr_Format(PyExc_TypeError, "expected a function ctype, got '%s'",
+                     ct->ct_name);
+        return NULL;
+    }
+    if (!CData_Check(target) ||
+            !(target->c_type->ct_flags & CT_FUNCTIONPTR)) {
+        PyErr_Format(PyExc_TypeError,
+                     "expected a cdata C function pointer, not %.200s "
+                     "(for a function of a 'lib', use ffi.addressof())",
+                     Py_TYPE(target)->tp_name);
+        return NULL;
+    }
+    if (target->c_data == NULL) {
+        PyErr_SetString(PyExc_ValueError, "the C function pointer is NULL");
+        return NULL;
+    }
+
+    /* the signature of 'target' must be the one of 'ct' with an extra
+       pointer argument in front */
+    target_ct = target->c_type;
+    nargs = PyTuple_GET_SIZE(ct->ct_stuff) - 2;
+    ptr_ct = NULL;
+    if (!(target_ct->ct_flags & CT_IS_VARIADIC) &&
+            target_ct->ct_extra != NULL &&
+            PyTuple_GET_SIZE(target_ct->ct_stuff) - 2 == nargs + 1 &&
+            PyTuple_GET_ITEM(target_ct->ct_stuff, 1) ==
+                PyTuple_GET_ITEM(ct->ct_stuff, 1)) {
+        ptr_ct = (CTypeDescrObject *)PyTuple_GET_ITEM(target_ct->ct_stuff, 2);
+        if (!(ptr_ct->ct_flags & CT_POINTER))
+            ptr_ct = NULL;
+        for (i = 0; i < nargs && ptr_ct != NULL; i++) {
+            if (PyTuple_GET_ITEM(target_ct->ct_stuff, 3 + i) !=
+                    PyTuple_GET_ITEM(ct->ct_stuff, 2 + i))
+                ptr_ct = NULL;
+        }
+    }
+    if (ptr_ct == NULL) {
+        PyErr_Format(PyExc_TypeError,
+                     "the C function '%s' must take the same arguments as "
+                     "'%s' and return the same type, with an extra pointer "
+                     "argument in front", target_ct->ct_name, ct->ct_name);
+        return NULL;
+    }
+
+    ptr_bytes = PyBytes_FromStringAndSize(NULL, sizeof(void *));
+    if (ptr_bytes == NULL)
+        return NULL;
+    if (convert_from_object(PyBytes_AS_STRING(ptr_bytes), ptr_ct,
+                            userdata_ob) < 0) {
+        Py_DECREF(ptr_bytes);
+        return NULL;
+    }
+    infotuple = PyTuple_Pack(4, ct, target, ptr_bytes, userdata_ob);
+    Py_DECREF(ptr_bytes);
+    if (infotuple == NULL)
+        return NULL;
+
+    return make_callback_closure(ct, infotuple, invoke_native_callback);
+}
+
+/************************************************************/
+/* Pools of callbacks: pre-created closures for one function type,
+   which are rebound to a new Python callable by acquire() and put back
+   by release().  The 'closure->user_data' of these callbacks is a list
+   of length 1, which lives as long as the closure and contains the
+   current info tuple.  Rebinding only replaces this item; the libffi
+   preparation is done once per closure.  invoke_pool_callback() reads
+   the item only after it has got the GIL, and general_invoke_callback()
+   keeps it alive for the duration of the call; so rebinding is safe
+   even if another thread is calling the callback at the same time. */
+
+typedef struct {
+    PyObject_HEAD
+    CTypeDescrObject *cp_ct;
+    PyObject *cp_free;          /* list of available callbacks */
+    PyObject *cp_in_use;        /* {address: callback} of acquired ones */
+    PyObject *cp_zero_rawerr;   /* 'py_rawerr' shared when error=None */
+    PyObject *cp_released;      /* info tuple of released callbacks */
+    Py_ssize_t cp_size;         /* total number of callbacks created */
+} CallbackPoolObject;
+
+static PyTypeObject CallbackPool_Type;
+
+static PyObject *_cbpool_released_callback(PyObject *self, PyObject *args)
+{
+    PyErr_SetString(PyExc_RuntimeError,
+                    "this callback was released to its callback pool");
+    return NULL;
+}
+
+static PyMethodDef _cbpool_released_callback_md = {
+    "released_callback", (PyCFunction)_cbpool_released_callback,
+    METH_VARARGS };
+
+static void invoke_pool_callback(ffi_cif *cif, void *result, void **args,
+                                 void *userdata)
+{
+    save_errno();
+    {
+        PyGILState_STATE state = gil_ensure();
+        PyObject *infotuple = PyList_GET_ITEM((PyObject *)userdata, 0);
+        general_invoke_callback(1, result, (char *)args, infotuple);
+        gil_release(state);
+    }
+    restore_errno();
+}
+
+static void closure_set_infotuple(CDataObject_closure *cd, PyObject *infotuple)
+{
+    PyObject *holder = (PyObject *)cd->closure->user_data;
+    PyObject *old = PyList_GET_ITEM(holder, 0);
+    Py_INCREF(infotuple);
+    PyList_SET_ITEM(holder, 0, infotuple);
+    Py_DECREF(old);
+}
+
+static PyObject *cbpool_new_callback(CallbackPoolObject *pool)
+{
+    PyObject *holder, *cd;
+
+    holder = PyList_New(1);
+    if (holder == NULL)
+        return NULL;
+    Py_INCREF(pool->cp_released);
+    PyList_SET_ITEM(holder, 0, pool->cp_released);
+    cd = make_callback_closure(pool->cp_ct, holder, invoke_pool_callback);
+    if (cd == NULL)
+        return NULL;
+    pool->cp_size++;
+    return cd;
+}
+
+static PyObject *b_callback_pool(PyObject *self, PyObject *args)
+{
+    CTypeDescrObject *ct;
+    CallbackPoolObject *pool;
+    PyObject *released_fn, *cd;
+    Py_ssize_t i, size = 0;
+
+    if (!PyArg_ParseTuple(args, "O!|n:callback_pool", &CTypeDescr_Type, &ct,
+                          &size))
+        return NULL;
+    if (size < 0) {
+        PyErr_SetString(PyExc_ValueError, "negative size");
+        return NULL;
+    }
+
+    pool = PyObject_GC_New(CallbackPoolObject, &CallbackPool_Type);
+    if (pool == NULL)
+        return NULL;
+    Py_INCREF(ct);
+    pool->cp_ct = ct;
+    pool->cp_free = PyList_New(0);
+    pool->cp_in_use = PyDict_New();
+    pool->cp_zero_rawerr = NULL;
+    pool->cp_released = NULL;
+    pool->cp_size = 0;
+    PyObject_GC_Track(pool);
+    if (pool->cp_free == NULL || pool->cp_in_use == NULL)
+        goto error;
+
+    released_fn = PyCFunction_New(&_cbpool_released_callback_md, NULL);
+    if (released_fn == NULL)
+        goto error;
+    pool->cp_released = prepare_callback_info_tuple(ct, released_fn, Py_None,
+                                                    Py_None, 1);
+    Py_DECREF(released_fn);
+    if (pool->cp_released == NULL)
+        goto error;
+    pool->cp_zero_rawerr = PyTuple_GET_ITEM(pool->cp_released, 2);
+    Py_INCREF(pool->cp_zero_rawerr);
+
+    for (i = 0; i < size; i++) {
+        cd = cbpool_new_callback(pool);
+        if (cd == NULL)
+            goto error;
+        if (PyList_Append(pool->cp_free, cd) < 0) {
+            Py_DECREF(cd);
+            goto error;
+        }
+        Py_DECREF(cd);
+    }
+    return (PyObject *)pool;
+
+ error:
+    Py_DECREF(pool);
+    return NULL;
+}
+
+static PyObject *cbpool_acquire(CallbackPoolObject *pool, PyObject *args,
+                                PyObject *kwds)
+{
+    PyObject *ob, *error_ob = Py_None, *onerror_ob = Py_None;
+    PyObject *py_rawerr, *infotuple, *cd, *key;
+    Py_ssize_t n;
+    int err;
+    static char *keywords[] = {"python_callable", "error", "onerror", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O|OO:acquire", keywords,
+                                     &ob, &error_ob, &onerror_ob))
+        return NULL;
+
+    if (error_ob == Py_None && PyCallable_Check(ob) &&
+            (onerror_ob == Py_None || PyCallable_Check(onerror_ob))) {
+        /* fast path: the same as prepare_callback_info_tuple(), but
+           sharing the zero 'py_rawerr' */
+        py_rawerr = pool->cp_zero_rawerr;
+        infotuple = PyTuple_Pack(4, pool->cp_ct, ob, py_rawerr, onerror_ob);
+    }
+    else {
+        infotuple = prepare_callback_info_tuple(pool->cp_ct, ob, error_ob,
+                                                onerror_ob, 1);
+    }
+    if (infotuple == NULL)
+        return NULL;
+
+    n = PyList_GET_SIZE(pool->cp_free);
+    if (n > 0) {
+        cd = PyList_GET_ITEM(pool->cp_free, n - 1);
+        Py_INCREF(cd);
+        if (PyList_SetSlice(pool->cp_free, n - 1, n, NULL) < 0)
+            goto error;
+    }
+    else {
+        /* the pool is empty: grow it */
+        cd = cbpool_new_callback(pool);
+        if (cd == NULL) {
+            Py_DECREF(infotuple);
+            return NULL;
+        }
+    }
+    key = PyLong_FromVoidPtr(cd);
+    if (key == NULL)
+        goto error;
+    err = PyDict_SetItem(pool->cp_in_use, key, cd);
+    Py_DECREF(key);
+    if (err < 0)
+        goto error;
+    closure_set_infotuple((CDataObject_closure *)cd, infotuple);
+    Py_DECREF(infotuple);
+    return cd;
+
+ error:
+    Py_DECREF(cd);
+    Py_DECREF(infotuple);
+    return NULL;
+}
+
+static PyObject *cbpool_release(CallbackPoolObject *pool, PyObject *cd)
+{
+    PyObject *key;
+    int err;
+
+    /* look up 'cd' by identity: cdata objects compare equal if they
+       have the same address, e.g. ffi.cast() of a callback */
+    if (Py_TYPE(cd) != &CDataOwningGC_Type)
+        goto not_acquired;
+    key = PyLong_FromVoidPtr(cd);
+    if (key == NULL)
+        return NULL;
+    if (PyDict_GetItem(pool->cp_in_use, key) != cd) {
+        Py_DECREF(key);
+        goto not_acquired;
+    }
+    err = PyDict_DelItem(pool->cp_in_use, key);
+    Py_DECREF(key);
+    if (err < 0)
+        return NULL;
+    /* 'cd' is a callback created by this pool, because it was in
+       'cp_in_use' */
+    closure_set_infotuple((CDataObject_closure *)cd, pool->cp_released);
+    if (PyList_Append(pool->cp_free, cd) < 0)
+        return NULL;
+    Py_INCREF(Py_None);
+    return Py_None;
+
+ not_acquired:
+    PyErr_SetString(PyExc_ValueError,
+                    "this callback was not acquired from this pool, "
+                    "or was already released");
+    return NULL;
+}
+
+static PyObject *cbpool_get_size(CallbackPoolObject *pool, void *closure)
+{
+    return PyInt_FromSsize_t(pool->cp_size);
+}
+
+static PyObject *cbpool_get_available(CallbackPoolObject *pool, void *closure)
+{
+    return PyInt_FromSsize_t(PyList_GET_SIZE(pool->cp_free));
+}
+
+static PyObject *cbpool_get_ctype(CallbackPoolObject *pool, void *closure)
+{
+    Py_INCREF(pool->cp_ct);
+    return (PyObject *)pool->cp_ct;
+}
+
+static PyObject *cbpool_repr(CallbackPoolObject *pool)
+{
+    return PyText_FromFormat("<_cffi_backend.CallbackPool '%s' %zd/%zd>",
+                             pool->cp_ct->ct_name,
+                             PyList_GET_SIZE(pool->cp_free), pool->cp_size);
+}
+
+static int cbpool_traverse(CallbackPoolObject *pool, visitproc visit,
+                           void *arg)
+{
+    Py_VISIT(pool->cp_ct);
+    Py_VISIT(pool->cp_free);
+    Py_VISIT(pool->cp_in_use);
+    Py_VISIT(pool->cp_zero_rawerr);
+    Py_VISIT(pool->cp_released);
+    return 0;
+}
+
+static int cbpool_clear(CallbackPoolObject *pool)
+{
+    Py_CLEAR(pool->cp_free);
+    Py_CLEAR(pool->cp_in_use);
+    Py_CLEAR(pool->cp_zero_rawerr);
+    Py_CLEAR(pool->cp_released);
+    return 0;
+}
+
+static void cbpool_dealloc(CallbackPoolObject *pool)
+{
+    PyObject_GC_UnTrack(pool);
+    cbpool_clear(pool);
+    Py_DECREF(pool->cp_ct);
+    PyObject_GC_Del(pool);
+}
+
+static PyMethodDef cbpool_methods[] = {
+    {"acquire", (PyCFunction)cbpool_acquire, METH_VARARGS | METH_KEYWORDS},
+    {"release", (PyCFunction)cbpool_release, METH_O},
+    {NULL,      NULL}           /* sentinel */
+};
+
+static PyGetSetDef cbpool_getsets[] = {
+    {"size", (getter)cbpool_get_size, NULL, "number of callbacks created"},
+    {"available", (getter)cbpool_get_available, NULL,
+                                  "number of callbacks not acquired"},
+    {"ctype", (getter)cbpool_get_ctype, NULL, "the function pointer type"},
+    {NULL}                        /* sentinel */
+};
+
+static PyTypeObject CallbackPool_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    "_cffi_backend.CallbackPool",       /* tp_name */
+    sizeof(CallbackPoolObject),         /* tp_basicsize */
+    0,                                  /* tp_itemsize */
+    /* methods */
+    (destructor)cbpool_dealloc,         /* tp_dealloc */
+    0,                                  /* tp_print */
+    0,                                  /* tp_getattr */
+    0,                                  /* tp_setattr */
+    0,                                  /* tp_compare */
+    (reprfunc)cbpool_repr,              /* tp_repr */
+    0,                                  /* tp_as_number */
+    0,                                  /* tp_as_sequence */
+    0,                                  /* tp_as_mapping */
+    0,                                  /* tp_hash */
+    0,                                  /* tp_call */
+    0,                                  /* tp_str */
+    PyObject_GenericGetAttr,            /* tp_getattro */
+    0,                                  /* tp_setattro */
+    0,                                  /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC, /* tp_flags */
+    0,                                  /* tp_doc */
+    (traverseproc)cbpool_traverse,      /* tp_traverse */
+    (inquiry)cbpool_clear,              /* tp_clear */
+    0,                                  /* tp_richcompare */
+    0,                                  /* tp_weaklistoffset */
+    0,                                  /* tp_iter */
+    0,                                  /* tp_iternext */
+    cbpool_methods,                     /* tp_methods */
+    0,                                  /* tp_members */
+    cbpool_getsets,                     /* tp_getset */
+};
+
+static PyObject *b_new_enum_type(PyObject *self, PyObject *args)
+{
+    char *ename;
+    PyObject *enumerators, *enumvalues;
+    PyObject *dict1 = NULL, *dict2 = NULL, *combined = NULL, *tmpkey = NULL;
+    int name_size;
+    CTypeDescrObject *td, *basetd;
+    Py_ssize_t i, n;
+
+    if (!PyArg_ParseTuple(args, "sO!O!O!:new_enum_type",
+                          &ename,
+                          &PyTuple_Type, &enumerators,
+                          &PyTuple_Type, &enumvalues,
+                          &CTypeDescr_Type, &basetd))
+        return NULL;
+
+    n = PyTuple_GET_SIZE(enumerators);
+    if (n != PyTuple_GET_SIZE(enumvalues)) {
+        PyErr_SetString(PyExc_ValueError,
+                        "tuple args must have the same size");
+        return NULL;
+    }
+
+    if (!(basetd->ct_flags & (CT_PRIMITIVE_SIGNED|CT_PRIMITIVE_UNSIGNED))) {
+        PyErr_SetString(PyExc_TypeError,
+                        "expected a primitive signed or unsigned base type");
+        return NULL;
+    }
+
+    dict1 = PyDict_New();
+    if (dict1 == NULL)
+        goto error;
+    dict2 = PyDict_New();
+    if (dict2 == NULL)
+        goto error;
+
+    for (i=n; --i >= 0; ) {
+        long long lvalue;
+        PyObject *value = PyTuple_GET_ITEM(enumvalues, i);
+        tmpkey = PyTuple_GET_ITEM(enumerators, i);
+        Py_INCREF(tmpkey);
+        if (!PyText_Check(tmpkey)) {
+#if PY_MAJOR_VERSION < 3
+            if (PyUnicode_Check(tmpkey)) {
                 const char *text = PyText_AsUTF8(tmpkey);
                 if (text == NULL)
                     goto error;
@@ -6356,6 +7523,80 @@ static PyObject *b_string(PyObject *self, PyObject *args, PyObject *kwds)
     return NULL;
 }
 
+static PyObject *_unpack_as_array(char *src, CTypeDescrObject *ctitem,
+                                  Py_ssize_t length, PyObject *keepalive)
+{
+    /* Returns an 'array.array' with a copy of the 'length' items of
+       type 'ctitem' at 'src'.  Only for primitive integer and float
+       types for which the 'array' module has a matching typecode. */
+    static PyObject *array_type = NULL;
+    char typecode[2] = {0, 0};
+    Py_ssize_t itemsize = ctitem->ct_size;
+    PyObject *result, *buffer, *x;
+
+    if (ctitem->ct_flags & CT_IS_BOOL)
+        ;
+    else if (ctitem->ct_flags & CT_PRIMITIVE_SIGNED) {
+        if (itemsize == sizeof(signed char))         typecode[0] = 'b';
+        else if (itemsize == sizeof(short))          typecode[0] = 'h';
+        else if (itemsize == sizeof(int))            typecode[0] = 'i';
+        else if (itemsize == sizeof(long))           typecode[0] = 'l';
+#if PY_MAJOR_VERSION >= 3
+        else if (itemsize == sizeof(PY_LONG_LONG))   typecode[0] = 'q';
+#endif
+    }
+    else if (ctitem->ct_flags & CT_PRIMITIVE_UNSIGNED) {
+        if (itemsize == sizeof(unsigned char))       typecode[0] = 'B';
+        else if (itemsize == sizeof(unsigned short)) typecode[0] = 'H';
+        else if (itemsize == sizeof(unsigned int))   typecode[0] = 'I';
+        else if (itemsize == sizeof(unsigned long))  typecode[0] = 'L';
+#if PY_MAJOR_VERSION >= 3
+        else if (itemsize == sizeof(unsigned PY_LONG_LONG)) typecode[0] = 'Q';
+#endif
+    }
+    else if ((ctitem->ct_flags & CT_PRIMITIVE_FLOAT) &&
+             !(ctitem->ct_flags & CT_IS_LONGDOUBLE)) {
+        if (itemsize == sizeof(double))              typecode[0] = 'd';
+        else if (itemsize == sizeof(float))          typecode[0] = 'f';
+    }
+    if (typecode[0] == 0) {
+        PyErr_Format(PyExc_TypeError,
+                     "cannot unpack items of type '%s' as an array.array",
+                     ctitem->ct_name);
+        return NULL;
+    }
+
+    if (array_type == NULL) {
+        PyObject *array_module = PyImport_ImportModule("array");
+        if (array_module == NULL)
+            return NULL;
+        array_type = PyObject_GetAttrString(array_module, "array");
+        Py_DECREF(array_module);
+        if (array_type == NULL)
+            return NULL;
+    }
+    result = PyObject_CallFunction(array_type, "s", typecode);
+    if (result == NULL)
+        return NULL;
+    buffer = minibuffer_new(src, length * itemsize, keepalive);
+    if (buffer == NULL) {
+        Py_DECREF(result);
+        return NULL;
+    }
+#if PY_MAJOR_VERSION >= 3
+    x = PyObject_CallMethod(result, "frombytes", "O", buffer);
+#else
+    x = PyObject_CallMethod(result, "fromstring", "O", buffer);
+#endif
+    Py_DECREF(buffer);
+    if (x == NULL) {
+        Py_DECREF(result);
+        return NULL;
+    }
+    Py_DECREF(x);
+    return result;
+}
+
 static PyObject *b_unpack(PyObject *self, PyObject *args, PyObject *kwds)
 {
     CDataObject *cd;
@@ -6363,11 +7604,11 @@ static PyObject *b_unpack(PyObject *self, PyObject *args, PyObject *kwds)
     Py_ssize_t i, length, itemsize;
     PyObject *result;
     char *src;
-    int casenum;
-    static char *keywords[] = {"cdata", "length", NULL};
+    int casenum, as_array = 0;
+    static char *keywords[] = {"cdata", "length", "as_array", NULL};
 
-    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O!n:unpack", keywords,
-                                     &CData_Type, &cd, &length))
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O!n|i:unpack", keywords,
+                                     &CData_Type, &cd, &length, &as_array))
         return NULL;
 
     if (!(cd->c_type->ct_flags & (CT_ARRAY|CT_POINTER))) {
@@ -6404,6 +7645,16 @@ static PyObject *b_unpack(PyObject *self, PyObject *args, PyObject *kwds)
         }
     }
 
+    if (as_array) {
+        if (ctitem->ct_size < 0) {
+            PyErr_Format(PyExc_ValueError,
+                         "'%s' points to items of unknown size",
+                         cd->c_type->ct_name);
+            return NULL;
+        }
+        return _unpack_as_array(cd->c_data, ctitem, length, (PyObject *)cd);
+    }
+
     /* else, the result is a list.  This implementation should be
        equivalent to but much faster than '[p[i] for i in range(length)]'.
        (Note that on PyPy, 'list(p[0:length])' should be equally fast,
@@ -6502,16 +7753,149 @@ static PyObject *b_unpack(PyObject *self, PyObject *args, PyObject *kwds)
     return result;
 }
 
+static int _pep3118_append(PyObject **pfmt, const char *piece)
+{
+    PyBytes_ConcatAndDel(pfmt, PyBytes_FromString(piece));
+    return *pfmt != NULL ? 0 : -1;
+}
+
+static const char *_pep3118_primitive_code(CTypeDescrObject *ct)
+{
+    Py_ssize_t size = ct->ct_size;
+
+    if (ct->ct_flags & CT_IS_BOOL)
+        return "?";
+    if (ct->ct_flags & CT_PRIMITIVE_CHAR) {
+        if (size == 1) return "c";
+        if (size == 2) return "u";
+        if (size == 4) return "w";
+    }
+    else if (ct->ct_flags & CT_PRIMITIVE_SIGNED) {
+        if (size == sizeof(signed char))                return "b";
+        if (size == sizeof(short))                      return "h";
+        if (size == sizeof(int))                        return "i";
+        if (size == sizeof(long))                       return "l";
+        if (size == sizeof(PY_LONG_LONG))               return "q";
+    }
+    else if (ct->ct_flags & CT_PRIMITIVE_UNSIGNED) {
+        if (size == sizeof(unsigned char))              return "B";
+        if (size == sizeof(unsigned short))             return "H";
+        if (size == sizeof(unsigned int))               return "I";
+        if (size == sizeof(unsigned long))              return "L";
+        if (size == sizeof(unsigned PY_LONG_LONG))      return "Q";
+    }
+    else if (ct->ct_flags & CT_PRIMITIVE_FLOAT) {
+        if (ct->ct_flags & CT_IS_LONGDOUBLE)            return "g";
+        if (size == sizeof(double))                     return "d";
+        if (size == sizeof(float))                      return "f";
+    }
+    else if (ct->ct_flags & CT_PRIMITIVE_COMPLEX) {
+        if (size == 2 * sizeof(double))                 return "Zd";
+        if (size == 2 * sizeof(float))                  return "Zf";
+    }
+    return NULL;
+}
+
+static int _pep3118_format(PyObject **pfmt, CTypeDescrObject *ct)
+{
+    /* Append to '*pfmt' the PEP 3118 format string describing 'ct'.
+       Structs are described field by field with explicit padding, in
+       the '^' mode (native sizes, no implicit alignment); the bytes
+       used by bitfields are given as padding, too. */
+    char piece[64];
+    const char *code;
+
+    if (ct->ct_flags & CT_PRIMITIVE_ANY) {
+        code = _pep3118_primitive_code(ct);
+        if (code != NULL)
+            return _pep3118_append(pfmt, code);
+    }
+    else if (ct->ct_flags & (CT_POINTER | CT_FUNCTIONPTR)) {
+        return _pep3118_append(pfmt, "P");
+    }
+    else if ((ct->ct_flags & CT_ARRAY) && ct->ct_length >= 0) {
+        /* a multidimensional array like 'int[2][3]' gives "(2,3)i" */
+        if (_pep3118_append(pfmt, "(") < 0)
+            return -1;
+        while (1) {
+            sprintf(piece, "%zd", ct->ct_length);
+            if (_pep3118_append(pfmt, piece) < 0)
+                return -1;
+            ct = ct->ct_itemdescr;
+            if (!(ct->ct_flags & CT_ARRAY) || ct->ct_length < 0)
+                break;
+            if (_pep3118_append(pfmt, ",") < 0)
+                return -1;
+        }
+        if (_pep3118_append(pfmt, ")") < 0)
+            return -1;
+        return _pep3118_format(pfmt, ct);
+    }
+    else if (ct->ct_flags & CT_STRUCT) {
+        CFieldObject *cf;
+        Py_ssize_t position = 0;
+        int res = force_lazy_struct(ct);
+
+        if (res < 0)
+            return -1;
+        if (res == 0)
+            goto unsupported;    /* opaque */
+        if (_pep3118_append(pfmt, "T{^") < 0)
+            return -1;
+        for (cf = (CFieldObject *)ct->ct_extra; cf != NULL;
+             cf = cf->cf_next) {
+            if (cf->cf_bitshift != BS_REGULAR)
+                continue;     /* bitfields and 'type[]' fields */
+            if (cf->cf_offset < position) {
+                /* overlapping fields, from an anonymous union */
+                PyErr_Format(PyExc_TypeError,
+                             "cannot describe '%s' with a PEP 3118 "
+                             "format: it contains overlapping fields",
+                             ct->ct_name);
+                return -1;
+            }
+            if (cf->cf_offset > position) {
+                sprintf(piece, "%zdx", cf->cf_offset - position);
+                if (_pep3118_append(pfmt, piece) < 0)
+                    return -1;
+            }
+            if (_pep3118_format(pfmt, cf->cf_type) < 0)
+                return -1;
+            if (_pep3118_append(pfmt, ":") < 0 ||
+                _pep3118_append(pfmt, PyText_AS_UTF8(
+                                          get_field_name(ct, cf))) < 0 ||
+                _pep3118_append(pfmt, ":") < 0)
+                return -1;
+            position = cf->cf_offset + cf->cf_type->ct_size;
+        }
+        if (ct->ct_size > position) {
+            sprintf(piece, "%zdx", ct->ct_size - position);
+            if (_pep3118_append(pfmt, piece) < 0)
+                return -1;
+        }
+        return _pep3118_append(pfmt, "}");
+    }
+ unsupported:
+    PyErr_Format(PyExc_TypeError,
+                 "cannot describe '%s' with a PEP 3118 format",
+                 ct->ct_name);
+    return -1;
+}
+
 static PyObject *
 b_buffer_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
 {
     /* this is the constructor of the type implemented in minibuffer.h */
     CDataObject *cd;
     Py_ssize_t size = -1;
-    static char *keywords[] = {"cdata", "size", NULL};
+    int typed = 0;
+    MiniBufferObj *mb;
+    CTypeDescrObject *ctitem;
+    PyObject *format;
+    static char *keywords[] = {"cdata", "size", "typed", NULL};
 
-    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O!|n:buffer", keywords,
-                                     &CData_Type, &cd, &size))
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O!|ni:buffer", keywords,
+                                     &CData_Type, &cd, &size, &typed))
         return NULL;
 
     if (size < 0)
@@ -6538,7 +7922,39 @@ b_buffer_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
         return NULL;
     }
     /*WRITE(cd->c_data, size)*/
-    return minibuffer_new(cd->c_data, size, (PyObject *)cd);
+    if (!typed)
+        return minibuffer_new(cd->c_data, size, (PyObject *)cd);
+
+    ctitem = cd->c_type->ct_itemdescr;
+    if (ctitem->ct_size <= 0) {
+        PyErr_Format(PyExc_TypeError,
+                     "cannot make a typed buffer of items of type '%s'",
+                     ctitem->ct_name);
+        return NULL;
+    }
+    if (size % ctitem->ct_size != 0) {
+        PyErr_Format(PyExc_ValueError,
+                     "buffer size (%zd bytes) is not a multiple of "
+                     "sizeof('%s') = %zd", size, ctitem->ct_name,
+                     ctitem->ct_size);
+        return NULL;
+    }
+    format = PyBytes_FromString("");
+    if (format == NULL)
+        return NULL;
+    if (_pep3118_format(&format, ctitem) < 0) {
+        Py_XDECREF(format);
+        return NULL;
+    }
+    mb = (MiniBufferObj *)minibuffer_new(cd->c_data, size, (PyObject *)cd);
+    if (mb == NULL) {
+        Py_DECREF(format);
+        return NULL;
+    }
+    mb->mb_format = format;
+    mb->mb_itemsize = ctitem->ct_size;
+    mb->mb_nitems = size / ctitem->ct_size;
+    return (PyObject *)mb;
 }
 
 static PyObject *b_get_errno(PyObject *self, PyObject *noarg)
@@ -6583,54 +7999,324 @@ static PyObject *newp_handle(CTypeDescrObject *ct_voidp, PyObject *x)
     return (PyObject *)cd;
 }
 
-static PyObject *b_newp_handle(PyObject *self, PyObject *args)
+static PyObject *b_newp_handle(PyObject *self, PyObject *args)
+{
+    CTypeDescrObject *ct;
+    PyObject *x;
+    if (!PyArg_ParseTuple(args, "O!O", &CTypeDescr_Type, &ct, &x))
+        return NULL;
+
+    if (!(ct->ct_flags & CT_IS_VOID_PTR)) {
+        PyErr_Format(PyExc_TypeError, "needs 'void *', got '%s'", ct->ct_name);
+        return NULL;
+    }
+
+    return newp_handle(ct, x);
+}
+
+static PyObject *b_from_handle(PyObject *self, PyObject *arg)
+{
+    CTypeDescrObject *ct;
+    CDataObject_own_structptr *orgcd;
+    PyObject *x;
+    if (!CData_Check(arg)) {
+        PyErr_SetString(PyExc_TypeError, "expected a 'cdata' object");
+        return NULL;
+    }
+    ct = ((CDataObject *)arg)->c_type;
+    if (!(ct->ct_flags & CT_IS_VOIDCHAR_PTR)) {
+        PyErr_Format(PyExc_TypeError,
+                     "expected a 'cdata' object with a 'void *' out of "
+                     "new_handle(), got '%s'", ct->ct_name);
+        return NULL;
+    }
+    orgcd = (CDataObject_own_structptr *)((CDataObject *)arg)->c_data;
+    if (!orgcd) {
+        PyErr_SetString(PyExc_RuntimeError,
+                        "cannot use from_handle() on NULL pointer");
+        return NULL;
+    }
+    if (Py_REFCNT(orgcd) <= 0 || Py_TYPE(orgcd) != &CDataOwningGC_Type) {
+        Py_FatalError("ffi.from_handle() detected that the address passed "
+                      "points to garbage. If it is really the result of "
+                      "ffi.new_handle(), then the Python object has already "
+                      "been garbage collected");
+    }
+    x = orgcd->structobj;
+    Py_INCREF(x);
+    return x;
+}
+
+/* A handle table: an alternative to new_handle()/from_handle() for
+   programs that pass many short-lived handles through C code.  The
+   handles are not addresses of cdata objects, but integers cast to
+   'void *': the low HT_INDEX_BITS bits are the index of a slot plus one
+   (so that a handle is never NULL), and the high bits are the
+   generation of that slot.  The generation is incremented every time
+   the slot is released, so that a stale handle is detected and raises
+   ValueError instead of crashing.  The handles must be released
+   explicitly; no object is allocated per handle apart from the 'void *'
+   cdata returned by new(). */
+
+#define HT_INDEX_BITS   (sizeof(void *) >= 8 ? 32 : 24)
+#define HT_INDEX_MASK   (((size_t)1 << HT_INDEX_BITS) - 1)
+#define HT_GEN_MASK     (((size_t)-1) >> HT_INDEX_BITS)
+#define HT_MAX_SLOTS    ((Py_ssize_t)(HT_INDEX_MASK - 1))
+
+typedef struct {
+    PyObject *hs_obj;           /* NULL if the slot is free */
+    size_t hs_generation;
+    Py_ssize_t hs_next_free;    /* if free: index of the next free slot */
+} handle_slot_t;
+
+typedef struct {
+    PyObject_HEAD
+    CTypeDescrObject *ht_ct;    /* 'void *' */
+    handle_slot_t *ht_slots;
+    Py_ssize_t ht_size;         /* number of slots */
+    Py_ssize_t ht_used;         /* number of live handles */
+    Py_ssize_t ht_free;         /* first free slot, or -1 */
+} HandleTableObject;
+
+static PyTypeObject HandleTable_Type;
+
+static int htable_grow(HandleTableObject *ht)
+{
+    handle_slot_t *slots;
+    Py_ssize_t i, newsize;
+
+    if (ht->ht_size >= HT_MAX_SLOTS) {
+        PyErr_SetString(PyExc_MemoryError, "the handle table is full");
+        return -1;
+    }
+    newsize = ht->ht_size < 8 ? 16 : ht->ht_size * 2;
+    if (newsize > HT_MAX_SLOTS)
+        newsize = HT_MAX_SLOTS;
+    slots = PyMem_Realloc(ht->ht_slots, newsize * sizeof(handle_slot_t));
+    if (slots == NULL) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    /* chain the new slots in the free list, lowest index first */
+    for (i = newsize - 1; i >= ht->ht_size; i--) {
+        slots[i].hs_obj = NULL;
+        slots[i].hs_generation = 0;
+        slots[i].hs_next_free = ht->ht_free;
+        ht->ht_free = i;
+    }
+    ht->ht_slots = slots;
+    ht->ht_size = newsize;
+    return 0;
+}
+
+static handle_slot_t *htable_lookup(HandleTableObject *ht, PyObject *arg)
+{
+    size_t value, index;
+    handle_slot_t *slot;
+
+    if (CData_Check(arg) &&
+            (((CDataObject *)arg)->c_type->ct_flags & CT_POINTER)) {
+        value = (size_t)((CDataObject *)arg)->c_data;
+    }
+    else if (PyIntOrLong_Check(arg)) {
+        unsigned PY_LONG_LONG v = _my_PyLong_AsUnsignedLongLong(arg, 1);
+        if (v == (unsigned PY_LONG_LONG)-1 && PyErr_Occurred())
+            return NULL;
+        value = (size_t)v;
+        if ((unsigned PY_LONG_LONG)value != v)
+            goto invalid;
+    }
+    else {
+        PyErr_Format(PyExc_TypeError,
+                     "expected a pointer cdata or an integer, got '%.200s'",
+                     Py_TYPE(arg)->tp_name);
+        return NULL;
+    }
+
+    index = (value & HT_INDEX_MASK) - 1;     /* wraps around if 0 */
+    if (index >= (size_t)ht->ht_size)
+        goto invalid;
+    slot = &ht->ht_slots[index];
+    if (slot->hs_obj == NULL ||
+            slot->hs_generation != (value >> HT_INDEX_BITS))
+        goto invalid;
+    return slot;
+
+ invalid:
+    PyErr_SetString(PyExc_ValueError,
+                    "invalid handle, or handle already released");
+    return NULL;
+}
+
+static PyObject *b_handle_table(PyObject *self, PyObject *args)
+{
+    CTypeDescrObject *ct;
+    HandleTableObject *ht;
+
+    if (!PyArg_ParseTuple(args, "O!:handle_table", &CTypeDescr_Type, &ct))
+        return NULL;
+    if (!(ct->ct_flags & CT_IS_VOID_PTR)) {
+        PyErr_Format(PyExc_TypeError, "needs 'void *', got '%s'", ct->ct_name);
+        return NULL;
+    }
+
+    ht = PyObject_GC_New(HandleTableObject, &HandleTable_Type);
+    if (ht == NULL)
+        return NULL;
+    Py_INCREF(ct);
+    ht->ht_ct = ct;
+    ht->ht_slots = NULL;
+    ht->ht_size = 0;
+    ht->ht_used = 0;
+    ht->ht_free = -1;
+    PyObject_GC_Track(ht);
+    return (PyObject *)ht;
+}
+
+static PyObject *htable_new(HandleTableObject *ht, PyObject *x)
+{
+    Py_ssize_t index;
+    handle_slot_t *slot;
+    size_t value;
+
+    if (ht->ht_free < 0) {
+        if (htable_grow(ht) < 0)
+            return NULL;
+    }
+    index = ht->ht_free;
+    slot = &ht->ht_slots[index];
+    ht->ht_free = slot->hs_next_free;
+    Py_INCREF(x);
+    slot->hs_obj = x;
+    ht->ht_used++;
+
+    value = (slot->hs_generation << HT_INDEX_BITS) | (size_t)(index + 1);
+    return new_simple_cdata((char *)value, ht->ht_ct);
+}
+
+static PyObject *htable_get(HandleTableObject *ht, PyObject *arg)
+{
+    handle_slot_t *slot = htable_lookup(ht, arg);
+    if (slot == NULL)
+        return NULL;
+    Py_INCREF(slot->hs_obj);
+    return slot->hs_obj;
+}
+
+static PyObject *htable_release(HandleTableObject *ht, PyObject *arg)
+{
+    PyObject *x;
+    handle_slot_t *slot = htable_lookup(ht, arg);
+    if (slot == NULL)
+        return NULL;
+    x = slot->hs_obj;      /* pass the reference to the caller */
+    slot->hs_obj = NULL;
+    slot->hs_generation = (slot->hs_generation + 1) & HT_GEN_MASK;
+    slot->hs_next_free = ht->ht_free;
+    ht->ht_free = slot - ht->ht_slots;
+    ht->ht_used--;
+    return x;
+}
+
+static Py_ssize_t htable_length(HandleTableObject *ht)
 {
-    CTypeDescrObject *ct;
-    PyObject *x;
-    if (!PyArg_ParseTuple(args, "O!O", &CTypeDescr_Type, &ct, &x))
-        return NULL;
+    return ht->ht_used;
+}
 
-    if (!(ct->ct_flags & CT_IS_VOID_PTR)) {
-        PyErr_Format(PyExc_TypeError, "needs 'void *', got '%s'", ct->ct_name);
-        return NULL;
-    }
+static PyObject *htable_get_capacity(HandleTableObject *ht, void *closure)
+{
+    return PyInt_FromSsize_t(ht->ht_size);
+}
 
-    return newp_handle(ct, x);
+static PyObject *htable_repr(HandleTableObject *ht)
+{
+    return PyText_FromFormat("<_cffi_backend.HandleTable %zd/%zd>",
+                             ht->ht_used, ht->ht_size);
 }
 
-static PyObject *b_from_handle(PyObject *self, PyObject *arg)
+static int htable_traverse(HandleTableObject *ht, visitproc visit, void *arg)
 {
-    CTypeDescrObject *ct;
-    CDataObject_own_structptr *orgcd;
-    PyObject *x;
-    if (!CData_Check(arg)) {
-        PyErr_SetString(PyExc_TypeError, "expected a 'cdata' object");
-        return NULL;
-    }
-    ct = ((CDataObject *)arg)->c_type;
-    if (!(ct->ct_flags & CT_IS_VOIDCHAR_PTR)) {
-        PyErr_Format(PyExc_TypeError,
-                     "expected a 'cdata' object with a 'void *' out of "
-                     "new_handle(), got '%s'", ct->ct_name);
-        return NULL;
-    }
-    orgcd = (CDataObject_own_structptr *)((CDataObject *)arg)->c_data;
-    if (!orgcd) {
-        PyErr_SetString(PyExc_RuntimeError,
-                        "cannot use from_handle() on NULL pointer");
-        return NULL;
-    }
-    if (Py_REFCNT(orgcd) <= 0 || Py_TYPE(orgcd) != &CDataOwningGC_Type) {
-        Py_FatalError("ffi.from_handle() detected that the address passed "
-                      "points to garbage. If it is really the result of "
-                      "ffi.new_handle(), then the Python object has already "
-                      "been garbage collected");
-    }
-    x = orgcd->structobj;
-    Py_INCREF(x);
-    return x;
+    Py_ssize_t i;
+    Py_VISIT(ht->ht_ct);
+    for (i = 0; i < ht->ht_size; i++)
+        Py_VISIT(ht->ht_slots[i].hs_obj);
+    return 0;
+}
+
+static int htable_clear(HandleTableObject *ht)
+{
+    /* all the existing handles become invalid, because their index is
+       out of bounds */
+    handle_slot_t *slots = ht->ht_slots;
+    Py_ssize_t i, size = ht->ht_size;
+    ht->ht_slots = NULL;
+    ht->ht_size = 0;
+    ht->ht_used = 0;
+    ht->ht_free = -1;
+    for (i = 0; i < size; i++)
+        Py_XDECREF(slots[i].hs_obj);
+    PyMem_Free(slots);
+    return 0;
+}
+
+static void htable_dealloc(HandleTableObject *ht)
+{
+    PyObject_GC_UnTrack(ht);
+    htable_clear(ht);
+    Py_DECREF(ht->ht_ct);
+    PyObject_GC_Del(ht);
 }
 
+static PySequenceMethods htable_as_sequence = {
+    (lenfunc)htable_length,             /* sq_length */
+};
+
+static PyMethodDef htable_methods[] = {
+    {"new",     (PyCFunction)htable_new,     METH_O},
+    {"get",     (PyCFunction)htable_get,     METH_O},
+    {"release", (PyCFunction)htable_release, METH_O},
+    {NULL,      NULL}           /* sentinel */
+};
+
+static PyGetSetDef htable_getsets[] = {
+    {"capacity", (getter)htable_get_capacity, NULL, "number of slots"},
+    {NULL}                        /* sentinel */
+};
+
+static PyTypeObject HandleTable_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    "_cffi_backend.HandleTable",        /* tp_name */
+    sizeof(HandleTableObject),          /* tp_basicsize */
+    0,                                  /* tp_itemsize */
+    /* methods */
+    (destructor)htable_dealloc,         /* tp_dealloc */
+    0,                                  /* tp_print */
+    0,                                  /* tp_getattr */
+    0,                                  /* tp_setattr */
+    0,                                  /* tp_compare */
+    (reprfunc)htable_repr,              /* tp_repr */
+    0,                                  /* tp_as_number */
+    &htable_as_sequence,                /* tp_as_sequence */
+    0,                                  /* tp_as_mapping */
+    0,                                  /* tp_hash */
+    0,                                  /* tp_call */
+    0,                                  /* tp_str */
+    PyObject_GenericGetAttr,            /* tp_getattro */
+    0,                                  /* tp_setattro */
+    0,                                  /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC, /* tp_flags */
+    0,                                  /* tp_doc */
+    (traverseproc)htable_traverse,      /* tp_traverse */
+    (inquiry)htable_clear,              /* tp_clear */
+    0,                                  /* tp_richcompare */
+    0,                                  /* tp_weaklistoffset */
+    0,                                  /* tp_iter */
+    0,                                  /* tp_iternext */
+    htable_methods,                     /* tp_methods */
+    0,                                  /* tp_members */
+    htable_getsets,                     /* tp_getset */
+};
+
 static int _my_PyObject_GetContiguousBuffer(PyObject *x, Py_buffer *view,
                                             int writable_only)
 {
@@ -6795,6 +8481,420 @@ static PyObject *b_memmove(PyObject *self, PyObject *args, PyObject *kwds)
     return Py_None;
 }
 
+static PyObject *_cpyextfunc_as_cdata(PyObject *x);
+/* forward, implemented in lib_obj.c */
+
+static char *_call_many_array(PyObject *x, CTypeDescrObject *ctitem,
+                              Py_buffer *view, int writable,
+                              Py_ssize_t *plength)
+{
+    /* 'x' must be a cdata pointer or array of 'ctitem', or any
+       contiguous buffer object whose raw data is read as an array of
+       'ctitem'.  Returns the start of the data, and the number of
+       items in '*plength', or -1 if unknown (for cdata pointers). */
+    view->obj = NULL;
+    if (CData_Check(x)) {
+        CDataObject *cd = (CDataObject *)x;
+        if (!(cd->c_type->ct_flags & (CT_POINTER | CT_ARRAY)) ||
+                cd->c_type->ct_itemdescr != ctitem) {
+            PyErr_Format(PyExc_TypeError,
+                         "expected a pointer or array of '%s', got '%s'",
+                         ctitem->ct_name, cd->c_type->ct_name);
+            return NULL;
+        }
+        if (cd->c_type->ct_flags & CT_ARRAY)
+            *plength = get_array_length(cd);
+        else
+            *plength = -1;
+        return cd->c_data;
+    }
+    if (_my_PyObject_GetContiguousBuffer(x, view, writable) < 0)
+        return NULL;
+    if (view->len % ctitem->ct_size != 0) {
+        PyErr_Format(PyExc_ValueError,
+                     "buffer size (%zd bytes) is not a multiple of "
+                     "sizeof('%s') = %zd", view->len, ctitem->ct_name,
+                     ctitem->ct_size);
+        PyBuffer_Release(view);
+        view->obj = NULL;
+        return NULL;
+    }
+    *plength = view->len / ctitem->ct_size;
+    return view->buf;
+}
+
+static PyObject *b_call_many(PyObject *self, PyObject *args, PyObject *kwds)
+{
+    PyObject *func, *arg_arrays, *result_obj = Py_None, *res = NULL;
+    PyObject *funccdata = NULL, *seq = NULL, *signature;
+    CTypeDescrObject *ct, *fresult, *argtype;
+    cif_description_t *cif_descr;
+    Py_ssize_t i, j, nargs = 0, length = -1, known, rsize;
+    Py_buffer *views = NULL;
+    char **bases, *resultbase = NULL, *resultbuf, *resultdata;
+    Py_ssize_t *itemsizes;
+    void **avalue;
+    void (*fn)(void);
+    static char *keywords[] = {"func", "args", "result", "length", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "OO|On:call_many", keywords,
+                                     &func, &arg_arrays, &result_obj,
+                                     &length))
+        return NULL;
+
+    if (CData_Check(func)) {
+        Py_INCREF(func);
+        funccdata = func;
+    }
+    else {
+        /* a built-in function from an out-of-line API mode 'lib' */
+        funccdata = _cpyextfunc_as_cdata(func);
+        if (funccdata == NULL) {
+            if (!PyErr_Occurred())
+                PyErr_Format(PyExc_TypeError,
+                             "expected a cdata function pointer or a "
+                             "function from a 'lib', got '%.200s'",
+                             Py_TYPE(func)->tp_name);
+            return NULL;
+        }
+    }
+    ct = ((CDataObject *)funccdata)->c_type;
+    if (!(ct->ct_flags & CT_FUNCTIONPTR)) {
+        PyErr_Format(PyExc_TypeError, "cdata '%s' is not a function pointer",
+                     ct->ct_name);
+        goto error;
+    }
+    cif_descr = (cif_description_t *)ct->ct_extra;
+    if (cif_descr == NULL || (ct->ct_flags & CT_IS_VARIADIC)) {
+        PyErr_Format(PyExc_NotImplementedError,
+                     "%s: call_many() with unsupported argument or "
+                     "return type or with '...'", ct->ct_name);
+        goto error;
+    }
+    signature = ct->ct_stuff;
+    nargs = PyTuple_GET_SIZE(signature) - 2;
+    fresult = (CTypeDescrObject *)PyTuple_GET_ITEM(signature, 1);
+
+    seq = PySequence_Fast(arg_arrays, "'args' must be a sequence of arrays");
+    if (seq == NULL)
+        goto error;
+    if (PySequence_Fast_GET_SIZE(seq) != nargs) {
+        PyErr_Format(PyExc_TypeError, "'%s' expects %zd arguments, got %zd "
+                     "arrays", ct->ct_name, nargs,
+                     PySequence_Fast_GET_SIZE(seq));
+        goto error;
+    }
+
+    /* one view per argument, plus one for the result */
+    views = PyMem_Malloc((nargs + 1) * sizeof(Py_buffer));
+    if (views == NULL) {
+        PyErr_NoMemory();
+        goto error;
+    }
+    for (j = 0; j <= nargs; j++)
+        views[j].obj = NULL;
+    bases = alloca(nargs * sizeof(char *));
+    itemsizes = alloca(nargs * sizeof(Py_ssize_t));
+    avalue = alloca(nargs * sizeof(void *));
+
+    for (j = 0; j < nargs; j++) {
+        argtype = (CTypeDescrObject *)PyTuple_GET_ITEM(signature, 2 + j);
+        bases[j] = _call_many_array(PySequence_Fast_GET_ITEM(seq, j),
+                                    argtype, &views[j], 0, &known);
+        if (bases[j] == NULL)
+            goto error;
+        itemsizes[j] = argtype->ct_size;
+        if (known < 0)
+            continue;
+        if (length < 0)
+            length = known;
+        else if (known < length) {
+            PyErr_Format(PyExc_ValueError,
+                         "argument array %zd has only %zd items, "
+                         "expected %zd", j + 1, known, length);
+            goto error;
+        }
+    }
+
+    if (fresult->ct_flags & CT_VOID) {
+        if (result_obj != Py_None) {
+            PyErr_Format(PyExc_TypeError,
+                         "'%s' returns void: 'result' must be None",
+                         ct->ct_name);
+            goto error;
+        }
+        rsize = 0;
+    }
+    else {
+        if (result_obj == Py_None) {
+            PyErr_SetString(PyExc_TypeError,
+                            "missing 'result' array for the return values");
+            goto error;
+        }
+        resultbase = _call_many_array(result_obj, fresult, &views[nargs], 1,
+                                      &known);
+        if (resultbase == NULL)
+            goto error;
+        if (length < 0)
+            length = known;
+        else if (known >= 0 && known < length) {
+            PyErr_Format(PyExc_ValueError,
+                         "result array has only %zd items, expected %zd",
+                         known, length);
+            goto error;
+        }
+        rsize = fresult->ct_size;
+    }
+    if (length < 0) {
+        PyErr_SetString(PyExc_ValueError,
+                        "cannot determine the number of calls: give "
+                        "'length' explicitly");
+        goto error;
+    }
+
+    /* libffi writes at least a full 'ffi_arg' for small integer results */
+    i = cif_descr->exchange_size - cif_descr->exchange_offset_arg[0];
+    resultbuf = alloca(i);
+    resultdata = resultbuf;
+#ifdef WORDS_BIGENDIAN
+    if ((fresult->ct_flags & (CT_PRIMITIVE_CHAR | CT_PRIMITIVE_SIGNED |
+                              CT_PRIMITIVE_UNSIGNED)) &&
+            fresult->ct_size < sizeof(ffi_arg))
+        resultdata += (sizeof(ffi_arg) - fresult->ct_size);
+#endif
+    fn = (void (*)(void))(((CDataObject *)funccdata)->c_data);
+
+    Py_BEGIN_ALLOW_THREADS
+    restore_errno();
+    for (i = 0; i < length; i++) {
+        for (j = 0; j < nargs; j++)
+            avalue[j] = bases[j] + i * itemsizes[j];
+        ffi_call(&cif_descr->cif, fn, resultbuf, avalue);
+        if (rsize > 0)
+            memcpy(resultbase + i * rsize, resultdata, rsize);
+    }
+    save_errno();
+    Py_END_ALLOW_THREADS
+
+    Py_INCREF(Py_None);
+    res = Py_None;
+    /* fall-through */
+
+ error:
+    if (views != NULL) {
+        for (j = 0; j <= nargs; j++)
+            if (views[j].obj != NULL)
+                PyBuffer_Release(&views[j]);
+        PyMem_Free(views);
+    }
+    Py_XDECREF(seq);
+    Py_XDECREF(funccdata);
+    return res;
+}
+
+static CFieldObject *_unpack_field_lookup(CTypeDescrObject *ct,
+                                          PyObject *field,
+                                          Py_ssize_t *offset)
+{
+    /* Find the field 'field' of the struct or union 'ct'.  It can be
+       a dotted path like "a.b.c" to go inside nested structs or unions.
+       Does not return a new reference! */
+    const char *path, *p;
+    CFieldObject *cf = NULL;
+
+    path = PyText_AsUTF8(field);
+    if (path == NULL)
+        return NULL;
+    *offset = 0;
+    while (1) {
+        PyObject *name;
+
+        if (!(ct->ct_flags & (CT_STRUCT|CT_UNION))) {
+            PyErr_Format(PyExc_TypeError,
+                         "field path '%s': expected a struct or union "
+                         "ctype, got '%s'", path, ct->ct_name);
+            return NULL;
+        }
+        if (force_lazy_struct(ct) <= 0) {
+            if (!PyErr_Occurred())
+                PyErr_Format(PyExc_TypeError, "'%s' is opaque",
+                             ct->ct_name);
+            return NULL;
+        }
+        p = strchr(path, '.');
+        if (p == NULL)
+            name = PyText_FromString(path);
+        else
+            name = PyText_FromStringAndSize(path, p - path);
+        if (name == NULL)
+            return NULL;
+        cf = (CFieldObject *)PyDict_GetItem(ct->ct_stuff, name);
+        if (cf == NULL) {
+            PyErr_SetObject(PyExc_KeyError, name);
+            Py_DECREF(name);
+            return NULL;
+        }
+        Py_DECREF(name);
+        *offset += cf->cf_offset;
+        if (p == NULL)
+            break;
+        if (cf->cf_bitshift >= 0) {
+            PyErr_SetString(PyExc_TypeError, "a bitfield has no subfields");
+            return NULL;
+        }
+        ct = cf->cf_type;
+        path = p + 1;
+    }
+    if (cf->cf_type->ct_size < 0 || cf->cf_bitshift == BS_EMPTY_ARRAY) {
+        PyErr_Format(PyExc_TypeError, "field '%s' has no fixed size",
+                     PyText_AS_UTF8(field));
+        return NULL;
+    }
+    return cf;
+}
+
+static PyObject *b_unpack_field(PyObject *self, PyObject *args,
+                                PyObject *kwds)
+{
+    CDataObject *cd;
+    CTypeDescrObject *ctitem, *ftype;
+    CFieldObject *cf;
+    PyObject *field, *result_obj = Py_None, *res = NULL;
+    Py_buffer view;
+    Py_ssize_t i, length = -1, known, offset, fsize, stride;
+    char *src, *dst;
+    static char *keywords[] = {"cdata", "field", "length", "result", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O!O|nO:unpack_field",
+                                     keywords, &CData_Type, &cd, &field,
+                                     &length, &result_obj))
+        return NULL;
+
+    if (!(cd->c_type->ct_flags & (CT_ARRAY|CT_POINTER)) ||
+            !(cd->c_type->ct_itemdescr->ct_flags & (CT_STRUCT|CT_UNION))) {
+        PyErr_Format(PyExc_TypeError,
+                     "expected a pointer or array of structs or unions, "
+                     "got '%s'", cd->c_type->ct_name);
+        return NULL;
+    }
+    ctitem = cd->c_type->ct_itemdescr;
+    cf = _unpack_field_lookup(ctitem, field, &offset);
+    if (cf == NULL)
+        return NULL;
+    ftype = cf->cf_type;
+    fsize = ftype->ct_size;
+    stride = ctitem->ct_size;
+
+    known = -1;
+    if (cd->c_type->ct_flags & CT_ARRAY)
+        known = get_array_length(cd);
+    view.obj = NULL;
+    if (result_obj == Py_None) {
+        PyObject *ctptr, *ctarray;
+        if (length < 0)
+            length = known;
+        if (length < 0) {
+            PyErr_SetString(PyExc_ValueError,
+                            "cannot determine the number of items: give "
+                            "'length' explicitly");
+            return NULL;
+        }
+        ctptr = new_pointer_type(ftype);
+        if (ctptr == NULL)
+            return NULL;
+        ctarray = new_array_type((CTypeDescrObject *)ctptr, length);
+        Py_DECREF(ctptr);
+        if (ctarray == NULL)
+            return NULL;
+        res = direct_newp((CTypeDescrObject *)ctarray, Py_None,
+                          &default_allocator);
+        Py_DECREF(ctarray);
+        if (res == NULL)
+            return NULL;
+        dst = ((CDataObject *)res)->c_data;
+    }
+    else {
+        Py_ssize_t rlength;
+        dst = _call_many_array(result_obj, ftype, &view, 1, &rlength);
+        if (dst == NULL)
+            return NULL;
+        if (length < 0)
+            length = known >= 0 ? known : rlength;
+        if (length < 0) {
+            PyErr_SetString(PyExc_ValueError,
+                            "cannot determine the number of items: give "
+                            "'length' explicitly");
+            goto error;
+        }
+        if (rlength >= 0 && rlength < length) {
+            PyErr_Format(PyExc_ValueError,
+                         "result array has only %zd items, expected %zd",
+                         rlength, length);
+            goto error;
+        }
+        Py_INCREF(result_obj);
+        res = result_obj;
+    }
+    if (known >= 0 && known < length) {
+        PyErr_Format(PyExc_ValueError,
+                     "struct array has only %zd items, expected %zd",
+                     known, length);
+        Py_CLEAR(res);
+        goto error;
+    }
+    if (length > 0 && cd->c_data == NULL) {
+        PyErr_SetString(PyExc_RuntimeError, "cannot use unpack_field() on "
+                                            "a NULL pointer");
+        Py_CLEAR(res);
+        goto error;
+    }
+
+    src = cd->c_data + offset;
+    if (cf->cf_bitshift >= 0) {
+        int size = (int)fsize;
+        int is_signed = (ftype->ct_flags & CT_PRIMITIVE_SIGNED) != 0;
+        unsigned PY_LONG_LONG valuemask = (1ULL << cf->cf_bitsize) - 1ULL;
+        unsigned PY_LONG_LONG shiftforsign = 1ULL << (cf->cf_bitsize - 1);
+
+        for (i = 0; i < length; i++, src += stride, dst += fsize) {
+            unsigned PY_LONG_LONG value;
+            if (is_signed) {
+                value = (unsigned PY_LONG_LONG)read_raw_signed_data(src, size);
+                value = ((value >> cf->cf_bitshift) + shiftforsign) &
+                        valuemask;
+                value -= shiftforsign;
+            }
+            else {
+                value = read_raw_unsigned_data(src, size);
+                value = (value >> cf->cf_bitshift) & valuemask;
+            }
+            write_raw_integer_data(dst, value, size);
+        }
+    }
+    else {
+        /* use a constant size for memcpy() in the common cases, so that
+           the C compiler turns it into a simple load and store */
+#define UNPACK_FIELD_LOOP(size)                                  \
+        for (i = 0; i < length; i++, src += stride, dst += (size))  \
+            memcpy(dst, src, (size))
+
+        switch (fsize) {
+        case 1: UNPACK_FIELD_LOOP(1); break;
+        case 2: UNPACK_FIELD_LOOP(2); break;
+        case 4: UNPACK_FIELD_LOOP(4); break;
+        case 8: UNPACK_FIELD_LOOP(8); break;
+        default: UNPACK_FIELD_LOOP(fsize); break;
+        }
+#undef UNPACK_FIELD_LOOP
+    }
+    /* fall-through */
+
+ error:
+    if (view.obj != NULL)
+        PyBuffer_Release(&view);
+    return res;
+}
+
 static PyObject *b__get_types(PyObject *self, PyObject *noarg)
 {
     return PyTuple_Pack(2, (PyObject *)&CData_Type,
@@ -6803,18 +8903,20 @@ static PyObject *b__get_types(PyObject *self, PyObject *noarg)
 
 /* forward, in commontypes.c */
 static PyObject *b__get_common_types(PyObject *self, PyObject *arg);
+static PyObject *b_get_extern_python_stats(PyObject *self, PyObject *args);
+static PyObject *b_get_lib_stats(PyObject *self, PyObject *arg);
 
 static PyObject *b_gcp(PyObject *self, PyObject *args, PyObject *kwds)
 {
     CDataObject *cd;
     CDataObject *origobj;
     PyObject *destructor;
-    Py_ssize_t ignored;   /* for pypy */
+    Py_ssize_t size = 0;
     static char *keywords[] = {"cdata", "destructor", "size", NULL};
 
     if (!PyArg_ParseTupleAndKeywords(args, kwds, "O!O|n:gc", keywords,
                                      &CData_Type, &origobj, &destructor,
-                                     &ignored))
+                                     &size))
         return NULL;
 
     if (destructor == Py_None) {
@@ -6825,10 +8927,15 @@ static PyObject *b_gcp(PyObject *self, PyObject *args, PyObject *kwds)
 	    return NULL;
 	}
 	Py_CLEAR(((CDataObject_gcp *)origobj)->destructor);
+	/* the 'size' given here is ignored: we know the exact size
+	   to remove from the total */
+	gc_pressure_remove((CDataObject_gcp *)origobj);
 	Py_RETURN_NONE;
     }
 
     cd = allocate_gcp_object(origobj, origobj->c_type, destructor);
+    if (cd != NULL)
+        gc_pressure_add((CDataObject_gcp *)cd, size);
     return (PyObject *)cd;
 }
 
@@ -7138,8 +9245,17 @@ static PyMethodDef FFIBackendMethods[] = {
     {"new_union_type", b_new_union_type, METH_VARARGS},
     {"complete_struct_or_union", b_complete_struct_or_union, METH_VARARGS},
     {"new_function_type", b_new_function_type, METH_VARARGS},
+    {"get_varargs_cache_stats", b_get_varargs_cache_stats, METH_O},
+    {"get_closure_stats", b_get_closure_stats, METH_NOARGS},
+    {"get_gc_pressure_stats", b_get_gc_pressure_stats, METH_NOARGS},
+    {"callback_pool", b_callback_pool, METH_VARARGS},
+    {"native_callback", b_native_callback, METH_VARARGS},
+    {"get_extern_python_stats", b_get_extern_python_stats, METH_VARARGS},
+    {"get_lib_stats", b_get_lib_stats, METH_O},
+    {"new_arena", b_new_arena, METH_VARARGS},
     {"new_enum_type", b_new_enum_type, METH_VARARGS},
     {"newp", b_newp, METH_VARARGS},
+    {"newp_uninitialized", b_newp_uninitialized, METH_VARARGS},
     {"cast", b_cast, METH_VARARGS},
     {"callback", b_callback, METH_VARARGS},
     {"alignof", b_alignof, METH_O},
@@ -7154,8 +9270,11 @@ static PyMethodDef FFIBackendMethods[] = {
     {"set_errno", b_set_errno, METH_O},
     {"newp_handle", b_newp_handle, METH_VARARGS},
     {"from_handle", b_from_handle, METH_O},
+    {"handle_table", b_handle_table, METH_VARARGS},
     {"from_buffer", b_from_buffer, METH_VARARGS},
     {"memmove", (PyCFunction)b_memmove, METH_VARARGS | METH_KEYWORDS},
+    {"call_many", (PyCFunction)b_call_many, METH_VARARGS | METH_KEYWORDS},
+    {"unpack_field", (PyCFunction)b_unpack_field, METH_VARARGS|METH_KEYWORDS},
     {"gcp", (PyCFunction)b_gcp, METH_VARARGS | METH_KEYWORDS},
 #ifdef MS_WIN32
     {"getwinerror", (PyCFunction)b_getwinerror, METH_VARARGS | METH_KEYWORDS},
@@ -7438,6 +9557,14 @@ init_cffi_backend(void)
         INITERROR;
     if (PyType_Ready(&CDataOwningGC_Type) < 0)
         INITERROR;
+    if (PyType_Ready(&CDataOwningMmap_Type) < 0)
+        INITERROR;
+    if (PyType_Ready(&CallbackPool_Type) < 0)
+        INITERROR;
+    if (PyType_Ready(&Arena_Type) < 0)
+        INITERROR;
+    if (PyType_Ready(&HandleTable_Type) < 0)
+        INITERROR;
     if (PyType_Ready(&CDataGCP_Type) < 0)
         INITERROR;
     if (PyType_Ready(&CDataIter_Type) < 0)
@@ -7493,6 +9620,10 @@ init_cffi_backend(void)
     if (PyModule_AddObject(m, "buffer", (PyObject *)&MiniBuffer_Type) < 0)
         INITERROR;
 
+#ifndef CFFI_TRUST_LIBFFI
+    if (init_closure_allocator() < 0)
+        INITERROR;
+#endif
     init_cffi_tls();
     if (PyErr_Occurred())
         INITERROR;
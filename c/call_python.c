@@ -49,10 +49,46 @@ static PyObject *_get_interpstate_dict(void)
     return NULL;
 }
 
+/* Each extern "Python" function has got a small cache mapping the
+   subinterpreters that called it recently to the info tuple to use.
+   It is stored in 'externpy->reserved2', and only accessed with the
+   GIL.  The subinterpreters are identified by their 'interp->modules'
+   dict, of which the cache holds a reference, so that it cannot be
+   reused by a different subinterpreter while it is in the cache.  When
+   the cache is full, the entries are replaced in round-robin order.
+   'externpy->reserved1' is non-NULL as soon as ffi.def_extern() was
+   called for this function in any subinterpreter. */
+
+#define EXTERNPY_CACHE_SIZE   4
+
+typedef struct {
+    PyObject *ec_keys[EXTERNPY_CACHE_SIZE];         /* 'interp->modules' */
+    PyObject *ec_infotuples[EXTERNPY_CACHE_SIZE];
+    int ec_next;                 /* next entry to replace if full */
+    Py_ssize_t ec_hits, ec_misses;
+} externpy_cache_t;
+
+static void _externpy_cache_remove(externpy_cache_t *cache, PyObject *key)
+{
+    int i;
+    if (cache == NULL)
+        return;
+    for (i = 0; i < EXTERNPY_CACHE_SIZE; i++) {
+        if (cache->ec_keys[i] == key) {
+            PyObject *old1 = cache->ec_keys[i];
+            PyObject *old2 = cache->ec_infotuples[i];
+            cache->ec_keys[i] = NULL;
+            cache->ec_infotuples[i] = NULL;
+            Py_DECREF(old1);
+            Py_DECREF(old2);
+        }
+    }
+}
+
 static PyObject *_ffi_def_extern_decorator(PyObject *outer_args, PyObject *fn)
 {
     const char *s;
-    PyObject *error, *onerror, *infotuple, *old1;
+    PyObject *error, *onerror, *infotuple;
     int index, err;
     const struct _cffi_global_s *g;
     struct _cffi_externpy_s *externpy;
@@ -120,12 +156,16 @@ static PyObject *_ffi_def_extern_decorator(PyObject *outer_args, PyObject *fn)
     if (err < 0)
         return NULL;
 
-    /* force _update_cache_to_call_python() to be called the next time
-       the C function invokes cffi_call_python, to update the cache */
-    old1 = externpy->reserved1;
-    externpy->reserved1 = Py_None;   /* a non-NULL value */
-    Py_INCREF(Py_None);
-    Py_XDECREF(old1);
+    /* mark the externpy as initialized, and remove the entry of the
+       current subinterpreter from the cache, to force
+       _update_cache_to_call_python() to be called the next time the C
+       function invokes cffi_call_python() */
+    if (externpy->reserved1 == NULL) {
+        Py_INCREF(Py_None);
+        externpy->reserved1 = Py_None;   /* a non-NULL value */
+    }
+    _externpy_cache_remove((externpy_cache_t *)externpy->reserved2,
+                           PyThreadState_GET()->interp->modules);
 
     /* return the function object unmodified */
     Py_INCREF(fn);
@@ -139,10 +179,23 @@ static PyObject *_ffi_def_extern_decorator(PyObject *outer_args, PyObject *fn)
 }
 
 
-static int _update_cache_to_call_python(struct _cffi_externpy_s *externpy)
+static int _update_cache_to_call_python(struct _cffi_externpy_s *externpy,
+                                        PyObject *key, PyObject **result)
 {
-    PyObject *interpstate_dict, *interpstate_key, *infotuple, *old1, *new1;
-    PyObject *old2;
+    PyObject *interpstate_dict, *interpstate_key, *infotuple;
+    PyObject *old1, *old2;
+    externpy_cache_t *cache;
+    int i;
+
+    cache = (externpy_cache_t *)externpy->reserved2;
+    if (cache == NULL) {
+        cache = PyMem_Malloc(sizeof(externpy_cache_t));
+        if (cache == NULL)
+            return 2;   /* out of memory */
+        memset(cache, 0, sizeof(externpy_cache_t));
+        externpy->reserved2 = cache;    /* never freed */
+    }
+    cache->ec_misses++;
 
     interpstate_dict = _get_interpstate_dict();
     if (interpstate_dict == NULL)
@@ -157,16 +210,26 @@ static int _update_cache_to_call_python(struct _cffi_externpy_s *externpy)
     if (infotuple == NULL)
         return 3;    /* no ffi.def_extern() from this subinterpreter */
 
-    new1 = PyThreadState_GET()->interp->modules;
-    Py_INCREF(new1);
+    /* use a free entry if there is one, or else the next one in
+       round-robin order */
+    for (i = 0; i < EXTERNPY_CACHE_SIZE; i++) {
+        if (cache->ec_keys[i] == NULL)
+            break;
+    }
+    if (i == EXTERNPY_CACHE_SIZE) {
+        i = cache->ec_next;
+        cache->ec_next = (i + 1) % EXTERNPY_CACHE_SIZE;
+    }
+    Py_INCREF(key);
     Py_INCREF(infotuple);
-    old1 = (PyObject *)externpy->reserved1;
-    old2 = (PyObject *)externpy->reserved2;
-    externpy->reserved1 = new1;         /* holds a reference        */
-    externpy->reserved2 = infotuple;    /* holds a reference (issue #246) */
+    old1 = cache->ec_keys[i];
+    old2 = cache->ec_infotuples[i];
+    cache->ec_keys[i] = key;                /* holds a reference        */
+    cache->ec_infotuples[i] = infotuple;    /* holds a reference (issue #246) */
     Py_XDECREF(old1);
     Py_XDECREF(old2);
 
+    *result = infotuple;
     return 0;   /* no error */
 
  error:
@@ -174,6 +237,69 @@ static int _update_cache_to_call_python(struct _cffi_externpy_s *externpy)
     return 2;   /* out of memory? */
 }
 
+static int _get_infotuple_to_call_python(struct _cffi_externpy_s *externpy,
+                                         PyObject **result)
+{
+    /* Called with the GIL.  Returns 0 and sets '*result' to a borrowed
+       reference to the info tuple, or returns an error code. */
+    externpy_cache_t *cache = (externpy_cache_t *)externpy->reserved2;
+    PyObject *key = PyThreadState_GET()->interp->modules;
+    int i;
+
+    if (cache != NULL) {
+        for (i = 0; i < EXTERNPY_CACHE_SIZE; i++) {
+            if (cache->ec_keys[i] == key) {
+                cache->ec_hits++;
+                *result = cache->ec_infotuples[i];
+                return 0;
+            }
+        }
+    }
+    /* Update the cache.  This will fail if we didn't call
+       @ffi.def_extern() in this particular subinterpreter. */
+    return _update_cache_to_call_python(externpy, key, result);
+}
+
+static PyObject *b_get_extern_python_stats(PyObject *self, PyObject *args)
+{
+    FFIObject *ffi;
+    char *s;
+    int index;
+    const struct _cffi_global_s *g;
+    struct _cffi_externpy_s *externpy;
+    externpy_cache_t *cache;
+    Py_ssize_t hits = 0, misses = 0, size = 0;
+
+    if (!PyArg_ParseTuple(args, "O!s:get_extern_python_stats",
+                          &FFI_Type, &ffi, &s))
+        return NULL;
+
+    index = search_in_globals(&ffi->types_builder.ctx, s, strlen(s));
+    if (index < 0)
+        goto not_found;
+    g = &ffi->types_builder.ctx.globals[index];
+    if (_CFFI_GETOP(g->type_op) != _CFFI_OP_EXTERN_PYTHON)
+        goto not_found;
+
+    externpy = (struct _cffi_externpy_s *)g->address;
+    cache = (externpy_cache_t *)externpy->reserved2;
+    if (cache != NULL) {
+        int i;
+        hits = cache->ec_hits;
+        misses = cache->ec_misses;
+        for (i = 0; i < EXTERNPY_CACHE_SIZE; i++) {
+            if (cache->ec_keys[i] != NULL)
+                size++;
+        }
+    }
+    return Py_BuildValue("{s:n,s:n,s:n,s:i}", "hits", hits, "misses", misses,
+                         "size", size, "maxsize", EXTERNPY_CACHE_SIZE);
+
+ not_found:
+    PyErr_Format(FFIError, "no 'extern \"Python\"' function named '%s'", s);
+    return NULL;
+}
+
 #if (defined(WITH_THREAD) && !defined(_MSC_VER) &&   \
      !defined(__amd64__) && !defined(__x86_64__) &&   \
      !defined(__i386__) && !defined(__i386))
@@ -233,11 +359,10 @@ static void cffi_call_python(struct _cffi_externpy_s *externpy, char *args)
 
     save_errno();
 
-    /* We need the infotuple here.  We could always go through
-       _update_cache_to_call_python(), but to avoid the extra dict
-       lookups, we cache in (reserved1, reserved2) the last seen pair
-       (interp->modules, infotuple).  The first item in this tuple is
-       a random PyObject that identifies the subinterpreter.
+    /* We need the infotuple here.  We could always look it up in the
+       interpstate_dict, but to avoid the extra dict lookups, we cache
+       the info tuples of the last few subinterpreters that called this
+       function (see externpy_cache_t).
     */
     if (externpy->reserved1 == NULL) {
         /* Not initialized!  We didn't call @ffi.def_extern() on this
@@ -246,14 +371,10 @@ static void cffi_call_python(struct _cffi_externpy_s *externpy, char *args)
     }
     else {
         PyGILState_STATE state = gil_ensure();
-        if (externpy->reserved1 != PyThreadState_GET()->interp->modules) {
-            /* Update the (reserved1, reserved2) cache.  This will fail
-               if we didn't call @ffi.def_extern() in this particular
-               subinterpreter. */
-            err = _update_cache_to_call_python(externpy);
-        }
+        PyObject *infotuple;
+        err = _get_infotuple_to_call_python(externpy, &infotuple);
         if (!err) {
-            general_invoke_callback(0, args, args, externpy->reserved2);
+            general_invoke_callback(0, args, args, infotuple);
         }
         gil_release(state);
     }
@@ -112,26 +112,328 @@ static int _cdl_realize_global_int(struct _cffi_getconst_s *gc)
     return ic->neg;
 }
 
+/* The following cdl_fill_*() functions decode one entry of the tables
+   given to ffiobj_init(), either as a bytes object inside the tuples
+   written by recompiler.py, or as a record inside an ABI bundle (see
+   cdl_load_bundle()).  In both cases, 'src' is followed by a '\0'.  The
+   "char *" strings in the result point directly inside 'src'. */
+
+static void cdl_fill_global(struct _cffi_global_s *nglob,
+                            cdl_intconst_t *nintconst, char *g,
+                            int neg, unsigned long long value)
+{
+    nglob->type_op = cdl_opcode(g); g += 4;
+    nglob->name = g;
+    if (_CFFI_GETOP(nglob->type_op) == _CFFI_OP_CONSTANT_INT ||
+        _CFFI_GETOP(nglob->type_op) == _CFFI_OP_ENUM) {
+        nglob->address = &_cdl_realize_global_int;
+        nintconst->neg = neg;
+        nintconst->value = value;
+    }
+}
+
+static void cdl_fill_struct_union(struct _cffi_struct_union_s *nstruct,
+                                  char *s, Py_ssize_t first_field_index,
+                                  Py_ssize_t num_fields)
+{
+    nstruct->type_index = cdl_4bytes(s); s += 4;
+    nstruct->flags = cdl_4bytes(s); s += 4;
+    nstruct->name = s;
+    if (nstruct->flags & (_CFFI_F_OPAQUE | _CFFI_F_EXTERNAL)) {
+        nstruct->size = (size_t)-1;
+        nstruct->alignment = -1;
+        nstruct->first_field_index = -1;
+        nstruct->num_fields = 0;
+        assert(num_fields == 0);
+    }
+    else {
+        nstruct->size = (size_t)-2;
+        nstruct->alignment = -2;
+        nstruct->first_field_index = first_field_index;
+        nstruct->num_fields = num_fields;
+    }
+}
+
+static void cdl_fill_field(struct _cffi_field_s *nfield, char *f)
+{
+    nfield->field_type_op = cdl_opcode(f); f += 4;
+    nfield->field_offset = (size_t)-1;
+    if (_CFFI_GETOP(nfield->field_type_op) != _CFFI_OP_NOOP) {
+        nfield->field_size = cdl_4bytes(f); f += 4;
+    }
+    else {
+        nfield->field_size = (size_t)-1;
+    }
+    nfield->name = f;
+}
+
+static void cdl_fill_enum(struct _cffi_enum_s *nenum, char *e)
+{
+    nenum->type_index = cdl_4bytes(e); e += 4;
+    nenum->type_prim = cdl_4bytes(e); e += 4;
+    nenum->name = e; e += strlen(e) + 1;
+    nenum->enumerators = e;
+}
+
+static void cdl_fill_typename(struct _cffi_typename_s *ntypename, char *t)
+{
+    ntypename->type_index = cdl_4bytes(t); t += 4;
+    ntypename->name = t;
+}
+
+/* An ABI bundle is a binary serialization of the arguments '_version',
+   '_types', '_globals', '_struct_unions', '_enums' and '_typenames' of
+   FFI(), written by recompiler.py (see make_abi_bundle()).  It can be
+   given as a bytes or any read-only buffer object, notably an mmap of
+   the file, whose pages are then shared between processes.  All
+   integers are 4 bytes, in the same big-endian order as cdl_4bytes():
+
+       "\0cffiabi" version
+       num_types  { opcode }*num_types
+       num_globals  { entry neg value_high value_low }*num_globals
+       num_struct_unions num_fields
+           { num_fields_here entry { entry }*num_fields_here }*num_su
+       num_enums  { entry }*num_enums
+       num_typenames  { entry }*num_typenames
+
+   where each 'entry' is a length, followed by the same bytes as one
+   item of the tuples written in the .py files, followed by '\0'.
+*/
+#define CDL_BUNDLE_MAGIC       "\0cffiabi"
+#define CDL_BUNDLE_MAGIC_SIZE  8
+
+typedef struct {
+    char *pos, *end;
+} cdl_reader_t;
+
+static int cdl_read_int(cdl_reader_t *r, Py_ssize_t *result)
+{
+    if (r->end - r->pos < 4)
+        return -1;
+    *result = cdl_4bytes(r->pos);
+    r->pos += 4;
+    return 0;
+}
+
+static int cdl_read_count(cdl_reader_t *r, Py_ssize_t *result,
+                          Py_ssize_t min_record_size)
+{
+    /* read a number of records, checking that it is not larger than
+       what the rest of the buffer can contain */
+    if (cdl_read_int(r, result) < 0 || *result < 0 ||
+            *result > (r->end - r->pos) / min_record_size)
+        return -1;
+    return 0;
+}
+
+static char *cdl_read_entry(cdl_reader_t *r, Py_ssize_t min_length)
+{
+    Py_ssize_t length;
+    char *result;
+    if (cdl_read_int(r, &length) < 0 || length < min_length ||
+            length >= r->end - r->pos || r->pos[length] != '\0')
+        return NULL;
+    result = r->pos;
+    r->pos += length + 1;
+    return result;
+}
+
+static int cdl_load_bundle(FFIObject *ffi, char *ffiname, char *data,
+                           Py_ssize_t size)
+{
+    builder_c_t *builder = &ffi->types_builder;
+    cdl_reader_t r;
+    Py_ssize_t version, i, j, n, nf, nf1;
+    char *entry;
+
+    r.pos = data;
+    r.end = data + size;
+    if (size < CDL_BUNDLE_MAGIC_SIZE ||
+            memcmp(data, CDL_BUNDLE_MAGIC, CDL_BUNDLE_MAGIC_SIZE) != 0) {
+        PyErr_Format(PyExc_ImportError,
+                     "cffi ABI bundle for '%s': not an ABI bundle", ffiname);
+        return -1;
+    }
+    r.pos += CDL_BUNDLE_MAGIC_SIZE;
+    if (cdl_read_int(&r, &version) < 0)
+        goto corrupted;
+    if (version < CFFI_VERSION_MIN || version > CFFI_VERSION_MAX) {
+        PyErr_Format(PyExc_ImportError,
+                     "cffi ABI bundle for '%s' has unknown version %p",
+                     ffiname, (void *)version);
+        return -1;
+    }
+
+    /* the tables are stored in 'builder->ctx' as soon as they are
+       allocated, so that free_builder_c() frees them in case of error */
+
+    if (cdl_read_count(&r, &n, 4) < 0)
+        goto corrupted;
+    if (n > 0) {
+        _cffi_opcode_t *ntypes;
+        ntypes = PyMem_Malloc(n * sizeof(_cffi_opcode_t));
+        if (ntypes == NULL)
+            goto no_memory;
+        builder->ctx.types = ntypes;
+        builder->ctx.num_types = n;
+        for (i = 0; i < n; i++) {
+            ntypes[i] = cdl_opcode(r.pos);
+            r.pos += 4;
+        }
+    }
+
+    if (cdl_read_count(&r, &n, 4 + 4 + 1 + 12) < 0)
+        goto corrupted;
+    if (n > 0) {
+        struct _cffi_global_s *nglobs;
+        cdl_intconst_t *nintconsts;
+        Py_ssize_t neg, value_high, value_low;
+
+        i = n * (sizeof(struct _cffi_global_s) + sizeof(cdl_intconst_t));
+        nglobs = PyMem_Malloc(i);
+        if (nglobs == NULL)
+            goto no_memory;
+        memset(nglobs, 0, i);
+        builder->ctx.globals = nglobs;
+        builder->ctx.num_globals = n;
+        nintconsts = (cdl_intconst_t *)(nglobs + n);
+
+        for (i = 0; i < n; i++) {
+            entry = cdl_read_entry(&r, 4);
+            if (entry == NULL || cdl_read_int(&r, &neg) < 0 ||
+                    cdl_read_int(&r, &value_high) < 0 ||
+                    cdl_read_int(&r, &value_low) < 0)
+                goto corrupted;
+            cdl_fill_global(&nglobs[i], &nintconsts[i], entry, neg != 0,
+                (((unsigned long long)(unsigned int)value_high) << 32) |
+                 ((unsigned long long)(unsigned int)value_low));
+        }
+    }
+
+    if (cdl_read_count(&r, &n, 4 + 4 + 8 + 1) < 0 ||
+            cdl_read_count(&r, &nf, 4 + 4 + 1) < 0)
+        goto corrupted;
+    if (n > 0) {
+        struct _cffi_struct_union_s *nstructs;
+        struct _cffi_field_s *nfields;
+        Py_ssize_t nftotal = nf;
+
+        i = (n * sizeof(struct _cffi_struct_union_s) +
+             nf * sizeof(struct _cffi_field_s));
+        nstructs = PyMem_Malloc(i);
+        if (nstructs == NULL)
+            goto no_memory;
+        memset(nstructs, 0, i);
+        builder->ctx.struct_unions = nstructs;
+        builder->ctx.num_struct_unions = n;
+        nfields = (struct _cffi_field_s *)(nstructs + n);
+        builder->ctx.fields = nfields;
+        nf = 0;
+
+        for (i = 0; i < n; i++) {
+            if (cdl_read_int(&r, &nf1) < 0 || nf1 < 0 ||
+                    nf1 > nftotal - nf)
+                goto corrupted;
+            entry = cdl_read_entry(&r, 8);
+            if (entry == NULL)
+                goto corrupted;
+            if ((cdl_4bytes(entry + 4) & (_CFFI_F_OPAQUE | _CFFI_F_EXTERNAL))
+                    && nf1 != 0)
+                goto corrupted;
+            cdl_fill_struct_union(&nstructs[i], entry, nf, nf1);
+            for (j = 0; j < nf1; j++) {
+                entry = cdl_read_entry(&r, 4);
+                if (entry == NULL)
+                    goto corrupted;
+                if (_CFFI_GETOP(cdl_opcode(entry)) != _CFFI_OP_NOOP &&
+                        strlen(entry + 4) < 4)
+                    goto corrupted;    /* missing the 4-bytes bit size */
+                cdl_fill_field(&nfields[nf], entry);
+                nf++;
+            }
+        }
+        if (nf != nftotal)
+            goto corrupted;
+    }
+    else if (nf != 0)
+        goto corrupted;
+
+    if (cdl_read_count(&r, &n, 4 + 8 + 1) < 0)
+        goto corrupted;
+    if (n > 0) {
+        struct _cffi_enum_s *nenums;
+        nenums = PyMem_Malloc(n * sizeof(struct _cffi_enum_s));
+        if (nenums == NULL)
+            goto no_memory;
+        memset(nenums, 0, n * sizeof(struct _cffi_enum_s));
+        builder->ctx.enums = nenums;
+        builder->ctx.num_enums = n;
+        for (i = 0; i < n; i++) {
+            char *entry_end;
+            entry = cdl_read_entry(&r, 8);
+            if (entry == NULL)
+                goto corrupted;
+            entry_end = r.pos - 1;
+            if (entry + 8 + strlen(entry + 8) >= entry_end)
+                goto corrupted;    /* missing the '\0' after the name */
+            cdl_fill_enum(&nenums[i], entry);
+        }
+    }
+
+    if (cdl_read_count(&r, &n, 4 + 4 + 1) < 0)
+        goto corrupted;
+    if (n > 0) {
+        struct _cffi_typename_s *ntypenames;
+        ntypenames = PyMem_Malloc(n * sizeof(struct _cffi_typename_s));
+        if (ntypenames == NULL)
+            goto no_memory;
+        memset(ntypenames, 0, n * sizeof(struct _cffi_typename_s));
+        builder->ctx.typenames = ntypenames;
+        builder->ctx.num_typenames = n;
+        for (i = 0; i < n; i++) {
+            entry = cdl_read_entry(&r, 4);
+            if (entry == NULL)
+                goto corrupted;
+            cdl_fill_typename(&ntypenames[i], entry);
+        }
+    }
+
+    if (r.pos != r.end)
+        goto corrupted;
+    return 0;
+
+ corrupted:
+    PyErr_Format(PyExc_ImportError,
+                 "cffi ABI bundle for '%s' is truncated or corrupted "
+                 "(at offset %zd)", ffiname, (Py_ssize_t)(r.pos - data));
+    return -1;
+
+ no_memory:
+    PyErr_NoMemory();
+    return -1;
+}
+
 static int ffiobj_init(PyObject *self, PyObject *args, PyObject *kwds)
 {
     FFIObject *ffi;
     static char *keywords[] = {"module_name", "_version", "_types",
                                "_globals", "_struct_unions", "_enums",
-                               "_typenames", "_includes", NULL};
+                               "_typenames", "_includes", "_bundle", NULL};
     char *ffiname = "?", *types = NULL, *building = NULL;
     Py_ssize_t version = -1;
     Py_ssize_t types_len = 0;
     PyObject *globals = NULL, *struct_unions = NULL, *enums = NULL;
-    PyObject *typenames = NULL, *includes = NULL;
+    PyObject *typenames = NULL, *includes = NULL, *bundle = NULL;
 
     if (!PyArg_ParseTupleAndKeywords(args, kwds,
-                                     "|sns#O!O!O!O!O!:FFI", keywords,
+                                     "|sns#O!O!O!O!O!O:FFI", keywords,
                                      &ffiname, &version, &types, &types_len,
                                      &PyTuple_Type, &globals,
                                      &PyTuple_Type, &struct_unions,
                                      &PyTuple_Type, &enums,
                                      &PyTuple_Type, &typenames,
-                                     &PyTuple_Type, &includes))
+                                     &PyTuple_Type, &includes,
+                                     &bundle))
         return -1;
 
     ffi = (FFIObject *)self;
@@ -140,6 +442,33 @@ static int ffiobj_init(PyObject *self, PyObject *args, PyObject *kwds)
                         "cannot call FFI.__init__() more than once");
         return -1;
     }
+
+    if (bundle != NULL) {
+        Py_buffer *view;
+        if (version != -1 || types != NULL || globals != NULL ||
+                struct_unions != NULL || enums != NULL || typenames != NULL) {
+            PyErr_SetString(PyExc_TypeError,
+                            "FFI(_bundle=...) cannot be combined with the "
+                            "other table arguments, apart from _includes");
+            return -1;
+        }
+        view = PyMem_Malloc(sizeof(Py_buffer));
+        if (view == NULL) {
+            PyErr_NoMemory();
+            return -1;
+        }
+        if (_my_PyObject_GetContiguousBuffer(bundle, view, 0) < 0) {
+            PyMem_Free(view);
+            return -1;
+        }
+        /* the names point inside the buffer: keep it alive (and, for
+           an mmap, prevent it from being closed) */
+        ffi->types_builder._keepalive_buffer = view;
+        ffi->ctx_is_nonempty = 1;
+        if (cdl_load_bundle(ffi, ffiname, view->buf, view->len) < 0)
+            return -1;
+        goto load_includes;
+    }
     ffi->ctx_is_nonempty = 1;
 
     if (version == -1 && types_len == 0)
@@ -188,27 +517,23 @@ static int ffiobj_init(PyObject *self, PyObject *args, PyObject *kwds)
 
         for (i = 0; i < n; i++) {
             char *g = PyBytes_AS_STRING(PyTuple_GET_ITEM(globals, i * 2));
-            nglobs[i].type_op = cdl_opcode(g); g += 4;
-            nglobs[i].name = g;
-            if (_CFFI_GETOP(nglobs[i].type_op) == _CFFI_OP_CONSTANT_INT ||
-                _CFFI_GETOP(nglobs[i].type_op) == _CFFI_OP_ENUM) {
-                PyObject *o = PyTuple_GET_ITEM(globals, i * 2 + 1);
-                nglobs[i].address = &_cdl_realize_global_int;
+            PyObject *o = PyTuple_GET_ITEM(globals, i * 2 + 1);
+            int neg;
+            unsigned long long value;
 #if PY_MAJOR_VERSION < 3
-                if (PyInt_Check(o)) {
-                    nintconsts[i].neg = PyInt_AS_LONG(o) <= 0;
-                    nintconsts[i].value = (long long)PyInt_AS_LONG(o);
-                }
-                else
+            if (PyInt_Check(o)) {
+                neg = PyInt_AS_LONG(o) <= 0;
+                value = (long long)PyInt_AS_LONG(o);
+            }
+            else
 #endif
-                {
-                    nintconsts[i].neg = PyObject_RichCompareBool(o, Py_False,
-                                                                 Py_LE);
-                    nintconsts[i].value = PyLong_AsUnsignedLongLongMask(o);
-                    if (PyErr_Occurred())
-                        goto error;
-                }
+            {
+                neg = PyObject_RichCompareBool(o, Py_False, Py_LE);
+                value = PyLong_AsUnsignedLongLongMask(o);
+                if (PyErr_Occurred())
+                    goto error;
             }
+            cdl_fill_global(&nglobs[i], &nintconsts[i], g, neg, value);
         }
         ffi->types_builder.ctx.globals = nglobs;
         ffi->types_builder.ctx.num_globals = n;
@@ -241,37 +566,15 @@ static int ffiobj_init(PyObject *self, PyObject *args, PyObject *kwds)
             /* 'desc' is the tuple of strings (desc_struct, desc_field_1, ..) */
             PyObject *desc = PyTuple_GET_ITEM(struct_unions, i);
             Py_ssize_t j, nf1 = PyTuple_GET_SIZE(desc) - 1;
-            char *s = PyBytes_AS_STRING(PyTuple_GET_ITEM(desc, 0));
-            /* 's' is the first string, describing the struct/union */
-            nstructs[i].type_index = cdl_4bytes(s); s += 4;
-            nstructs[i].flags = cdl_4bytes(s); s += 4;
-            nstructs[i].name = s;
-            if (nstructs[i].flags & (_CFFI_F_OPAQUE | _CFFI_F_EXTERNAL)) {
-                nstructs[i].size = (size_t)-1;
-                nstructs[i].alignment = -1;
-                nstructs[i].first_field_index = -1;
-                nstructs[i].num_fields = 0;
-                assert(nf1 == 0);
-            }
-            else {
-                nstructs[i].size = (size_t)-2;
-                nstructs[i].alignment = -2;
-                nstructs[i].first_field_index = nf;
-                nstructs[i].num_fields = nf1;
-            }
+            /* the first string describes the struct/union */
+            cdl_fill_struct_union(&nstructs[i],
+                                  PyBytes_AS_STRING(PyTuple_GET_ITEM(desc, 0)),
+                                  nf, nf1);
             for (j = 0; j < nf1; j++) {
-                char *f = PyBytes_AS_STRING(PyTuple_GET_ITEM(desc, j + 1));
-                /* 'f' is one of the other strings beyond the first one,
-                   describing one field each */
-                nfields[nf].field_type_op = cdl_opcode(f); f += 4;
-                nfields[nf].field_offset = (size_t)-1;
-                if (_CFFI_GETOP(nfields[nf].field_type_op) != _CFFI_OP_NOOP) {
-                    nfields[nf].field_size = cdl_4bytes(f); f += 4;
-                }
-                else {
-                    nfields[nf].field_size = (size_t)-1;
-                }
-                nfields[nf].name = f;
+                /* the other strings beyond the first one describe one
+                   field each */
+                cdl_fill_field(&nfields[nf],
+                           PyBytes_AS_STRING(PyTuple_GET_ITEM(desc, j + 1)));
                 nf++;
             }
         }
@@ -295,12 +598,8 @@ static int ffiobj_init(PyObject *self, PyObject *args, PyObject *kwds)
         nenums = (struct _cffi_enum_s *)building;
 
         for (i = 0; i < n; i++) {
-            char *e = PyBytes_AS_STRING(PyTuple_GET_ITEM(enums, i));
-            /* 'e' is a string describing the enum */
-            nenums[i].type_index = cdl_4bytes(e); e += 4;
-            nenums[i].type_prim = cdl_4bytes(e); e += 4;
-            nenums[i].name = e; e += strlen(e) + 1;
-            nenums[i].enumerators = e;
+            cdl_fill_enum(&nenums[i],
+                          PyBytes_AS_STRING(PyTuple_GET_ITEM(enums, i)));
         }
         ffi->types_builder.ctx.enums = nenums;
         ffi->types_builder.ctx.num_enums = n;
@@ -321,16 +620,15 @@ static int ffiobj_init(PyObject *self, PyObject *args, PyObject *kwds)
         ntypenames = (struct _cffi_typename_s *)building;
 
         for (i = 0; i < n; i++) {
-            char *t = PyBytes_AS_STRING(PyTuple_GET_ITEM(typenames, i));
-            /* 't' is a string describing the typename */
-            ntypenames[i].type_index = cdl_4bytes(t); t += 4;
-            ntypenames[i].name = t;
+            cdl_fill_typename(&ntypenames[i],
+                          PyBytes_AS_STRING(PyTuple_GET_ITEM(typenames, i)));
         }
         ffi->types_builder.ctx.typenames = ntypenames;
         ffi->types_builder.ctx.num_typenames = n;
         building = NULL;
     }
 
+ load_includes:
     if (includes != NULL) {
         PyObject *included_libs;
 
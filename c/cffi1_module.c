@@ -4,7 +4,7 @@
 
 #define CFFI_VERSION_MIN            0x2601
 #define CFFI_VERSION_CHAR16CHAR32   0x2801
-#define CFFI_VERSION_MAX            0x28FF
+#define CFFI_VERSION_MAX            0x29FF
 
 typedef struct FFIObject_s FFIObject;
 typedef struct LibObject_s LibObject;
@@ -208,6 +208,18 @@ static PyObject *b_init_cffi_1_0_external_module(PyObject *self, PyObject *arg)
                              &lib->l_types_builder->included_libs) < 0)
         return NULL;
 
+    /* if CFFI_EAGER_LIB is set, build all attributes of 'lib' now
+       instead of on first access.  The ones that fail are left for
+       later, so that their error shows up on access, as usual, instead
+       of making the import fail. */
+    {
+        const char *eager = getenv("CFFI_EAGER_LIB");
+        if (eager != NULL && eager[0] != '\0' && strcmp(eager, "0") != 0) {
+            if (lib_realize(lib, Py_None, 1) < 0)
+                return NULL;
+        }
+    }
+
     /* add manually 'module_name.lib' in sys.modules:
        see test_import_from_lib */
     modules_dict = PySys_GetObject("modules");
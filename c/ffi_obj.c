@@ -16,7 +16,14 @@
    need to call ffi.cdef() to add more information to it.
 */
 
-#define FFI_COMPLEXITY_OUTPUT   1200     /* xxx should grow as needed */
+/* Initial size of the output buffer of parse_c_type(), allocated on
+   the stack; it is replaced with larger heap buffers if needed. */
+#define FFI_COMPLEXITY_OUTPUT   64
+
+/* Maximum number of non-canonical strings, like "char[42]" or "int *",
+   cached by _ffi_type().  Canonical names, i.e. the names of primitive
+   types, typedefs, structs, unions and enums, are always cached. */
+#define FFI_TYPES_CACHE_SIZE    1000
 
 #define FFIObject_Check(op) PyObject_TypeCheck(op, &FFI_Type)
 #define LibObject_Check(ob)  ((Py_TYPE(ob) == &Lib_Type))
@@ -25,16 +32,21 @@ struct FFIObject_s {
     PyObject_HEAD
     PyObject *gc_wrefs, *gc_wrefs_freelist;
     PyObject *init_once_cache;
-    struct _cffi_parse_info_s info;
     char ctx_is_static, ctx_is_nonempty;
     builder_c_t types_builder;
+    /* the non-canonical strings are cached in two generations: lookups
+       hit 'types_recent' or 'types_old'; in the latter case the entry
+       is moved to 'types_recent'.  When 'types_recent' is full, it
+       becomes 'types_old' and the previous 'types_old' is dropped.
+       This approximates LRU: an entry used at least once among the last
+       FFI_TYPES_CACHE_SIZE / 2 new entries is never evicted. */
+    PyObject *types_recent, *types_old;
+    Py_ssize_t types_hits, types_misses, types_evictions;
 };
 
 static FFIObject *ffi_internal_new(PyTypeObject *ffitype,
                                  const struct _cffi_type_context_s *static_ctx)
 {
-    static _cffi_opcode_t internal_output[FFI_COMPLEXITY_OUTPUT];
-
     FFIObject *ffi;
     if (static_ctx != NULL) {
         ffi = (FFIObject *)PyObject_GC_New(FFIObject, ffitype);
@@ -54,9 +66,11 @@ static FFIObject *ffi_internal_new(PyTypeObject *ffitype,
     ffi->gc_wrefs = NULL;
     ffi->gc_wrefs_freelist = NULL;
     ffi->init_once_cache = NULL;
-    ffi->info.ctx = &ffi->types_builder.ctx;
-    ffi->info.output = internal_output;
-    ffi->info.output_size = FFI_COMPLEXITY_OUTPUT;
+    ffi->types_recent = NULL;
+    ffi->types_old = NULL;
+    ffi->types_hits = 0;
+    ffi->types_misses = 0;
+    ffi->types_evictions = 0;
     ffi->ctx_is_static = (static_ctx != NULL);
     ffi->ctx_is_nonempty = (static_ctx != NULL);
     return ffi;
@@ -68,6 +82,8 @@ static void ffi_dealloc(FFIObject *ffi)
     Py_XDECREF(ffi->gc_wrefs);
     Py_XDECREF(ffi->gc_wrefs_freelist);
     Py_XDECREF(ffi->init_once_cache);
+    Py_XDECREF(ffi->types_recent);
+    Py_XDECREF(ffi->types_old);
 
     free_builder_c(&ffi->types_builder, ffi->ctx_is_static);
 
@@ -77,6 +93,8 @@ static void ffi_dealloc(FFIObject *ffi)
 static int ffi_traverse(FFIObject *ffi, visitproc visit, void *arg)
 {
     Py_VISIT(ffi->types_builder.types_dict);
+    Py_VISIT(ffi->types_recent);
+    Py_VISIT(ffi->types_old);
     Py_VISIT(ffi->types_builder.included_ffis);
     Py_VISIT(ffi->types_builder.included_libs);
     Py_VISIT(ffi->gc_wrefs);
@@ -145,7 +163,50 @@ static PyObject *ffi_fetch_int_constant(FFIObject *ffi, const char *name,
 #define ACCEPT_ALL      (ACCEPT_STRING | ACCEPT_CTYPE | ACCEPT_CDATA)
 #define CONSIDER_FN_AS_FNPTR  8
 
-static CTypeDescrObject *_ffi_bad_type(FFIObject *ffi, const char *input_text)
+static int _ffi_parse_c_type(FFIObject *ffi, struct _cffi_parse_info_s *info,
+                             _cffi_opcode_t *small_output,
+                             const char *input_text)
+{
+    /* Parse 'input_text' into 'info->output'.  This starts as
+       'small_output', an array of FFI_COMPLEXITY_OUTPUT items provided
+       by the caller, and is replaced with larger PyMem_Malloc()ed
+       arrays as long as it is too small; the caller must PyMem_Free()
+       the final 'info->output' if it is not 'small_output'.  Returns
+       the index of the result, or -1 with an exception set (only
+       MemoryError) or without (a parse error, described in 'info').
+    */
+    int index;
+
+    info->ctx = &ffi->types_builder.ctx;
+    info->output = small_output;
+    info->output_size = FFI_COMPLEXITY_OUTPUT;
+
+    while (1) {
+        _cffi_opcode_t *new_output;
+
+        index = parse_c_type(info, input_text);
+        if (index >= 0 || info->error_message != parse_error_complexity)
+            return index;
+
+        if (info->output != small_output)
+            PyMem_Free(info->output);
+        info->output = small_output;
+        if (info->output_size > INT_MAX / 2 / sizeof(_cffi_opcode_t))
+            new_output = NULL;
+        else
+            new_output = PyMem_Malloc(2 * info->output_size *
+                                      sizeof(_cffi_opcode_t));
+        if (new_output == NULL) {
+            PyErr_NoMemory();
+            return -1;
+        }
+        info->output = new_output;
+        info->output_size *= 2;
+    }
+}
+
+static CTypeDescrObject *_ffi_bad_type(struct _cffi_parse_info_s *info,
+                                       const char *input_text)
 {
     size_t length = strlen(input_text);
     char *extra;
@@ -155,7 +216,7 @@ static CTypeDescrObject *_ffi_bad_type(FFIObject *ffi, const char *input_text)
     }
     else {
         char *p;
-        size_t i, num_spaces = ffi->info.error_location;
+        size_t i, num_spaces = info->error_location;
         extra = alloca(length + num_spaces + 4);
         p = extra;
         *p++ = '\n';
@@ -173,28 +234,103 @@ static CTypeDescrObject *_ffi_bad_type(FFIObject *ffi, const char *input_text)
         *p++ = '^';
         *p++ = 0;
     }
-    PyErr_Format(FFIError, "%s%s", ffi->info.error_message, extra);
+    PyErr_Format(FFIError, "%s%s", info->error_message, extra);
     return NULL;
 }
 
+static PyObject *_ffi_types_cache_lookup(FFIObject *ffi, PyObject *arg)
+{
+    /* Returns a borrowed reference, or NULL (with or without an
+       exception set) */
+    PyObject *x = PyDict_GetItem(ffi->types_builder.types_dict, arg);
+    if (x == NULL && ffi->types_recent != NULL) {
+        x = PyDict_GetItem(ffi->types_recent, arg);
+        if (x == NULL && ffi->types_old != NULL) {
+            x = PyDict_GetItem(ffi->types_old, arg);
+            if (x != NULL) {
+                /* move it to 'types_recent', which then keeps it alive */
+                if (PyDict_SetItem(ffi->types_recent, arg, x) < 0 ||
+                    PyDict_DelItem(ffi->types_old, arg) < 0)
+                    return NULL;
+            }
+        }
+    }
+    if (x != NULL)
+        ffi->types_hits++;
+    else
+        ffi->types_misses++;
+    return x;
+}
+
+static int _ffi_types_cache_store(FFIObject *ffi, PyObject *arg, PyObject *x,
+                                  _cffi_opcode_t op)
+{
+    PyObject *d;
+
+    switch (_CFFI_GETOP(op)) {
+    case _CFFI_OP_PRIMITIVE:
+    case _CFFI_OP_STRUCT_UNION:
+    case _CFFI_OP_ENUM:
+    case _CFFI_OP_TYPENAME:
+        /* a canonical name: pinned in 'types_dict' */
+        return PyDict_SetItem(ffi->types_builder.types_dict, arg, x);
+    default:
+        break;
+    }
+
+    if (ffi->types_recent != NULL &&
+            PyDict_Size(ffi->types_recent) >= FFI_TYPES_CACHE_SIZE / 2) {
+        if (ffi->types_old != NULL)
+            ffi->types_evictions += PyDict_Size(ffi->types_old);
+        Py_XDECREF(ffi->types_old);
+        ffi->types_old = ffi->types_recent;
+        ffi->types_recent = NULL;
+    }
+    if (ffi->types_recent == NULL) {
+        d = PyDict_New();
+        if (d == NULL)
+            return -1;
+        ffi->types_recent = d;
+    }
+    return PyDict_SetItem(ffi->types_recent, arg, x);
+}
+
 static CTypeDescrObject *_ffi_type(FFIObject *ffi, PyObject *arg,
                                    int accept)
 {
     /* Returns the CTypeDescrObject from the user-supplied 'arg'.
-       Does not return a new reference!
+       Returns a new reference: the cache of non-canonical names is
+       bounded, so the ctype may be evicted from it while the caller
+       still uses it.
     */
     if ((accept & ACCEPT_STRING) && PyText_Check(arg)) {
-        PyObject *types_dict = ffi->types_builder.types_dict;
-        PyObject *x = PyDict_GetItem(types_dict, arg);
+        CTypeDescrObject *ct;
+        PyObject *x = _ffi_types_cache_lookup(ffi, arg);
 
-        if (x == NULL) {
-            const char *input_text = PyText_AS_UTF8(arg);
-            int err, index = parse_c_type(&ffi->info, input_text);
-            if (index < 0)
-                return _ffi_bad_type(ffi, input_text);
+        if (x != NULL) {
+            Py_INCREF(x);
+        }
+        else {
+            _cffi_opcode_t small_output[FFI_COMPLEXITY_OUTPUT], op;
+            struct _cffi_parse_info_s info;
+            const char *input_text;
+            int err, index;
 
-            x = realize_c_type_or_func(&ffi->types_builder,
-                                       ffi->info.output, index);
+            if (PyErr_Occurred())
+                return NULL;
+            input_text = PyText_AS_UTF8(arg);
+            index = _ffi_parse_c_type(ffi, &info, small_output, input_text);
+            if (index < 0) {
+                if (!PyErr_Occurred())
+                    _ffi_bad_type(&info, input_text);
+            }
+            else {
+                x = realize_c_type_or_func(&ffi->types_builder,
+                                           info.output, index);
+                op = info.output[index];
+            }
+            if (info.output != small_output)
+                PyMem_Free(info.output);
             if (x == NULL)
                 return NULL;
 
@@ -204,26 +340,33 @@ static CTypeDescrObject *_ffi_type(FFIObject *ffi, PyObject *arg,
                if it is a primitive; for the purpose of this function,
                the important point is the following line, which makes
                sure that in any case the next _ffi_type() with the same
-               'arg' will succeed early, in PyDict_GetItem() above.
+               'arg' will succeed early, in _ffi_types_cache_lookup().
             */
-            err = PyDict_SetItem(types_dict, arg, x);
-            Py_DECREF(x); /* we know it was written in types_dict (unless out
-                             of mem), so there is at least that ref left */
-            if (err < 0)
+            err = _ffi_types_cache_store(ffi, arg, x, op);
+            if (err < 0) {
+                Py_DECREF(x);
                 return NULL;
+            }
         }
 
         if (CTypeDescr_Check(x))
             return (CTypeDescrObject *)x;
-        else if (accept & CONSIDER_FN_AS_FNPTR)
-            return unwrap_fn_as_fnptr(x);
+
+        if (accept & CONSIDER_FN_AS_FNPTR) {
+            ct = unwrap_fn_as_fnptr(x);
+            Py_INCREF(ct);
+        }
         else
-            return unexpected_fn_type(x);
+            ct = unexpected_fn_type(x);
+        Py_DECREF(x);
+        return ct;
     }
     else if ((accept & ACCEPT_CTYPE) && CTypeDescr_Check(arg)) {
+        Py_INCREF(arg);
         return (CTypeDescrObject *)arg;
     }
     else if ((accept & ACCEPT_CDATA) && CData_Check(arg)) {
+        Py_INCREF(((CDataObject *)arg)->c_type);
         return ((CDataObject *)arg)->c_type;
     }
 #if PY_MAJOR_VERSION < 3
@@ -269,8 +412,10 @@ static PyObject *ffi_sizeof(FFIObject *self, PyObject *arg)
         if (size < 0) {
             PyErr_Format(FFIError, "don't know the size of ctype '%s'",
                          ct->ct_name);
+            Py_DECREF(ct);
             return NULL;
         }
+        Py_DECREF(ct);
     }
     return PyInt_FromSsize_t(size);
 }
@@ -287,6 +432,7 @@ static PyObject *ffi_alignof(FFIObject *self, PyObject *arg)
         return NULL;
 
     align = get_alignment(ct);
+    Py_DECREF(ct);
     if (align < 0)
         return NULL;
     return PyInt_FromLong(align);
@@ -302,10 +448,7 @@ static PyObject *_cpyextfunc_type_index(PyObject *x);  /* forward */
 static PyObject *ffi_typeof(FFIObject *self, PyObject *arg)
 {
     PyObject *x = (PyObject *)_ffi_type(self, arg, ACCEPT_STRING|ACCEPT_CDATA);
-    if (x != NULL) {
-        Py_INCREF(x);
-    }
-    else {
+    if (x == NULL) {
         x = _cpyextfunc_type_index(arg);
     }
     return x;
@@ -336,7 +479,7 @@ static PyObject *_ffi_new(FFIObject *self, PyObject *args, PyObject *kwds,
                           const cffi_allocator_t *allocator)
 {
     CTypeDescrObject *ct;
-    PyObject *arg, *init = Py_None;
+    PyObject *arg, *init = Py_None, *res;
     static char *keywords[] = {"cdecl", "init", NULL};
     if (!PyArg_ParseTupleAndKeywords(args, kwds, "O|O:new", keywords,
                                      &arg, &init))
@@ -346,7 +489,9 @@ static PyObject *_ffi_new(FFIObject *self, PyObject *args, PyObject *kwds,
     if (ct == NULL)
         return NULL;
 
-    return direct_newp(ct, init, allocator);
+    res = direct_newp(ct, init, allocator);
+    Py_DECREF(ct);
+    return res;
 }
 
 static PyObject *ffi_new(FFIObject *self, PyObject *args, PyObject *kwds)
@@ -354,6 +499,18 @@ static PyObject *ffi_new(FFIObject *self, PyObject *args, PyObject *kwds)
     return _ffi_new(self, args, kwds, &default_allocator);
 }
 
+PyDoc_STRVAR(ffi_new_uninitialized_doc,
+"Like ffi.new(), but the memory is not cleared: apart from what is set\n"
+"by 'init', it contains garbage.  Meant for big buffers that are filled\n"
+"right afterwards anyway.  Allocations of 1MB or more are done with\n"
+"mmap(), so that the pages are only committed when they are written to.");
+
+static PyObject *ffi_new_uninitialized(FFIObject *self, PyObject *args,
+                                       PyObject *kwds)
+{
+    return _ffi_new(self, args, kwds, &nonzero_allocator);
+}
+
 static PyObject *_ffi_new_with_allocator(PyObject *allocator, PyObject *args,
                                          PyObject *kwds)
 {
@@ -364,6 +521,7 @@ static PyObject *_ffi_new_with_allocator(PyObject *allocator, PyObject *args,
     alloc1.ca_alloc = (my_alloc == Py_None ? NULL : my_alloc);
     alloc1.ca_free  = (my_free  == Py_None ? NULL : my_free);
     alloc1.ca_dont_clear = (PyTuple_GET_ITEM(allocator, 3) == Py_False);
+    alloc1.ca_arena = NULL;
 
     return _ffi_new((FFIObject *)PyTuple_GET_ITEM(allocator, 0),
                     args, kwds, &alloc1);
@@ -419,6 +577,32 @@ static PyObject *ffi_new_allocator(FFIObject *self, PyObject *args,
     return result;
 }
 
+PyDoc_STRVAR(ffi_arena_doc,
+"Return a new arena.  'arena.new(cdecl, init=None)' behaves like\n"
+"ffi.new(), but the memory is a slice of a big block of 'block_size'\n"
+"bytes owned by the arena.  All the memory is freed at once by\n"
+"'arena.close()', or at the end of a 'with' statement; the cdata objects\n"
+"must not be used any more after that.  Until then, each cdata object\n"
+"keeps the arena alive.");
+
+static PyObject *ffi_arena(FFIObject *self, PyObject *args, PyObject *kwds)
+{
+    PyObject *typeof_fn, *res;
+    Py_ssize_t block_size = 0;
+    static char *keywords[] = {"block_size", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|n:arena", keywords,
+                                     &block_size))
+        return NULL;
+
+    typeof_fn = PyObject_GetAttrString((PyObject *)self, "typeof");
+    if (typeof_fn == NULL)
+        return NULL;
+    res = new_arena_object(block_size, typeof_fn);
+    Py_DECREF(typeof_fn);
+    return res;
+}
+
 PyDoc_STRVAR(ffi_cast_doc,
 "Similar to a C cast: returns an instance of the named C\n"
 "type initialized with the given 'source'.  The source is\n"
@@ -427,7 +611,7 @@ PyDoc_STRVAR(ffi_cast_doc,
 static PyObject *ffi_cast(FFIObject *self, PyObject *args)
 {
     CTypeDescrObject *ct;
-    PyObject *ob, *arg;
+    PyObject *ob, *arg, *res;
     if (!PyArg_ParseTuple(args, "OO:cast", &arg, &ob))
         return NULL;
 
@@ -435,7 +619,9 @@ static PyObject *ffi_cast(FFIObject *self, PyObject *args)
     if (ct == NULL)
         return NULL;
 
-    return do_cast(ct, ob);
+    res = do_cast(ct, ob);
+    Py_DECREF(ct);
+    return res;
 }
 
 PyDoc_STRVAR(ffi_string_doc,
@@ -470,7 +656,11 @@ PyDoc_STRVAR(ffi_unpack_doc,
 "\n"
 "If 'cdata' is a pointer to anything else, returns a list of\n"
 "'length' items.  This is a faster equivalent to:\n"
-"[cdata[i] for i in range(length)]");
+"[cdata[i] for i in range(length)]\n"
+"\n"
+"If 'as_array' is true and 'cdata' is a pointer to a primitive integer\n"
+"or floating-point type, returns instead an 'array.array' with a copy\n"
+"of the 'length' items.");
 
 #define ffi_unpack  b_unpack     /* ffi_unpack() => b_unpack()
                                     from _cffi_backend.c */
@@ -485,7 +675,7 @@ PyDoc_STRVAR(ffi_offsetof_doc,
 static PyObject *ffi_offsetof(FFIObject *self, PyObject *args)
 {
     PyObject *arg;
-    CTypeDescrObject *ct;
+    CTypeDescrObject *ct, *ct0;
     Py_ssize_t i, offset;
 
     if (PyTuple_Size(args) < 2) {
@@ -495,18 +685,22 @@ static PyObject *ffi_offsetof(FFIObject *self, PyObject *args)
     }
 
     arg = PyTuple_GET_ITEM(args, 0);
-    ct = _ffi_type(self, arg, ACCEPT_STRING|ACCEPT_CTYPE);
-    if (ct == NULL)
+    ct0 = _ffi_type(self, arg, ACCEPT_STRING|ACCEPT_CTYPE);
+    if (ct0 == NULL)
         return NULL;
 
+    ct = ct0;
     offset = 0;
     for (i = 1; i < PyTuple_GET_SIZE(args); i++) {
         Py_ssize_t ofs1;
         ct = direct_typeoffsetof(ct, PyTuple_GET_ITEM(args, i), i > 1, &ofs1);
-        if (ct == NULL)
+        if (ct == NULL) {
+            Py_DECREF(ct0);
             return NULL;
+        }
         offset += ofs1;
     }
+    Py_DECREF(ct0);
     return PyInt_FromSsize_t(offset);
 }
 
@@ -527,8 +721,8 @@ static PyObject *address_of_global_var(PyObject *args);  /* forward */
 
 static PyObject *ffi_addressof(FFIObject *self, PyObject *args)
 {
-    PyObject *arg, *z, *result;
-    CTypeDescrObject *ct;
+    PyObject *arg, *z, *result = NULL;
+    CTypeDescrObject *ct, *ct0;
     Py_ssize_t i, offset = 0;
     int accepted_flags;
 
@@ -544,7 +738,7 @@ static PyObject *ffi_addressof(FFIObject *self, PyObject *args)
         return address_of_global_var(args);
     }
 
-    ct = _ffi_type(self, arg, ACCEPT_CDATA);
+    ct0 = ct = _ffi_type(self, arg, ACCEPT_CDATA);
     if (ct == NULL)
         return NULL;
 
@@ -554,7 +748,7 @@ static PyObject *ffi_addressof(FFIObject *self, PyObject *args)
         if ((ct->ct_flags & accepted_flags) == 0) {
             PyErr_SetString(PyExc_TypeError,
                             "expected a cdata struct/union/array object");
-            return NULL;
+            goto done;
         }
     }
     else {
@@ -563,25 +757,27 @@ static PyObject *ffi_addressof(FFIObject *self, PyObject *args)
         if ((ct->ct_flags & accepted_flags) == 0) {
             PyErr_SetString(PyExc_TypeError,
                         "expected a cdata struct/union/array/pointer object");
-            return NULL;
+            goto done;
         }
         for (i = 1; i < PyTuple_GET_SIZE(args); i++) {
             Py_ssize_t ofs1;
             ct = direct_typeoffsetof(ct, PyTuple_GET_ITEM(args, i),
                                      i > 1, &ofs1);
             if (ct == NULL)
-                return NULL;
+                goto done;
             offset += ofs1;
         }
     }
 
     z = new_pointer_type(ct);
     if (z == NULL)
-        return NULL;
+        goto done;
 
     result = new_simple_cdata(((CDataObject *)arg)->c_data + offset,
                               (CTypeDescrObject *)z);
     Py_DECREF(z);
+ done:
+    Py_DECREF(ct0);
     return result;
 }
 
@@ -644,10 +840,13 @@ static PyObject *ffi_getctype(FFIObject *self, PyObject *args, PyObject *kwds)
                  replace_with[0] != '[' && replace_with[0] != '(');
 
     res = _combine_type_name_l(ct, replace_with_len + add_space + 2*add_paren);
-    if (res == NULL)
+    if (res == NULL) {
+        Py_DECREF(ct);
         return NULL;
+    }
 
     p = PyBytes_AS_STRING(res) + ct->ct_name_position;
+    Py_DECREF(ct);
     if (add_paren)
         *p++ = '(';
     if (add_space)
@@ -689,6 +888,27 @@ PyDoc_STRVAR(ffi_from_handle_doc,
 #define ffi_from_handle  b_from_handle   /* ffi_from_handle => b_from_handle
                                             from _cffi_backend.c */
 
+PyDoc_STRVAR(ffi_handle_table_doc,
+"Return a new handle table.  'table.new(x)' returns a non-NULL cdata of\n"
+"type 'void *' that is a handle for the Python object 'x';\n"
+"'table.get(h)' returns 'x' again, and 'table.release(h)' returns 'x'\n"
+"and invalidates the handle.  Unlike with new_handle(), you don't need\n"
+"to keep alive the cdata returned by 'table.new()', and using an\n"
+"invalid or released handle raises ValueError instead of crashing.");
+
+static PyObject *ffi_handle_table(FFIObject *self, PyObject *noarg)
+{
+    PyObject *args, *res;
+
+    /* g_ct_voidp is equal to <ctype 'void *'> */
+    args = PyTuple_Pack(1, (PyObject *)g_ct_voidp);
+    if (args == NULL)
+        return NULL;
+    res = b_handle_table(NULL, args);
+    Py_DECREF(args);
+    return res;
+}
+
 PyDoc_STRVAR(ffi_from_buffer_doc,
 "Return a <cdata 'char[]'> that points to the data of the given Python\n"
 "object, which must support the buffer interface.  Note that this is\n"
@@ -708,9 +928,9 @@ PyDoc_STRVAR(ffi_gc_doc,
 "'destructor(old_cdata_object)' will be called.\n"
 "\n"
 "The optional 'size' gives an estimate of the size, used to\n"
-"trigger the garbage collection more eagerly.  So far only used\n"
-"on PyPy.  It tells the GC that the returned object keeps alive\n"
-"roughly 'size' bytes of external memory.");
+"trigger the garbage collection more eagerly.  It tells the GC that\n"
+"the returned object keeps alive roughly 'size' bytes of external\n"
+"memory.");
 
 #define ffi_gc  b_gcp     /* ffi_gc() => b_gcp()
                              from _cffi_backend.c */
@@ -755,7 +975,12 @@ PyDoc_STRVAR(ffi_callback_doc,
 "'cdecl' must name a C function pointer type.  The callback invokes the\n"
 "specified 'python_callable' (which may be provided either directly or\n"
 "via a decorator).  Important: the callback object must be manually\n"
-"kept alive for as long as the callback may be invoked from the C code.");
+"kept alive for as long as the callback may be invoked from the C code.\n"
+"\n"
+"If 'userdata' is given, the second argument must be a C function\n"
+"pointer instead, taking an extra pointer argument in front.  The result\n"
+"is then a native callback, which calls this C function directly with\n"
+"'userdata' as first argument, without involving Python or the GIL.");
 
 static PyObject *_ffi_callback_decorator(PyObject *outer_args, PyObject *fn)
 {
@@ -771,13 +996,13 @@ static PyObject *_ffi_callback_decorator(PyObject *outer_args, PyObject *fn)
 static PyObject *ffi_callback(FFIObject *self, PyObject *args, PyObject *kwds)
 {
     PyObject *c_decl, *python_callable = Py_None, *error = Py_None;
-    PyObject *res, *onerror = Py_None;
+    PyObject *res, *onerror = Py_None, *userdata = Py_None;
     static char *keywords[] = {"cdecl", "python_callable", "error",
-                               "onerror", NULL};
+                               "onerror", "userdata", NULL};
 
-    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O|OOO", keywords,
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O|OOOO", keywords,
                                      &c_decl, &python_callable, &error,
-                                     &onerror))
+                                     &onerror, &userdata))
         return NULL;
 
     c_decl = (PyObject *)_ffi_type(self, c_decl, ACCEPT_STRING | ACCEPT_CTYPE |
@@ -785,7 +1010,28 @@ static PyObject *ffi_callback(FFIObject *self, PyObject *args, PyObject *kwds)
     if (c_decl == NULL)
         return NULL;
 
+    if (userdata != Py_None) {
+        /* a native callback */
+        if (python_callable == Py_None || error != Py_None ||
+                onerror != Py_None) {
+            PyErr_SetString(PyExc_TypeError,
+                            "ffi.callback(..., userdata=...) needs a C "
+                            "function as second argument, and no 'error' "
+                            "or 'onerror'");
+            Py_DECREF(c_decl);
+            return NULL;
+        }
+        args = Py_BuildValue("(OOO)", c_decl, python_callable, userdata);
+        Py_DECREF(c_decl);
+        if (args == NULL)
+            return NULL;
+        res = b_native_callback(NULL, args);
+        Py_DECREF(args);
+        return res;
+    }
+
     args = Py_BuildValue("(OOOO)", c_decl, python_callable, error, onerror);
+    Py_DECREF(c_decl);
     if (args == NULL)
         return NULL;
 
@@ -801,6 +1047,39 @@ static PyObject *ffi_callback(FFIObject *self, PyObject *args, PyObject *kwds)
     return res;
 }
 
+PyDoc_STRVAR(ffi_callback_pool_doc,
+"Return a pool of 'size' pre-created callbacks of the C function pointer\n"
+"type 'cdecl'.  'pool.acquire(python_callable, error=None, onerror=None)'\n"
+"returns a callback object bound to 'python_callable', like ffi.callback();\n"
+"'pool.release(cb)' puts it back into the pool.  Acquiring and releasing\n"
+"do not prepare a new libffi closure, apart from when the pool is empty:\n"
+"then it grows by one callback.");
+
+static PyObject *ffi_callback_pool(FFIObject *self, PyObject *args,
+                                   PyObject *kwds)
+{
+    PyObject *c_decl, *res;
+    Py_ssize_t size = 0;
+    static char *keywords[] = {"cdecl", "size", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O|n:callback_pool",
+                                     keywords, &c_decl, &size))
+        return NULL;
+
+    c_decl = (PyObject *)_ffi_type(self, c_decl, ACCEPT_STRING | ACCEPT_CTYPE |
+                                                 CONSIDER_FN_AS_FNPTR);
+    if (c_decl == NULL)
+        return NULL;
+
+    args = Py_BuildValue("(On)", c_decl, size);
+    Py_DECREF(c_decl);
+    if (args == NULL)
+        return NULL;
+    res = b_callback_pool(NULL, args);
+    Py_DECREF(args);
+    return res;
+}
+
 #ifdef MS_WIN32
 PyDoc_STRVAR(ffi_getwinerror_doc,
 "Return either the GetLastError() or the error number given by the\n"
@@ -924,6 +1203,37 @@ static PyObject *ffi_list_types(FFIObject *self, PyObject *noargs)
     return result;
 }
 
+static Py_ssize_t lib_realize(LibObject *lib, PyObject *names,
+                              int skip_errors);     /* forward */
+
+PyDoc_STRVAR(ffi_realize_lib_doc,
+"ffi.realize_lib(lib, names=None) builds at once the functions, constants\n"
+"and global variables of 'lib' that are listed in 'names', or all of them\n"
+"if 'names' is None.  Returns how many of them were not built yet.\n"
+"\n"
+"Normally, each attribute of 'lib' is built the first time it is read.\n"
+"Calling this function at import time moves that cost out of the first\n"
+"calls, e.g. before a server forks its worker processes.  The counters\n"
+"are available from _cffi_backend.get_lib_stats(lib).");
+
+static PyObject *ffi_realize_lib(FFIObject *self, PyObject *args,
+                                 PyObject *kwds)
+{
+    LibObject *lib;
+    PyObject *names = Py_None;
+    Py_ssize_t count;
+    static char *keywords[] = {"lib", "names", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O!|O:realize_lib", keywords,
+                                     &Lib_Type, &lib, &names))
+        return NULL;
+
+    count = lib_realize(lib, names, 0);
+    if (count < 0)
+        return NULL;
+    return PyInt_FromSsize_t(count);
+}
+
 PyDoc_STRVAR(ffi_memmove_doc,
 "ffi.memmove(dest, src, n) copies n bytes of memory from src to dest.\n"
 "\n"
@@ -941,6 +1251,63 @@ PyDoc_STRVAR(ffi_memmove_doc,
 #define ffi_memmove  b_memmove     /* ffi_memmove() => b_memmove()
                                       from _cffi_backend.c */
 
+PyDoc_STRVAR(ffi_call_many_doc,
+"ffi.call_many(func, args, result=None, length=-1) calls the C function\n"
+"'func' 'length' times, in a loop that runs in C without the GIL.\n"
+"\n"
+"'func' is a cdata function pointer or a function from a 'lib'.  'args'\n"
+"is a sequence of one array per argument of 'func': the i'th call gets\n"
+"the i'th item of each array.  'result' is the array that receives the\n"
+"return values, or None if 'func' returns void.  The arrays are cdata\n"
+"pointers or arrays of the exact argument or result type, or any\n"
+"contiguous Python buffer object, whose raw data is read or written as\n"
+"such an array.  By default, 'length' is the length of the first array\n"
+"whose length is known; all arrays must have at least 'length' items.");
+
+#define ffi_call_many  b_call_many     /* ffi_call_many() => b_call_many()
+                                          from _cffi_backend.c */
+
+PyDoc_STRVAR(ffi_unpack_field_doc,
+"ffi.unpack_field(cdata, field, length=-1, result=None) copies the field\n"
+"'field' of 'length' consecutive structs into a contiguous array.\n"
+"\n"
+"'cdata' is a pointer or array of structs or unions.  'field' is a field\n"
+"name, or a dotted path like \"a.b\" for a field of a nested struct; it\n"
+"can be a bitfield.  If 'result' is None, returns a new owning array of\n"
+"the field's type; otherwise, 'result' is a cdata pointer or array of\n"
+"the field's type or a writable contiguous buffer object, which is\n"
+"filled and returned.  By default, 'length' is the length of 'cdata',\n"
+"or else of 'result'.");
+
+#define ffi_unpack_field  b_unpack_field  /* ffi_unpack_field() =>
+                                             b_unpack_field()
+                                             from _cffi_backend.c */
+
+PyDoc_STRVAR(ffi_types_cache_info_doc,
+"Return a dict with statistics about the cache of C type strings used\n"
+"by ffi.new(), ffi.cast(), etc.: 'hits', 'misses', 'evictions', 'size'\n"
+"(the number of non-canonical strings like \"char[42]\" currently\n"
+"cached), 'maxsize' (the limit for 'size') and 'pinned' (the number of\n"
+"canonical names, like \"foo_t\" or \"struct foo\", which are never\n"
+"evicted).");
+
+static PyObject *ffi_types_cache_info(FFIObject *self, PyObject *noarg)
+{
+    Py_ssize_t size = 0;
+    if (self->types_recent != NULL)
+        size += PyDict_Size(self->types_recent);
+    if (self->types_old != NULL)
+        size += PyDict_Size(self->types_old);
+    return Py_BuildValue("{s:n,s:n,s:n,s:n,s:n,s:n}",
+                         "hits", self->types_hits,
+                         "misses", self->types_misses,
+                         "evictions", self->types_evictions,
+                         "size", size,
+                         "maxsize", (Py_ssize_t)FFI_TYPES_CACHE_SIZE,
+                         "pinned",
+                         PyDict_Size(self->types_builder.types_dict));
+}
+
 PyDoc_STRVAR(ffi_init_once_doc,
 "init_once(function, tag): run function() once.  More precisely,\n"
 "'function()' is called the first time we see a given 'tag'.\n"
@@ -1067,8 +1434,11 @@ static PyObject *ffi_init_once(FFIObject *self, PyObject *args, PyObject *kwds)
 static PyMethodDef ffi_methods[] = {
  {"addressof",  (PyCFunction)ffi_addressof,  METH_VARARGS, ffi_addressof_doc},
  {"alignof",    (PyCFunction)ffi_alignof,    METH_O,       ffi_alignof_doc},
+ {"arena",      (PyCFunction)ffi_arena,      METH_VKW,     ffi_arena_doc},
  {"def_extern", (PyCFunction)ffi_def_extern, METH_VKW,     ffi_def_extern_doc},
+ {"call_many",  (PyCFunction)ffi_call_many,  METH_VKW,     ffi_call_many_doc},
  {"callback",   (PyCFunction)ffi_callback,   METH_VKW,     ffi_callback_doc},
+ {"callback_pool",(PyCFunction)ffi_callback_pool,METH_VKW,ffi_callback_pool_doc},
  {"cast",       (PyCFunction)ffi_cast,       METH_VARARGS, ffi_cast_doc},
  {"dlclose",    (PyCFunction)ffi_dlclose,    METH_VARARGS, ffi_dlclose_doc},
  {"dlopen",     (PyCFunction)ffi_dlopen,     METH_VARARGS, ffi_dlopen_doc},
@@ -1079,6 +1449,7 @@ static PyMethodDef ffi_methods[] = {
 #ifdef MS_WIN32
  {"getwinerror",(PyCFunction)ffi_getwinerror,METH_VKW,     ffi_getwinerror_doc},
 #endif
+ {"handle_table",(PyCFunction)ffi_handle_table,METH_NOARGS,ffi_handle_table_doc},
  {"init_once",  (PyCFunction)ffi_init_once,  METH_VKW,     ffi_init_once_doc},
  {"integer_const",(PyCFunction)ffi_int_const,METH_VKW,     ffi_int_const_doc},
  {"list_types", (PyCFunction)ffi_list_types, METH_NOARGS,  ffi_list_types_doc},
@@ -1086,11 +1457,17 @@ static PyMethodDef ffi_methods[] = {
  {"new",        (PyCFunction)ffi_new,        METH_VKW,     ffi_new_doc},
 {"new_allocator",(PyCFunction)ffi_new_allocator,METH_VKW,ffi_new_allocator_doc},
  {"new_handle", (PyCFunction)ffi_new_handle, METH_O,       ffi_new_handle_doc},
+{"new_uninitialized",(PyCFunction)ffi_new_uninitialized,METH_VKW,
+                                                ffi_new_uninitialized_doc},
  {"offsetof",   (PyCFunction)ffi_offsetof,   METH_VARARGS, ffi_offsetof_doc},
+ {"realize_lib",(PyCFunction)ffi_realize_lib,METH_VKW,     ffi_realize_lib_doc},
  {"sizeof",     (PyCFunction)ffi_sizeof,     METH_O,       ffi_sizeof_doc},
  {"string",     (PyCFunction)ffi_string,     METH_VKW,     ffi_string_doc},
  {"typeof",     (PyCFunction)ffi_typeof,     METH_O,       ffi_typeof_doc},
+ {"types_cache_info",(PyCFunction)ffi_types_cache_info,METH_NOARGS,
+                                                   ffi_types_cache_info_doc},
  {"unpack",     (PyCFunction)ffi_unpack,     METH_VKW,     ffi_unpack_doc},
+ {"unpack_field",(PyCFunction)ffi_unpack_field,METH_VKW,  ffi_unpack_field_doc},
  {NULL}
 };
 
@@ -29,6 +29,10 @@ struct LibObject_s {
     PyObject *l_libname;        /* some string that gives the name of the lib */
     FFIObject *l_ffi;           /* reference back to the ffi object */
     void *l_libhandle;          /* the dlopen()ed handle, if any */
+    Py_ssize_t l_num_lazy;      /* attributes realized on first access */
+    Py_ssize_t l_num_eager;     /* attributes realized by realize_lib() */
+    double l_lazy_time;         /* seconds spent realizing them */
+    double l_eager_time;
 };
 
 static struct CPyExtFunc_s *_cpyextfunc_get(PyObject *x)
@@ -84,6 +88,25 @@ static PyObject *_cpyextfunc_type_index(PyObject *x)
     return _cpyextfunc_type(lib, exf);
 }
 
+static PyObject *_cpyextfunc_as_cdata(PyObject *x)
+{
+    /* If 'x' is a built-in function from a Lib object, return a new
+       cdata function pointer to the same C function; otherwise, return
+       NULL, with an exception set only if something failed. */
+    struct CPyExtFunc_s *exf;
+    PyObject *ct, *result;
+
+    exf = _cpyextfunc_get(x);
+    if (exf == NULL || exf->direct_fn == NULL)
+        return NULL;
+    ct = _cpyextfunc_type((LibObject *)PyCFunction_GET_SELF(x), exf);
+    if (ct == NULL)
+        return NULL;
+    result = new_simple_cdata(exf->direct_fn, (CTypeDescrObject *)ct);
+    Py_DECREF(ct);
+    return result;
+}
+
 static void cdlopen_close_ignore_errors(void *libhandle);  /* forward */
 static void *cdlopen_fetch(PyObject *libname, void *libhandle,
                            const char *symbol);
@@ -282,6 +305,12 @@ static PyObject *lib_build_and_cache_attr(LibObject *lib, PyObject *name,
         x = lib_build_cpython_func(lib, g, s, METH_O);
         break;
 
+#if PY_VERSION_HEX >= 0x03070000
+    case _CFFI_OP_CPYTHON_BLTN_F:
+        x = lib_build_cpython_func(lib, g, s, METH_FASTCALL);
+        break;
+#endif
+
     case _CFFI_OP_CONSTANT_INT:
     case _CFFI_OP_ENUM:
     {
@@ -425,11 +454,50 @@ static PyObject *lib_build_and_cache_attr(LibObject *lib, PyObject *name,
     return x;
 }
 
+#ifdef MS_WIN32
+static double lib_monotonic_time(void)
+{
+    LARGE_INTEGER freq, t;
+    QueryPerformanceFrequency(&freq);
+    QueryPerformanceCounter(&t);
+    return (double)t.QuadPart / (double)freq.QuadPart;
+}
+#else
+static double lib_monotonic_time(void)
+{
+    struct timespec t;
+    clock_gettime(CLOCK_MONOTONIC, &t);
+    return (double)t.tv_sec + t.tv_nsec * 1e-9;
+}
+#endif
+
+static PyObject *lib_realize_attr(LibObject *lib, PyObject *name, int eager)
+{
+    /* like lib_build_and_cache_attr(), but also keeps track of how
+       many attributes were realized, and how long it took */
+    PyObject *x;
+    double t0 = lib_monotonic_time();
+
+    x = lib_build_and_cache_attr(lib, name, 0);
+    if (x != NULL) {
+        double dt = lib_monotonic_time() - t0;
+        if (eager) {
+            lib->l_num_eager++;
+            lib->l_eager_time += dt;
+        }
+        else {
+            lib->l_num_lazy++;
+            lib->l_lazy_time += dt;
+        }
+    }
+    return x;
+}
+
 #define LIB_GET_OR_CACHE_ADDR(x, lib, name, error)      \
     do {                                                \
         x = PyDict_GetItem(lib->l_dict, name);          \
         if (x == NULL) {                                \
-            x = lib_build_and_cache_attr(lib, name, 0); \
+            x = lib_realize_attr(lib, name, 0);         \
             if (x == NULL) {                            \
                 error;                                  \
             }                                           \
@@ -492,6 +560,93 @@ static PyObject *_lib_dict(LibObject *lib)
     return NULL;
 }
 
+static int _lib_realize1(LibObject *lib, PyObject *name, int skip_errors)
+{
+    /* returns 1 if 'name' was realized now, 0 if it was already or if
+       it failed and 'skip_errors' is set */
+    if (PyDict_GetItem(lib->l_dict, name) != NULL)
+        return 0;
+    if (lib_realize_attr(lib, name, 1) == NULL) {
+        if (skip_errors && PyErr_ExceptionMatches(PyExc_Exception)) {
+            /* leave it lazy: the error shows up again on access */
+            PyErr_Clear();
+            return 0;
+        }
+        return -1;
+    }
+    return 1;
+}
+
+static Py_ssize_t lib_realize(LibObject *lib, PyObject *names,
+                              int skip_errors)
+{
+    /* Realize eagerly the attributes listed in 'names', or all of them
+       if 'names' is None.  Returns how many were not realized yet.  If
+       'skip_errors' is set, the attributes that cannot be realized are
+       left for later instead of making the whole call fail. */
+    Py_ssize_t i, n, count = 0;
+    int res;
+
+    if (names == Py_None) {
+        const struct _cffi_global_s *g = lib->l_types_builder->ctx.globals;
+        n = lib->l_types_builder->ctx.num_globals;
+        for (i = 0; i < n; i++) {
+            PyObject *name = PyText_FromString(g[i].name);
+            if (name == NULL)
+                return -1;
+            res = _lib_realize1(lib, name, skip_errors);
+            Py_DECREF(name);
+            if (res < 0)
+                return -1;
+            count += res;
+        }
+    }
+    else {
+        PyObject *seq = PySequence_Fast(names,
+                            "expected a list of names or None");
+        if (seq == NULL)
+            return -1;
+        n = PySequence_Fast_GET_SIZE(seq);
+        for (i = 0; i < n; i++) {
+            PyObject *name = PySequence_Fast_GET_ITEM(seq, i);
+            if (!PyText_Check(name)) {
+                PyErr_Format(PyExc_TypeError,
+                             "expected a list of names, got an item of "
+                             "type '%.200s'", Py_TYPE(name)->tp_name);
+                Py_DECREF(seq);
+                return -1;
+            }
+            res = _lib_realize1(lib, name, skip_errors);
+            if (res < 0) {
+                Py_DECREF(seq);
+                return -1;
+            }
+            count += res;
+        }
+        Py_DECREF(seq);
+    }
+    return count;
+}
+
+static PyObject *b_get_lib_stats(PyObject *self, PyObject *arg)
+{
+    LibObject *lib;
+
+    if (!LibObject_Check(arg)) {
+        PyErr_Format(PyExc_TypeError, "expected a Lib object, got '%.200s'",
+                     Py_TYPE(arg)->tp_name);
+        return NULL;
+    }
+    lib = (LibObject *)arg;
+    return Py_BuildValue("{s:n,s:d,s:n,s:d,s:n,s:i}",
+                         "lazy", lib->l_num_lazy,
+                         "lazy_time", lib->l_lazy_time,
+                         "eager", lib->l_num_eager,
+                         "eager_time", lib->l_eager_time,
+                         "realized", PyDict_Size(lib->l_dict),
+                         "total", lib->l_types_builder->ctx.num_globals);
+}
+
 static PyObject *lib_getattr(LibObject *lib, PyObject *name)
 {
     const char *p;
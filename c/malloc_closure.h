@@ -62,14 +62,30 @@ emutramp_enabled_check (void)
 #endif
 
 
-/* 'allocate_num_pages' is dynamically adjusted starting from one
-   page.  It grows by a factor of PAGE_ALLOCATION_GROWTH_RATE.  This is
-   meant to handle both the common case of not needing a lot of pages,
-   and the rare case of needing many of them.  Systems in general have a
-   limit of how many mmap'd blocks can be open.
+/* The closures are allocated in "chunks" of 'num_pages' consecutive
+   pages obtained with mmap().  The number of pages of the next chunk
+   starts at one and grows by a factor of PAGE_ALLOCATION_GROWTH_RATE,
+   up to MAX_PAGES_PER_CHUNK.  This is meant to handle both the common
+   case of not needing a lot of pages, and the rare case of needing many
+   of them: systems in general have a limit of how many mmap'd blocks
+   can be open.  The upper bound keeps chunks small enough that they
+   have a reasonable chance to become completely free again.
+
+   Each chunk has its own free list and counts its free blocks.  The
+   chunks are kept in an array sorted by address, so that
+   cffi_closure_free() finds the chunk of a block with a binary search.
+   Allocations are taken from the chunk with the lowest address that
+   has free blocks, which lets the chunks at higher addresses become
+   empty.  When a chunk is completely free, it is returned to the OS,
+   unless it is the only empty chunk: we keep one in reserve, to avoid
+   calling mmap() and munmap() repeatedly if a program keeps allocating
+   and freeing a single closure.
+
+   All this is protected by a lock, not by the GIL.
 */
 
 #define PAGE_ALLOCATION_GROWTH_RATE  1.3
+#define MAX_PAGES_PER_CHUNK          16
 
 static Py_ssize_t allocate_num_pages = 0;
 
@@ -82,13 +98,47 @@ union mmaped_block {
     union mmaped_block *next;
 };
 
-static union mmaped_block *free_list = 0;
+typedef struct {
+    union mmaped_block *blocks;    /* start of the mmap'ed memory */
+    union mmaped_block *free_list;
+    Py_ssize_t num_pages;
+    Py_ssize_t num_blocks;
+    Py_ssize_t num_free;
+} closure_chunk_t;
+
+static closure_chunk_t *closure_chunks = NULL;   /* sorted by address */
+static Py_ssize_t num_closure_chunks = 0;
+static Py_ssize_t closure_chunks_allocated = 0;
+static Py_ssize_t first_chunk_with_free = 0;  /* no free block before */
+static Py_ssize_t num_empty_chunks = 0;
 static Py_ssize_t _pagesize = 0;
+static PyThread_type_lock closure_lock = NULL;
+
+static struct {
+    Py_ssize_t pages;            /* pages currently mmap'ed */
+    Py_ssize_t live;             /* closures currently allocated */
+    Py_ssize_t free;             /* free blocks in the mmap'ed pages */
+    Py_ssize_t pages_released;   /* total pages returned to the OS */
+} closure_stats;
+
+static int init_closure_allocator(void)
+{
+    /* called at module initialization, with the GIL */
+    closure_lock = PyThread_allocate_lock();
+    if (closure_lock == NULL) {
+        PyErr_SetString(PyExc_SystemError, "can't allocate closure_lock");
+        return -1;
+    }
+    return 0;
+}
 
-static void more_core(void)
+static Py_ssize_t more_core(void)
 {
+    /* mmap a new chunk and insert it in 'closure_chunks'.  Returns
+       its index, or -1 if out of memory. */
     union mmaped_block *item;
-    Py_ssize_t count, i;
+    closure_chunk_t *chunk;
+    Py_ssize_t count, i, index;
 
 /* determine the pagesize */
 #ifdef MS_WIN32
@@ -109,9 +159,24 @@ static void more_core(void)
     if (_pagesize <= 0)
         _pagesize = 4096;
 
+    /* make room in 'closure_chunks' */
+    if (num_closure_chunks == closure_chunks_allocated) {
+        Py_ssize_t n = closure_chunks_allocated * 2 + 8;
+        closure_chunk_t *p = realloc(closure_chunks,
+                                     n * sizeof(closure_chunk_t));
+        if (p == NULL)
+            return -1;
+        closure_chunks = p;
+        closure_chunks_allocated = n;
+    }
+
     /* bump 'allocate_num_pages' */
-    allocate_num_pages = 1 + (
-        (Py_ssize_t)(allocate_num_pages * PAGE_ALLOCATION_GROWTH_RATE));
+    if (allocate_num_pages < MAX_PAGES_PER_CHUNK) {
+        allocate_num_pages = 1 + (
+            (Py_ssize_t)(allocate_num_pages * PAGE_ALLOCATION_GROWTH_RATE));
+        if (allocate_num_pages > MAX_PAGES_PER_CHUNK)
+            allocate_num_pages = MAX_PAGES_PER_CHUNK;
+    }
 
     /* calculate the number of mmaped_blocks to allocate */
     count = (allocate_num_pages * _pagesize) / sizeof(union mmaped_block);
@@ -119,11 +184,11 @@ static void more_core(void)
     /* allocate a memory block */
 #ifdef MS_WIN32
     item = (union mmaped_block *)VirtualAlloc(NULL,
-                                           count * sizeof(union mmaped_block),
+                                           allocate_num_pages * _pagesize,
                                            MEM_COMMIT,
                                            PAGE_EXECUTE_READWRITE);
     if (item == NULL)
-        return;
+        return -1;
 #else
     {
     int prot = PROT_READ | PROT_WRITE | PROT_EXEC;
@@ -136,7 +201,7 @@ static void more_core(void)
                         -1,
                         0);
     if (item == (void *)MAP_FAILED)
-        return;
+        return -1;
     }
 #endif
 
@@ -144,33 +209,128 @@ static void more_core(void)
     printf("block at %p allocated (%ld bytes), %ld mmaped_blocks\n",
            item, (long)(allocate_num_pages * _pagesize), (long)count);
 #endif
-    /* put them into the free list */
-    for (i = 0; i < count; ++i) {
-        item->next = free_list;
-        free_list = item;
-        ++item;
+    /* insert the new chunk, keeping 'closure_chunks' sorted */
+    index = num_closure_chunks;
+    while (index > 0 && closure_chunks[index - 1].blocks > item)
+        index--;
+    memmove(&closure_chunks[index + 1], &closure_chunks[index],
+            (num_closure_chunks - index) * sizeof(closure_chunk_t));
+    num_closure_chunks++;
+
+    chunk = &closure_chunks[index];
+    chunk->blocks = item;
+    chunk->free_list = NULL;
+    chunk->num_pages = allocate_num_pages;
+    chunk->num_blocks = count;
+    chunk->num_free = count;
+    /* put the blocks into the free list, the lowest address first */
+    for (i = count - 1; i >= 0; i--) {
+        item[i].next = chunk->free_list;
+        chunk->free_list = &item[i];
+    }
+    num_empty_chunks++;
+    closure_stats.pages += allocate_num_pages;
+    closure_stats.free += count;
+    return index;
+}
+
+static void release_chunk(Py_ssize_t index)
+{
+    closure_chunk_t *chunk = &closure_chunks[index];
+
+#ifdef MALLOC_CLOSURE_DEBUG
+    printf("block at %p released (%ld bytes)\n",
+           chunk->blocks, (long)(chunk->num_pages * _pagesize));
+#endif
+#ifdef MS_WIN32
+    VirtualFree(chunk->blocks, 0, MEM_RELEASE);
+#else
+    munmap(chunk->blocks, chunk->num_pages * _pagesize);
+#endif
+    closure_stats.pages -= chunk->num_pages;
+    closure_stats.free -= chunk->num_blocks;
+    closure_stats.pages_released += chunk->num_pages;
+
+    num_closure_chunks--;
+    memmove(&closure_chunks[index], &closure_chunks[index + 1],
+            (num_closure_chunks - index) * sizeof(closure_chunk_t));
+}
+
+static Py_ssize_t find_chunk(union mmaped_block *item)
+{
+    /* binary search for the chunk that contains 'item' */
+    Py_ssize_t lo = 0, hi = num_closure_chunks;
+    while (hi - lo > 1) {
+        Py_ssize_t mid = (lo + hi) / 2;
+        if (closure_chunks[mid].blocks <= item)
+            lo = mid;
+        else
+            hi = mid;
     }
+    assert(lo < num_closure_chunks);
+    assert(closure_chunks[lo].blocks <= item);
+    assert(item < closure_chunks[lo].blocks + closure_chunks[lo].num_blocks);
+    return lo;
 }
 
 /******************************************************************/
 
-/* put the item back into the free list */
+/* put the item back into the free list of its chunk */
 static void cffi_closure_free(ffi_closure *p)
 {
     union mmaped_block *item = (union mmaped_block *)p;
-    item->next = free_list;
-    free_list = item;
+    closure_chunk_t *chunk;
+    Py_ssize_t index;
+
+    PyThread_acquire_lock(closure_lock, WAIT_LOCK);
+    index = find_chunk(item);
+    chunk = &closure_chunks[index];
+    item->next = chunk->free_list;
+    chunk->free_list = item;
+    chunk->num_free++;
+    closure_stats.live--;
+    closure_stats.free++;
+
+    if (chunk->num_free == chunk->num_blocks) {
+        if (num_empty_chunks > 0)
+            release_chunk(index);    /* keep only one empty chunk */
+        else
+            num_empty_chunks++;
+    }
+    if (index < first_chunk_with_free)
+        first_chunk_with_free = index;
+    PyThread_release_lock(closure_lock);
 }
 
-/* return one item from the free list, allocating more if needed */
+/* return one item from the first chunk with free blocks, allocating
+   more if needed */
 static ffi_closure *cffi_closure_alloc(void)
 {
     union mmaped_block *item;
-    if (!free_list)
-        more_core();
-    if (!free_list)
-        return NULL;
-    item = free_list;
-    free_list = item->next;
+    closure_chunk_t *chunk;
+    Py_ssize_t index;
+
+    PyThread_acquire_lock(closure_lock, WAIT_LOCK);
+    index = first_chunk_with_free;
+    while (index < num_closure_chunks && closure_chunks[index].num_free == 0)
+        index++;
+    if (index == num_closure_chunks) {
+        index = more_core();
+        if (index < 0) {
+            PyThread_release_lock(closure_lock);
+            return NULL;
+        }
+    }
+    first_chunk_with_free = index;
+
+    chunk = &closure_chunks[index];
+    if (chunk->num_free == chunk->num_blocks)
+        num_empty_chunks--;
+    item = chunk->free_list;
+    chunk->free_list = item->next;
+    chunk->num_free--;
+    closure_stats.live++;
+    closure_stats.free--;
+    PyThread_release_lock(closure_lock);
     return &item->closure;
 }
@@ -11,6 +11,9 @@ typedef struct {
     Py_ssize_t mb_size;
     PyObject  *mb_keepalive;
     PyObject  *mb_weakreflist;    /* weakref support */
+    PyObject  *mb_format;         /* NULL, or PEP 3118 format (bytes) */
+    Py_ssize_t mb_itemsize;       /* only if mb_format != NULL */
+    Py_ssize_t mb_nitems;         /* only if mb_format != NULL */
 } MiniBufferObj;
 
 static Py_ssize_t mb_length(MiniBufferObj *self)
@@ -110,9 +113,20 @@ static PyObject *mb_str(MiniBufferObj *self)
 
 static int mb_getbuf(MiniBufferObj *self, Py_buffer *view, int flags)
 {
-    return PyBuffer_FillInfo(view, (PyObject *)self,
-                             self->mb_data, self->mb_size,
-                             /*readonly=*/0, flags);
+    if (PyBuffer_FillInfo(view, (PyObject *)self,
+                          self->mb_data, self->mb_size,
+                          /*readonly=*/0, flags) < 0)
+        return -1;
+    if (self->mb_format != NULL && (flags & PyBUF_FORMAT)) {
+        /* ffi.buffer(..., typed=True): export 'mb_nitems' items of the
+           given format.  If set, 'view->strides' points to
+           'view->itemsize' already. */
+        view->format = PyBytes_AS_STRING(self->mb_format);
+        view->itemsize = self->mb_itemsize;
+        if (view->shape != NULL)
+            view->shape = &self->mb_nitems;
+    }
+    return 0;
 }
 
 static PySequenceMethods mb_as_sequence = {
@@ -143,6 +157,7 @@ mb_dealloc(MiniBufferObj *ob)
     if (ob->mb_weakreflist != NULL)
         PyObject_ClearWeakRefs((PyObject *)ob);
     Py_XDECREF(ob->mb_keepalive);
+    Py_XDECREF(ob->mb_format);
     Py_TYPE(ob)->tp_free((PyObject *)ob);
 }
 
@@ -327,7 +342,7 @@ static PyMappingMethods mb_as_mapping = {
 #endif
 
 PyDoc_STRVAR(ffi_buffer_doc,
-"ffi.buffer(cdata[, byte_size]):\n"
+"ffi.buffer(cdata[, byte_size][, typed=False]):\n"
 "Return a read-write buffer object that references the raw C data\n"
 "pointed to by the given 'cdata'.  The 'cdata' must be a pointer or an\n"
 "array.  Can be passed to functions expecting a buffer, or directly\n"
@@ -336,7 +351,10 @@ PyDoc_STRVAR(ffi_buffer_doc,
 "    buf[:]          get a copy of it in a regular string, or\n"
 "    buf[idx]        as a single character\n"
 "    buf[:] = ...\n"
-"    buf[idx] = ...  change the content");
+"    buf[idx] = ...  change the content\n"
+"\n"
+"If 'typed' is True, the buffer interface exports the items with their\n"
+"PEP 3118 format, e.g. for memoryview() or numpy.asarray().");
 
 static PyObject *            /* forward, implemented in _cffi_backend.c */
 b_buffer_new(PyTypeObject *type, PyObject *args, PyObject *kwds);
@@ -402,6 +420,9 @@ static PyObject *minibuffer_new(char *data, Py_ssize_t size,
         ob->mb_size = size;
         ob->mb_keepalive = keepalive; Py_INCREF(keepalive);
         ob->mb_weakreflist = NULL;
+        ob->mb_format = NULL;
+        ob->mb_itemsize = 1;
+        ob->mb_nitems = size;
         PyObject_GC_Track(ob);
     }
     return (PyObject *)ob;
@@ -170,14 +170,18 @@ static PyGILState_STATE gil_ensure(void)
     PyThreadState *ts = PyGILState_GetThisThreadState();
 
     if (ts != NULL) {
-        ts->gilstate_counter++;
         if (ts != get_current_ts()) {
             /* common case: 'ts' is our non-current thread state and
                we have to make it current and acquire the GIL */
+            ts->gilstate_counter++;
             PyEval_RestoreThread(ts);
             return PyGILState_UNLOCKED;
         }
         else {
+            /* we already hold the GIL, e.g. because the C code that
+               invokes the callback was called without releasing it.
+               Don't touch 'gilstate_counter': gil_release() will then
+               have nothing to do. */
             return PyGILState_LOCKED;
         }
     }
@@ -205,5 +209,7 @@ static PyGILState_STATE gil_ensure(void)
 
 static void gil_release(PyGILState_STATE oldstate)
 {
+    if (oldstate == PyGILState_LOCKED)
+        return;    /* see the fast path in gil_ensure() */
     PyGILState_Release(oldstate);
 }
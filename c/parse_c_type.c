@@ -206,11 +206,16 @@ static int parse_error(token_t *tok, const char *msg)
     return -1;
 }
 
+/* the error message if 'info->output' is too small; the caller may then
+   retry parse_c_type() with a larger 'info->output' */
+static const char parse_error_complexity[] =
+    "internal type complexity limit reached";
+
 static int write_ds(token_t *tok, _cffi_opcode_t ds)
 {
     size_t index = tok->output_index;
     if (index >= tok->info->output_size) {
-        parse_error(tok, "internal type complexity limit reached");
+        parse_error(tok, parse_error_complexity);
         return -1;
     }
     tok->output[index] = ds;
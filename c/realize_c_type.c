@@ -6,6 +6,7 @@ typedef struct {
     PyObject *included_libs;
     PyObject *_keepalive1;
     PyObject *_keepalive2;
+    Py_buffer *_keepalive_buffer;
 } builder_c_t;
 
 
@@ -77,6 +78,10 @@ static void free_builder_c(builder_c_t *builder, int ctx_is_static)
     Py_XDECREF(builder->types_dict);
     Py_XDECREF(builder->_keepalive1);
     Py_XDECREF(builder->_keepalive2);
+    if (builder->_keepalive_buffer != NULL) {
+        PyBuffer_Release(builder->_keepalive_buffer);
+        PyMem_Free(builder->_keepalive_buffer);
+    }
 }
 
 static int init_builder_c(builder_c_t *builder,
@@ -96,6 +101,7 @@ static int init_builder_c(builder_c_t *builder,
     builder->included_libs = NULL;
     builder->_keepalive1 = NULL;
     builder->_keepalive2 = NULL;
+    builder->_keepalive_buffer = NULL;
     return 0;
 }
 
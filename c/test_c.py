@@ -1149,6 +1149,148 @@ def test_call_function_9():
     BSShort = new_primitive_type("short")
     assert f(3, cast(BSChar, -3), cast(BUChar, 200), cast(BSShort, -5)) == 192
 
+def test_call_function_9_varargs_cache():
+    BInt = new_primitive_type("int")
+    BLong = new_primitive_type("long")
+    BFunc9 = new_function_type((BInt,), BInt, True)    # vararg
+    f = cast(BFunc9, _testfunc(9))
+    assert get_varargs_cache_stats(BFunc9) == {
+        'hits': 0, 'misses': 0, 'size': 0, 'maxsize': 8}
+    for i in range(5):
+        assert f(2, cast(BInt, 40), cast(BInt, 2)) == 42
+    stats = get_varargs_cache_stats(BFunc9)
+    assert stats['hits'] == 4 and stats['misses'] == 1 and stats['size'] == 1
+    assert f(1, cast(BInt, 5)) == 5
+    assert f(1, cast(BInt, 5)) == 5
+    assert f(2, cast(BInt, 40), cast(BInt, 2)) == 42
+    stats = get_varargs_cache_stats(BFunc9)
+    assert stats['hits'] == 6 and stats['misses'] == 2 and stats['size'] == 2
+    # more shapes than the cache size: the least recently used are evicted
+    for n in range(12):
+        assert f(n, *[cast(BInt, 1)] * n) == n
+    stats = get_varargs_cache_stats(BFunc9)
+    assert stats['size'] == stats['maxsize']
+    assert f(0) == 0
+    assert get_varargs_cache_stats(BFunc9)['misses'] == stats['misses'] + 1
+    # the same shape with different argument types is a different entry
+    if sizeof(BLong) == sizeof(BInt):
+        assert f(1, cast(BLong, 7)) == 7
+        assert get_varargs_cache_stats(BFunc9)['misses'] == (
+            stats['misses'] + 2)
+    py.test.raises(TypeError, get_varargs_cache_stats, BInt)
+    py.test.raises(TypeError, get_varargs_cache_stats,
+                   new_function_type((BInt,), BInt, False))
+
+def test_call_many():
+    import array
+    BInt = new_primitive_type("int")
+    BLong = new_primitive_type("long")
+    BFunc1 = new_function_type((BInt, BLong), BLong, False)
+    f = cast(BFunc1, _testfunc(1))
+    a = newp(new_array_type(new_pointer_type(BInt), None), [1, 2, 3, 4])
+    b = newp(new_array_type(new_pointer_type(BLong), None), [10, 20, 30, 40])
+    r = newp(new_array_type(new_pointer_type(BLong), None), 4)
+    assert call_many(f, [a, b], r) is None
+    assert list(r) == [11, 22, 33, 44]
+    r[0] = r[1] = r[2] = r[3] = 0
+    call_many(f, [a, b], r, 2)
+    assert list(r) == [11, 22, 0, 0]
+    # pointers have no known length
+    call_many(f, [cast(new_pointer_type(BInt), a), b], r)
+    assert list(r) == [11, 22, 33, 44]
+    py.test.raises(ValueError, call_many, f,
+                   [cast(new_pointer_type(BInt), a),
+                    cast(new_pointer_type(BLong), b)],
+                   cast(new_pointer_type(BLong), r))
+    # buffers are read as raw arrays of the argument type
+    if sizeof(BInt) == 4:
+        ia = array.array('i', [5, 6, 7])
+        call_many(f, [ia, b], r)
+        assert list(r) == [15, 26, 37, 44]
+    py.test.raises(ValueError, call_many, f, [bytearray(3), b], r)
+    # type errors
+    py.test.raises(TypeError, call_many, f, [b, b], r)
+    py.test.raises(TypeError, call_many, f, [a], r)
+    py.test.raises(TypeError, call_many, f, [a, b])
+    py.test.raises(TypeError, call_many, r, [a, b], r)
+    py.test.raises(TypeError, call_many, 42, [a, b], r)
+    r2 = newp(new_array_type(new_pointer_type(BLong), None), 2)
+    py.test.raises(ValueError, call_many, f, [a, b], r2)
+    py.test.raises(ValueError, call_many, f, [a, b], r, 5)
+    # small integer results, and void results
+    BChar = new_primitive_type("char")
+    BFunc0 = new_function_type((BChar, BChar), BChar, False)
+    f = cast(BFunc0, _testfunc(0))
+    BCharArray = new_array_type(new_pointer_type(BChar), None)
+    r = newp(BCharArray, 4)
+    call_many(f, [b"ABC", b"   "], r)
+    assert list(r) == [b"a", b"b", b"c", b"\x00"]
+    BVoid = new_void_type()
+    BFunc5 = new_function_type((), BVoid, False)
+    f = cast(BFunc5, _testfunc(5))
+    set_errno(2)
+    call_many(f, [], None, 3)
+    assert get_errno() == 2 + 3 * 15
+    py.test.raises(TypeError, call_many, f, [], r, 3)
+    py.test.raises(ValueError, call_many, f, [])
+    # varargs are not supported
+    BFunc9 = new_function_type((BInt,), BInt, True)
+    f = cast(BFunc9, _testfunc(9))
+    r = newp(new_array_type(new_pointer_type(BInt), None), 4)
+    py.test.raises(NotImplementedError, call_many, f, [a], r)
+
+def test_unpack_field():
+    import array
+    BInt = new_primitive_type("int")
+    BShort = new_primitive_type("short")
+    BDouble = new_primitive_type("double")
+    BPoint = new_struct_type("struct point")
+    complete_struct_or_union(BPoint, [('x', BDouble, -1),
+                                      ('y', BDouble, -1)])
+    BStruct = new_struct_type("struct foo")
+    complete_struct_or_union(BStruct, [('a1', BShort, -1),
+                                       ('pos', BPoint, -1),
+                                       ('b1', BInt, 3),
+                                       ('b2', BInt, 5)])
+    BStructArray = new_array_type(new_pointer_type(BStruct), None)
+    p = newp(BStructArray, [(i, (i * 1.5, -i), i - 4, i)
+                            for i in range(8)])
+    r = unpack_field(p, "a1")
+    assert typeof(r) is new_array_type(new_pointer_type(BShort), 8)
+    assert list(r) == list(range(8))
+    r = unpack_field(p, "pos.x", 3)
+    assert list(r) == [0.0, 1.5, 3.0]
+    r = unpack_field(p, "pos")
+    assert [(s.x, s.y) for s in r] == [(i * 1.5, -i) for i in range(8)]
+    # bitfields
+    assert list(unpack_field(p, "b1")) == [-4, -3, -2, -1, 0, 1, 2, 3]
+    assert list(unpack_field(p, "b2")) == list(range(8))
+    # into an existing array or buffer
+    r = newp(new_array_type(new_pointer_type(BDouble), None), 10)
+    assert unpack_field(p, "pos.y", result=r) is r
+    assert list(r) == [0.0, -1.0, -2.0, -3.0, -4.0, -5.0, -6.0, -7.0,
+                       0.0, 0.0]
+    if sizeof(BInt) == 4:
+        a = array.array('i', [0] * 8)
+        assert unpack_field(p, "b1", result=a) is a
+        assert list(a) == [-4, -3, -2, -1, 0, 1, 2, 3]
+    # pointers need an explicit length, unless 'result' gives it
+    q = cast(new_pointer_type(BStruct), p)
+    py.test.raises(ValueError, unpack_field, q, "a1")
+    assert list(unpack_field(q, "a1", 2)) == [0, 1]
+    r = newp(new_array_type(new_pointer_type(BShort), None), 5)
+    unpack_field(q, "a1", result=r)
+    assert list(r) == [0, 1, 2, 3, 4]
+    # errors
+    py.test.raises(ValueError, unpack_field, p, "a1", 9)
+    py.test.raises(ValueError, unpack_field, p, "a1", result=r)
+    py.test.raises(TypeError, unpack_field, p, "a1", result=p)
+    py.test.raises(KeyError, unpack_field, p, "a2")
+    py.test.raises(KeyError, unpack_field, p, "pos.z")
+    py.test.raises(TypeError, unpack_field, p, "a1.x")
+    py.test.raises(TypeError, unpack_field, p, "b1.x")
+    py.test.raises(TypeError, unpack_field, r, "a1")
+
 def test_call_function_24():
     BFloat = new_primitive_type("float")
     BFloatComplex = new_primitive_type("float _Complex")
@@ -1279,6 +1421,123 @@ def test_callback():
     e = py.test.raises(TypeError, f)
     assert str(e.value) == "'int(*)(int)' expects 1 arguments, got 0"
 
+def test_closure_stats():
+    if sys.platform.startswith('netbsd'):
+        py.test.skip("closures allocated by libffi")
+    import gc
+    BInt = new_primitive_type("int")
+    BFunc = new_function_type((BInt,), BInt, False)
+    gc.collect()
+    stats0 = get_closure_stats()
+    assert sorted(stats0) == ['chunks', 'free', 'live', 'page_size',
+                              'pages', 'pages_released']
+    callbacks = [callback(BFunc, lambda n, i=i: n + i) for i in range(20000)]
+    stats1 = get_closure_stats()
+    assert stats1['live'] == stats0['live'] + 20000
+    assert stats1['pages'] > stats0['pages']
+    assert stats1['chunks'] > stats0['chunks']
+    assert stats1['free'] >= 0
+    assert (stats1['live'] + stats1['free']) * 16 <= (
+        stats1['pages'] * stats1['page_size'])
+    assert callbacks[12345](1) == 12346
+    # freeing all the callbacks returns all the pages to the OS, apart
+    # from one empty chunk kept in reserve
+    del callbacks
+    gc.collect()
+    stats2 = get_closure_stats()
+    assert stats2['live'] == stats0['live']
+    assert stats2['pages'] <= stats0['pages'] + 16
+    assert stats2['chunks'] <= stats0['chunks'] + 1
+    assert stats2['pages_released'] >= stats1['pages'] - stats0['pages'] - 16
+    # allocating and freeing a single callback does not map new pages
+    for i in range(100):
+        f = callback(BFunc, lambda n: n)
+        del f
+    stats3 = get_closure_stats()
+    assert stats3['pages_released'] == stats2['pages_released']
+    assert stats3['live'] == stats0['live']
+
+def test_callback_many_args():
+    BInt = new_primitive_type("int")
+    BDouble = new_primitive_type("double")
+    for nargs in [0, 1, 7, 8, 9, 15]:
+        BFunc = new_function_type((BInt, BDouble) * nargs, BInt, False)
+        def cb(*args):
+            assert len(args) == 2 * nargs
+            assert args[1::2] == tuple([i + 0.5 for i in range(nargs)])
+            return sum(args[::2])
+        f = callback(BFunc, cb, -1)
+        args = []
+        for i in range(nargs):
+            args += [i * 10, i + 0.5]
+        assert f(*args) == sum(range(nargs)) * 10
+
+def test_native_callback():
+    import gc, weakref
+    BChar = new_primitive_type("char")
+    BCharP = new_pointer_type(BChar)
+    BInt = new_primitive_type("int")
+    BLong = new_primitive_type("long")
+    BSizeT = new_primitive_type("size_t")
+    BVoidP = new_pointer_type(new_void_type())
+    ll = find_and_load_library('c')
+    strlen = ll.load_function(new_function_type((BCharP,), BLong, False),
+                              "strlen")
+    memcmp = ll.load_function(new_function_type((BVoidP, BVoidP, BSizeT),
+                                                BInt, False), "memcmp")
+    # long(*)(void) calling strlen("foobar")
+    s = newp(new_array_type(BCharP, None), b"foobar")
+    f = native_callback(new_function_type((), BLong, False), strlen, s)
+    assert f() == 6
+    assert repr(f).startswith("<cdata 'long(*)()' calling <cdata ")
+    # int(*)(void *, size_t) calling memcmp("hello", x, n)
+    hello = newp(new_array_type(BCharP, None), b"hello")
+    BFunc = new_function_type((BVoidP, BSizeT), BInt, False)
+    g = native_callback(BFunc, memcmp, hello)
+    assert g(b"help", 3) == 0
+    assert g(b"help", 4) < 0
+    assert g(b"hell", 4) == 0
+    # invoked from C code that doesn't hold the GIL: qsort()
+    BIntP = new_pointer_type(BInt)
+    BCmp = new_function_type((BVoidP, BVoidP), BInt, False)
+    BCmpCtx = new_function_type((BIntP, BVoidP, BVoidP), BInt, False)
+    seen = []
+    def compare(ctx, a, b):
+        ctx[0] += 1
+        a = cast(BIntP, a)[0]
+        b = cast(BIntP, b)[0]
+        return (a > b) - (a < b)
+    ctx = newp(BIntP, 0)
+    cmp_ctx = callback(BCmpCtx, compare)
+    cmp = native_callback(BCmp, cmp_ctx, ctx)
+    qsort = ll.load_function(new_function_type((BVoidP, BSizeT, BSizeT, BCmp),
+                                               new_void_type(), False),
+                             "qsort")
+    data = newp(new_array_type(BIntP, None), [5, 3, 8, 1, 9, 2])
+    qsort(data, 6, sizeof(BInt), cmp)
+    assert list(data) == [1, 2, 3, 5, 8, 9]
+    assert ctx[0] > 0
+    # the target and the userdata are kept alive by the callback
+    ref = weakref.ref(ctx)
+    del ctx, cmp_ctx
+    gc.collect()
+    assert ref() is not None
+    del cmp
+    gc.collect()
+    assert ref() is None
+    # errors
+    py.test.raises(TypeError, native_callback, BFunc, memcmp, 42)
+    py.test.raises(TypeError, native_callback, BFunc, lambda *a: 0, hello)
+    py.test.raises(TypeError, native_callback, BFunc, strlen, hello)
+    py.test.raises(TypeError, native_callback,
+                   new_function_type((BVoidP, BSizeT), BLong, False),
+                   memcmp, hello)
+    py.test.raises(TypeError, native_callback,
+                   new_function_type((BVoidP, BInt), BInt, False),
+                   memcmp, hello)
+    py.test.raises(ValueError, native_callback, BFunc,
+                   cast(typeof(memcmp), 0), hello)
+
 def test_callback_exception():
     try:
         import cStringIO
@@ -3089,6 +3348,58 @@ def test_buffer_keepalive():
         buf = buflist[i]
         assert buf[:] == str2bytes("hi there %d\x00" % i)
 
+def test_buffer_typed():
+    import sys
+    if sys.version_info < (3,):
+        py.test.skip("memoryview.format and .shape need Python 3")
+    BInt = new_primitive_type("int")
+    BDouble = new_primitive_type("double")
+    BIntArray = new_array_type(new_pointer_type(BInt), None)
+    c = newp(BIntArray, [10, 20, 30, 40])
+    buf = buffer(c, typed=True)
+    assert len(buf) == 4 * sizeof(BInt)      # still measured in bytes
+    m = memoryview(buf)
+    assert m.format == 'i'
+    assert m.itemsize == sizeof(BInt)
+    assert m.shape == (4,)
+    assert m.strides == (sizeof(BInt),)
+    assert m.tolist() == [10, 20, 30, 40]
+    m[2] = -5
+    assert c[2] == -5
+    assert memoryview(buffer(c, 2 * sizeof(BInt), typed=True)).shape == (2,)
+    py.test.raises(ValueError, buffer, c, 5, typed=True)
+    # without 'typed', the buffer is still made of bytes
+    m = memoryview(buffer(c))
+    assert m.format == 'B' and m.shape == (4 * sizeof(BInt),)
+    # arrays of arrays, and structs
+    BArray23 = new_array_type(new_pointer_type(
+        new_array_type(new_pointer_type(BInt), 3)), 2)
+    assert memoryview(buffer(newp(BArray23), typed=True)).format == '(3)i'
+    BChar = new_primitive_type("char")
+    BStruct = new_struct_type("struct foo")
+    complete_struct_or_union(BStruct, [('a1', BChar, -1),
+                                       ('a2', BDouble, -1),
+                                       ('a3', BInt, 3),
+                                       ('a4', new_array_type(
+                                           new_pointer_type(BChar), 3), -1)])
+    p = newp(new_array_type(new_pointer_type(BStruct), 5))
+    m = memoryview(buffer(p, typed=True))
+    d = typeoffsetof(BStruct, 'a2')[1]
+    assert m.format == 'T{^c:a1:%dxd:a2:%dx(3)c:a4:%dx}' % (
+        d - 1, typeoffsetof(BStruct, 'a4')[1] - d - 8,
+        sizeof(BStruct) - typeoffsetof(BStruct, 'a4')[1] - 3)
+    assert m.itemsize == sizeof(BStruct)
+    assert m.shape == (5,)
+    # types that cannot be described
+    BUnion = new_union_type("union bar")
+    complete_struct_or_union(BUnion, [('a1', BInt, -1)])
+    e = py.test.raises(TypeError, buffer,
+                       newp(new_pointer_type(BUnion)), typed=True)
+    assert str(e.value) == ("cannot describe 'union bar' with a PEP 3118 "
+                            "format")
+    BVoidP = new_pointer_type(new_void_type())
+    py.test.raises(TypeError, buffer, cast(BVoidP, c), 4, typed=True)
+
 def test_slice():
     BIntP = new_pointer_type(new_primitive_type("int"))
     BIntArray = new_array_type(BIntP, None)
@@ -3904,6 +4215,53 @@ def test_unpack():
     py.test.raises(ValueError, unpack, p0, -1)
     py.test.raises(ValueError, unpack, p, -1)
 
+def test_unpack_as_array():
+    import array, sys
+    for typename, samples in [
+            ("uint8_t",  [0, 2**8-1]),
+            ("uint16_t", [0, 2**16-1]),
+            ("uint32_t", [0, 2**32-1]),
+            ("int8_t",  [-2**7, 2**7-1]),
+            ("int16_t", [-2**15, 2**15-1]),
+            ("int32_t", [-2**31, 2**31-1]),
+            ("long", [-2**31, 2**31-1]),
+            ("float", [0.0, 10.5]),
+            ("double", [12.34, 56.78]),
+            ]:
+        BItem = new_primitive_type(typename)
+        BArray = new_array_type(new_pointer_type(BItem), 10)
+        p = newp(BArray, samples)
+        result = unpack(p, len(samples), as_array=True)
+        assert type(result) is array.array
+        assert result.itemsize == sizeof(BItem)
+        assert list(result) == samples
+        assert list(unpack(p + 1, 0, as_array=True)) == []
+    if sys.version_info >= (3,):
+        for typename in ["int64_t", "uint64_t"]:
+            BItem = new_primitive_type(typename)
+            p = newp(new_array_type(new_pointer_type(BItem), None), [5, 6])
+            assert unpack(p, 2, as_array=True).tolist() == [5, 6]
+    # the result is a copy
+    p = newp(new_array_type(new_pointer_type(BItem), None), [5, 6])
+    result = unpack(p, 2, as_array=True)
+    p[0] = 42
+    assert list(result) == [5, 6]
+    # character types still give strings
+    BChar = new_primitive_type("char")
+    p = newp(new_array_type(new_pointer_type(BChar), None), b"ab")
+    assert unpack(p, 2, as_array=True) == b"ab"
+    # types without an array.array typecode
+    for typename in ["_Bool", "long double", "double _Complex"]:
+        BItem = new_primitive_type(typename)
+        p = newp(new_array_type(new_pointer_type(BItem), None), 2)
+        e = py.test.raises(TypeError, unpack, p, 2, as_array=True)
+        assert str(e.value) == ("cannot unpack items of type '%s' as an "
+                                "array.array" % typename)
+    BInt = new_primitive_type("int")
+    BPtr = new_pointer_type(BInt)
+    p = newp(new_array_type(new_pointer_type(BPtr), None), 2)
+    py.test.raises(TypeError, unpack, p, 2, as_array=True)
+
 def test_cdata_dir():
     BInt = new_primitive_type("int")
     p = cast(BInt, 42)
@@ -4041,3 +4399,171 @@ def test_primitive_comparison():
     assert_eq(cast(t5, 7.0), cast(t3, 7))
     assert_lt(cast(t5, 3.1), 3.101)
     assert_gt(cast(t5, 3.1), 3)
+
+def test_new_arena():
+    BInt = new_primitive_type("int")
+    BIntArray = new_array_type(new_pointer_type(BInt), None)
+    BStruct = new_struct_type("struct foo")
+    BStructPtr = new_pointer_type(BStruct)
+    complete_struct_or_union(BStruct, [('a1', BInt, -1),
+                                       ('a2', BInt, -1)])
+    arena = new_arena(1024)
+    assert (arena.allocated, arena.reserved, arena.blocks) == (0, 0, 0)
+    p = arena.new(BIntArray, 10)
+    assert typeof(p) is BIntArray
+    assert len(p) == 10
+    assert list(p) == [0] * 10
+    q = arena.new(BStructPtr, [5, 6])
+    assert typeof(q) is BStructPtr
+    assert (q.a1, q.a2) == (5, 6)
+    assert arena.blocks == 1
+    assert arena.reserved == 1024
+    assert 48 <= arena.allocated <= 1024
+    # allocations are not overlapping
+    p[9] = -1
+    assert (q.a1, q.a2) == (5, 6)
+    # a big allocation gets a block of its own, without wasting the
+    # rest of the current block
+    big = arena.new(BIntArray, 1000)
+    assert arena.blocks == 2
+    r = arena.new(BStructPtr)
+    assert arena.blocks == 2
+    assert (r.a1, r.a2) == (0, 0)
+    # the cdata objects keep the arena alive
+    n = sys.getrefcount(arena)
+    del p, q, big
+    assert sys.getrefcount(arena) == n - 3
+    del arena
+    r.a1 = 42
+    assert r.a1 == 42
+    #
+    with new_arena() as arena:
+        p = arena.new(BIntArray, 3)
+        assert not arena.closed
+    assert arena.closed
+    py.test.raises(ValueError, arena.new, BIntArray, 3)
+    arena.close()     # no effect
+    #
+    py.test.raises(TypeError, arena.new, "int *")
+    py.test.raises(ValueError, new_arena, -1)
+
+def test_newp_uninitialized():
+    BChar = new_primitive_type("char")
+    BInt = new_primitive_type("int")
+    BCharArray = new_array_type(new_pointer_type(BChar), None)
+    BIntArray = new_array_type(new_pointer_type(BInt), None)
+    p = newp_uninitialized(BIntArray, [5, 6, 7])
+    assert typeof(p) is BIntArray
+    assert list(p) == [5, 6, 7]
+    assert repr(p) == "<cdata 'int[]' owning %d bytes>" % (3 * size_of_int())
+    p = newp_uninitialized(new_pointer_type(BInt))
+    p[0] = 42
+    assert p[0] == 42
+    # big allocations are done with mmap()
+    size = 8 * 1024 * 1024
+    p = newp_uninitialized(BCharArray, size)
+    assert len(p) == size
+    assert sizeof(p) == size
+    assert repr(p) == "<cdata 'char[]' owning %d bytes>" % size
+    p[0] = b'A'
+    p[size - 1] = b'Z'
+    assert p[0] == b'A' and p[size - 1] == b'Z'
+    assert buffer(p)[size - 1:] == b'Z'
+    py.test.raises(TypeError, newp_uninitialized, BInt)
+
+def test_gcp_size():
+    import gc
+    if not gc.isenabled():
+        py.test.skip("the GC is disabled")
+    BInt = new_primitive_type("int")
+    p = newp(new_pointer_type(BInt), 42)
+    seen = []
+    total0 = get_gc_pressure_stats()['external_bytes']
+    q = gcp(p, seen.append, 1000)
+    assert get_gc_pressure_stats()['external_bytes'] == total0 + 1000
+    del q
+    assert seen == [p]
+    assert get_gc_pressure_stats()['external_bytes'] == total0
+    q = gcp(p, seen.append, size=2000)
+    assert get_gc_pressure_stats()['external_bytes'] == total0 + 2000
+    gcp(q, None)
+    assert get_gc_pressure_stats()['external_bytes'] == total0
+    del q
+    assert seen == [p]
+    # reaching the threshold forces a collection, which frees objects
+    # that are only kept alive by reference cycles
+    class Cycle(object):
+        pass
+    cycle = Cycle()
+    cycle.cycle = cycle
+    cycle.q = gcp(p, lambda p: seen.append("cycle"), 100)
+    del cycle
+    stats = get_gc_pressure_stats()
+    big = gcp(p, seen.append,
+              stats['threshold'] - stats['external_bytes'] + 1)
+    assert seen == [p, "cycle"]
+    stats2 = get_gc_pressure_stats()
+    assert stats2['collections'] == stats['collections'] + 1
+    assert stats2['threshold'] > stats2['external_bytes']
+    del big
+    stats3 = get_gc_pressure_stats()
+    assert stats3['external_bytes'] == total0
+    # the threshold goes down again when the total goes down
+    assert stats3['threshold'] < stats2['threshold']
+    assert stats3['threshold'] == total0 + max(total0, 64 * 1024 * 1024)
+    assert stats3['collections'] == stats2['collections']
+
+def test_handle_table():
+    import gc
+    BVoidP = new_pointer_type(new_void_type())
+    py.test.raises(TypeError, handle_table, new_primitive_type("int"))
+    table = handle_table(BVoidP)
+    assert len(table) == 0
+    class X(object):
+        pass
+    objs = [X() for i in range(100)]
+    handles = [table.new(x) for x in objs]
+    assert len(table) == 100
+    assert table.capacity >= 100
+    for h in handles:
+        assert typeof(h) is BVoidP
+        assert h != cast(BVoidP, 0)
+    assert len(set([int(cast(new_primitive_type("intptr_t"), h))
+                    for h in handles])) == 100
+    # the cdata returned by new() does not need to be kept alive
+    BIntP = new_primitive_type("intptr_t")
+    values = [int(cast(BIntP, h)) for h in handles]
+    del handles
+    gc.collect()
+    for value, x in zip(values, objs):
+        assert table.get(cast(BVoidP, value)) is x
+        assert table.get(value) is x
+    # release() returns the object and invalidates the handle
+    assert table.release(values[5]) is objs[5]
+    assert len(table) == 99
+    e = py.test.raises(ValueError, table.get, values[5])
+    assert str(e.value) == "invalid handle, or handle already released"
+    py.test.raises(ValueError, table.release, values[5])
+    # the slot is reused, but the stale handle stays invalid
+    capacity = table.capacity
+    h = table.new("hello")
+    assert table.capacity == capacity
+    py.test.raises(ValueError, table.get, values[5])
+    assert table.get(h) == "hello"
+    # bogus handles
+    py.test.raises(ValueError, table.get, cast(BVoidP, 0))
+    py.test.raises(ValueError, table.get, 0)
+    py.test.raises(ValueError, table.get, 1 << 20)
+    py.test.raises(TypeError, table.get, "foo")
+    py.test.raises(TypeError, table.get, cast(new_primitive_type("int"), 1))
+    # the table keeps the objects alive
+    import weakref
+    x = X()
+    wr = weakref.ref(x)
+    h = table.new(x)
+    del x
+    gc.collect()
+    assert wr() is not None
+    table.release(h)
+    gc.collect()
+    assert wr() is None
@@ -17,8 +17,12 @@
    issue #355.  For a workaround if you want PYTHON3.DLL and don't worry
    about virtualenv, see issue #350.  See also 'py_limited_api' in
    setuptools_ext.py.
+
+   Define _CFFI_NO_LIMITED_API to not use Py_LIMITED_API at all, e.g. to
+   get METH_FASTCALL functions on CPython 3.7 to 3.9.
 */
-#if !defined(_CFFI_USE_EMBEDDING) && !defined(Py_LIMITED_API)
+#if !defined(_CFFI_USE_EMBEDDING) && !defined(Py_LIMITED_API) && \
+    !defined(_CFFI_NO_LIMITED_API)
 #  include <pyconfig.h>
 #  if !defined(Py_DEBUG) && !defined(Py_TRACE_REFS) && !defined(Py_REF_DEBUG)
 #    define Py_LIMITED_API
@@ -270,11 +274,35 @@ _CFFI_UNUSED_FN static PyObject *_cffi_from_c_char32_t(int x)
 }
 
 
+/* Functions with several arguments use METH_FASTCALL on CPython >= 3.7,
+   if Python.h declares it.  It does not with the default
+   '#define Py_LIMITED_API' above, which has no value: only with
+   _CFFI_NO_LIMITED_API, or with Py_LIMITED_API defined as 0x030a0000 or
+   more.  Otherwise, they are compiled as METH_VARARGS functions with
+   the same opcode as OP_CPYTHON_BLTN_V. */
+#if PY_VERSION_HEX >= 0x03070000 && defined(METH_FASTCALL)
+# define _CFFI_USE_FASTCALL
+_CFFI_UNUSED_FN static PyObject *_cffi_fastcall_nargs_error(
+                      const char *name, Py_ssize_t expected, Py_ssize_t nargs)
+{
+    /* same error message as PyArg_UnpackTuple() */
+    PyErr_Format(PyExc_TypeError, "%.200s expected %zd arguments, got %zd",
+                 name, expected, nargs);
+    return NULL;
+}
+#else
+# undef _CFFI_OP_CPYTHON_BLTN_F
+# define _CFFI_OP_CPYTHON_BLTN_F  _CFFI_OP_CPYTHON_BLTN_V
+#endif
+
+
 /**********  end CPython-specific section  **********/
 #else
 _CFFI_UNUSED_FN
 static void (*_cffi_call_python_org)(struct _cffi_externpy_s *, char *);
 # define _cffi_call_python  _cffi_call_python_org
+# undef _CFFI_OP_CPYTHON_BLTN_F
+# define _CFFI_OP_CPYTHON_BLTN_F  _CFFI_OP_CPYTHON_BLTN_V
 #endif
 
 
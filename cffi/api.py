@@ -96,15 +96,19 @@ class FFI(object):
             self.CData, self.CType = backend._get_types()
         self.buffer = backend.buffer
 
-    def cdef(self, csource, override=False, packed=False):
+    def cdef(self, csource, override=False, packed=False, release_gil=True):
         """Parse the given C source.  This registers all declared functions,
         types, and global variables.  The functions and global variables can
         then be accessed via either 'ffi.dlopen()' or 'ffi.verify()'.
         The types can be used in 'ffi.new()' and other functions.
         If 'packed' is specified as True, all structs declared inside this
         cdef are packed, i.e. laid out without any field alignment at all.
+        If 'release_gil' is specified as False, the functions declared inside
+        this cdef are called without releasing the GIL and without saving
+        or restoring errno (only in API mode, see set_source()).
         """
-        self._cdef(csource, override=override, packed=packed)
+        self._cdef(csource, override=override, packed=packed,
+                   release_gil=release_gil)
 
     def embedding_api(self, csource, packed=False):
         self._cdef(csource, packed=packed, dllexport=True)
@@ -257,6 +261,17 @@ class FFI(object):
             cdecl = self._typeof(cdecl)
         return self._backend.newp(cdecl, init)
 
+    def new_uninitialized(self, cdecl, init=None):
+        """Like ffi.new(), but the memory is not cleared: apart from what
+        is set by 'init', it contains garbage.  Meant for big buffers that
+        are filled right afterwards anyway.  Allocations of 1MB or more
+        are done with mmap(), so that the pages are only committed when
+        they are written to.
+        """
+        if isinstance(cdecl, basestring):
+            cdecl = self._typeof(cdecl)
+        return self._backend.newp_uninitialized(cdecl, init)
+
     def new_allocator(self, alloc=None, free=None,
                       should_clear_after_alloc=True):
         """Return a new allocator, i.e. a function that behaves like ffi.new()
@@ -281,6 +296,16 @@ class FFI(object):
             return allocator(cdecl, init)
         return allocate
 
+    def arena(self, block_size=0):
+        """Return a new arena.  'arena.new(cdecl, init=None)' behaves like
+        ffi.new(), but the memory is a slice of a big block of 'block_size'
+        bytes owned by the arena.  All the memory is freed at once by
+        'arena.close()', or at the end of a 'with' statement; the cdata
+        objects must not be used any more after that.  Until then, each
+        cdata object keeps the arena alive.
+        """
+        return self._backend.new_arena(block_size, self._typeof)
+
     def cast(self, cdecl, source):
         """Similar to a C cast: returns an instance of the named C
         type initialized with the given 'source'.  The source is
@@ -308,7 +333,7 @@ class FFI(object):
         """
         return self._backend.string(cdata, maxlen)
 
-    def unpack(self, cdata, length):
+    def unpack(self, cdata, length, as_array=False):
         """Unpack an array of C data of the given length,
         returning a Python string/unicode/list.
 
@@ -322,10 +347,14 @@ class FFI(object):
         If 'cdata' is a pointer to anything else, returns a list of
         'length' items.  This is a faster equivalent to:
         [cdata[i] for i in range(length)]
+
+        If 'as_array' is true and 'cdata' is a pointer to a primitive
+        integer or floating-point type, returns instead an 'array.array'
+        with a copy of the 'length' items.
         """
-        return self._backend.unpack(cdata, length)
+        return self._backend.unpack(cdata, length, as_array)
 
-   #def buffer(self, cdata, size=-1):
+   #def buffer(self, cdata, size=-1, typed=False):
    #    """Return a read-write buffer object that references the raw C data
    #    pointed to by the given 'cdata'.  The 'cdata' must be a pointer or
    #    an array.  Can be passed to functions expecting a buffer, or directly
@@ -335,6 +364,9 @@ class FFI(object):
    #        buf[idx]        as a single character
    #        buf[:] = ...
    #        buf[idx] = ...  change the content
+   #
+   #    If 'typed' is True, the buffer interface exports the items with
+   #    their PEP 3118 format, e.g. for memoryview() or numpy.asarray().
    #    """
    #    note that 'buffer' is a type, set on this instance by __init__
 
@@ -364,14 +396,61 @@ class FFI(object):
         """
         return self._backend.memmove(dest, src, n)
 
-    def callback(self, cdecl, python_callable=None, error=None, onerror=None):
+    def call_many(self, func, args, result=None, length=-1):
+        """Call the C function 'func' 'length' times, in a loop that
+        runs in C without the GIL.
+
+        'func' is a cdata function pointer or a function from a 'lib'.
+        'args' is a sequence of one array per argument of 'func': the
+        i'th call gets the i'th item of each array.  'result' is the
+        array that receives the return values, or None if 'func' returns
+        void.  The arrays are cdata pointers or arrays of the exact
+        argument or result type, or any contiguous Python buffer object,
+        whose raw data is read or written as such an array.  By default,
+        'length' is the length of the first array whose length is known;
+        all arrays must have at least 'length' items.
+        """
+        return self._backend.call_many(func, args, result, length)
+
+    def unpack_field(self, cdata, field, length=-1, result=None):
+        """Copy the field 'field' of 'length' consecutive structs into
+        a contiguous array.
+
+        'cdata' is a pointer or array of structs or unions.  'field' is
+        a field name, or a dotted path like "a.b" for a field of a nested
+        struct; it can be a bitfield.  If 'result' is None, returns a new
+        owning array of the field's type; otherwise, 'result' is a cdata
+        pointer or array of the field's type or a writable contiguous
+        buffer object, which is filled and returned.  By default,
+        'length' is the length of 'cdata', or else of 'result'.
+        """
+        return self._backend.unpack_field(cdata, field, length, result)
+
+    def callback(self, cdecl, python_callable=None, error=None, onerror=None,
+                 userdata=None):
         """Return a callback object or a decorator making such a
         callback object.  'cdecl' must name a C function pointer type.
         The callback invokes the specified 'python_callable' (which may
         be provided either directly or via a decorator).  Important: the
         callback object must be manually kept alive for as long as the
         callback may be invoked from the C level.
+
+        If 'userdata' is given, the second argument must be a C function
+        pointer instead, taking an extra pointer argument in front.  The
+        result is then a native callback, which calls this C function
+        directly with 'userdata' as first argument, without involving
+        Python or the GIL.
         """
+        if userdata is not None:
+            if (python_callable is None or error is not None or
+                    onerror is not None):
+                raise TypeError("ffi.callback(..., userdata=...) needs a C "
+                                "function as second argument, and no "
+                                "'error' or 'onerror'")
+            if isinstance(cdecl, basestring):
+                cdecl = self._typeof(cdecl, consider_function_as_funcptr=True)
+            return self._backend.native_callback(cdecl, python_callable,
+                                                 userdata)
         def callback_decorator_wrap(python_callable):
             if not callable(python_callable):
                 raise TypeError("the 'python_callable' argument "
@@ -385,6 +464,19 @@ class FFI(object):
         else:
             return callback_decorator_wrap(python_callable)  # direct mode
 
+    def callback_pool(self, cdecl, size=0):
+        """Return a pool of 'size' pre-created callbacks of the C
+        function pointer type 'cdecl'.  'pool.acquire(python_callable,
+        error=None, onerror=None)' returns a callback object bound to
+        'python_callable', like ffi.callback(); 'pool.release(cb)' puts
+        it back into the pool.  Acquiring and releasing do not prepare a
+        new libffi closure, apart from when the pool is empty: then it
+        grows by one callback.
+        """
+        if isinstance(cdecl, basestring):
+            cdecl = self._typeof(cdecl, consider_function_as_funcptr=True)
+        return self._backend.callback_pool(cdecl, size)
+
     def getctype(self, cdecl, replace_with=''):
         """Return a string giving the C type 'cdecl', which may be itself
         a string or a <ctype> object.  If 'replace_with' is given, it gives
@@ -407,9 +499,9 @@ class FFI(object):
         'destructor(old_cdata_object)' will be called.
 
         The optional 'size' gives an estimate of the size, used to
-        trigger the garbage collection more eagerly.  So far only used
-        on PyPy.  It tells the GC that the returned object keeps alive
-        roughly 'size' bytes of external memory.
+        trigger the garbage collection more eagerly.  It tells the GC
+        that the returned object keeps alive roughly 'size' bytes of
+        external memory.
         """
         return self._backend.gcp(cdata, destructor, size)
 
@@ -526,6 +618,17 @@ class FFI(object):
     def from_handle(self, x):
         return self._backend.from_handle(x)
 
+    def handle_table(self):
+        """Return a new handle table.  'table.new(x)' returns a non-NULL
+        cdata of type 'void *' that is a handle for the Python object
+        'x'; 'table.get(h)' returns 'x' again, and 'table.release(h)'
+        returns 'x' and invalidates the handle.  Unlike with new_handle(),
+        you don't need to keep alive the cdata returned by 'table.new()',
+        and using an invalid or released handle raises ValueError instead
+        of crashing.
+        """
+        return self._backend.handle_table(self.BVoidP)
+
     def set_unicode(self, enabled_flag):
         """Windows: if 'enabled_flag' is True, enable the UNICODE and
         _UNICODE defines in C, and declare the types like TCHAR and LPTCSTR
@@ -677,7 +780,23 @@ class FFI(object):
         recompile(self, module_name, source,
                   c_file=filename, call_c_compiler=False, **kwds)
 
-    def compile(self, tmpdir='.', verbose=0, target=None, debug=None):
+    def emit_abi_bundle(self, filename):
+        """Write the same tables as emit_python_code(), but as a binary
+        file that can be loaded (typically via mmap) with
+        _cffi_backend.FFI(module_name, _bundle=data)."""
+        from .recompiler import make_abi_bundle
+        #
+        if not hasattr(self, '_assigned_source'):
+            raise ValueError("set_source() must be called before "
+                             "emit_abi_bundle()")
+        module_name, source, source_extension, kwds = self._assigned_source
+        if source is not None:
+            raise TypeError("emit_abi_bundle() is only for dlopen()-style "
+                            "pure Python modules, not for C extension modules")
+        make_abi_bundle(self, module_name, filename)
+
+    def compile(self, tmpdir='.', verbose=0, target=None, debug=None,
+                build_cache=None):
         """The 'target' argument gives the final file name of the
         compiled DLL.  Use '*' to force distutils' choice, suitable for
         regular CPython C API modules.  Use a file name ending in '.*'
@@ -686,6 +805,10 @@ class FFI(object):
 
         The default is '*' when building a non-embedded C API extension,
         and (module_name + '.*') when building an embedded library.
+
+        'build_cache' is the directory of a persistent cache of compiled
+        modules (see cffi.buildcache).  The default is to use the
+        environment variable CFFI_BUILD_CACHE if set; False disables it.
         """
         from .recompiler import recompile
         #
@@ -694,7 +817,8 @@ class FFI(object):
         module_name, source, source_extension, kwds = self._assigned_source
         return recompile(self, module_name, source, tmpdir=tmpdir,
                          target=target, source_extension=source_extension,
-                         compiler_verbose=verbose, debug=debug, **kwds)
+                         compiler_verbose=verbose, debug=debug,
+                         build_cache=build_cache, **kwds)
 
     def init_once(self, func, tag):
         # Read _init_once_cache[tag], which is either (False, lock) if
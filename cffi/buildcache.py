@@ -0,0 +1,283 @@
+"""A persistent cache of compiled extension modules, for recompile().
+
+The cache is a directory with one subdirectory per compiled module.  The
+name of the subdirectory is a hash of everything that goes into the
+build: the C sources and the files listed in 'depends', the compiler
+flags and other Extension arguments, the compiler and the Python ABI.
+If an entry is found, recompile() copies the compiled module from the
+cache instead of calling the C compiler.
+
+Changes to header files that are only found via 'include_dirs', or to
+the libraries you link with, are not detected; list such files in the
+'depends' argument to set_source(), or clear the cache.
+
+Entries are added atomically (by renaming a temporary directory), so
+several processes can fill the same cache at once.  The total size of
+the cache is bounded: the least recently used entries are removed
+first.  Command-line interface:
+
+    python -m cffi.buildcache [--dir DIR] list|stats|clear
+    python -m cffi.buildcache [--dir DIR] prune [--max-size SIZE]
+"""
+import sys, os, shutil, tempfile, hashlib, errno
+
+ENV_DIR = 'CFFI_BUILD_CACHE'
+ENV_MAX_SIZE = 'CFFI_BUILD_CACHE_MAX_SIZE'
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+EXTENSION_ATTRIBUTES = ['name', 'include_dirs', 'define_macros',
+                        'undef_macros', 'library_dirs', 'libraries',
+                        'runtime_library_dirs', 'extra_objects',
+                        'extra_compile_args', 'extra_link_args',
+                        'export_symbols', 'swig_opts', 'language']
+CONFIG_VARS = ['CC', 'CXX', 'CFLAGS', 'CCSHARED', 'LDSHARED', 'LDFLAGS',
+               'CPPFLAGS', 'OPT', 'BASECFLAGS', 'EXT_SUFFIX', 'SOABI']
+ENVIRON_VARS = ['CC', 'CXX', 'CFLAGS', 'CPPFLAGS', 'LDFLAGS', 'LDSHARED',
+                'ARCHFLAGS']
+
+
+def parse_size(text):
+    """Parse a size in bytes, optionally followed by K, M or G."""
+    text = text.strip().upper()
+    factor = 1
+    for suffix, f in [('K', 1024), ('M', 1024**2), ('G', 1024**3)]:
+        if text.endswith(suffix):
+            text = text[:-1]
+            factor = f
+            break
+    return int(text) * factor
+
+
+def get_build_cache(build_cache=None):
+    """Return a BuildCache or None, from the 'build_cache' argument of
+    recompile(): None means using the directory given by the environment
+    variable CFFI_BUILD_CACHE, if set; False means no cache; a string is
+    the directory of the cache."""
+    if build_cache is None:
+        build_cache = os.environ.get(ENV_DIR) or False
+    if build_cache is False:
+        return None
+    if isinstance(build_cache, BuildCache):
+        return build_cache
+    return BuildCache(build_cache)
+
+
+def _file_digest(filename):
+    h = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        while True:
+            data = f.read(65536)
+            if not data:
+                break
+            h.update(data)
+    return h.hexdigest()
+
+
+class BuildCache(object):
+
+    def __init__(self, path, max_size=None):
+        if max_size is None:
+            max_size = os.environ.get(ENV_MAX_SIZE)
+            if max_size:
+                max_size = parse_size(max_size)
+            else:
+                max_size = DEFAULT_MAX_SIZE
+        self.path = os.path.abspath(path)
+        self.max_size = max_size
+
+    def compute_key(self, ext, extra=()):
+        """Return the hash of everything that goes into building 'ext',
+        a distutils Extension whose sources are relative to the current
+        directory.  'extra' is any other repr()-able information."""
+        from distutils import sysconfig
+        from . import __version__
+        #
+        lines = ['cffi %s' % (__version__,),
+                 'python %s' % (sys.version,),
+                 'platform %s' % (sys.platform,),
+                 'extra %r' % (extra,)]
+        for name in EXTENSION_ATTRIBUTES:
+            lines.append('ext.%s %r' % (name, getattr(ext, name, None)))
+        for name in CONFIG_VARS:
+            lines.append('config %s %r' % (name,
+                                           sysconfig.get_config_var(name)))
+        for name in ENVIRON_VARS:
+            lines.append('environ %s %r' % (name, os.environ.get(name)))
+        for filename in (list(ext.sources) + list(ext.depends or []) +
+                         list(ext.extra_objects or [])):
+            lines.append('file %r %s' % (filename, _file_digest(filename)))
+        text = '\n'.join(lines)
+        if not isinstance(text, bytes):
+            text = text.encode('utf-8')
+        return hashlib.sha256(text).hexdigest()
+
+    def _entry(self, key):
+        return os.path.join(self.path, key)
+
+    def lookup(self, key, outputdir):
+        """If 'key' is in the cache, copy the compiled module into
+        'outputdir' (at the same relative path as when it was built) and
+        return its absolute path.  Otherwise, return None."""
+        entry = self._entry(key)
+        try:
+            with open(os.path.join(entry, 'output')) as f:
+                relpath = f.read()
+            target = os.path.join(outputdir, relpath)
+            _copy_file_atomically(
+                os.path.join(entry, os.path.basename(relpath)), target)
+        except (IOError, OSError):
+            return None     # missing, or removed by another process
+        try:
+            os.utime(entry, None)      # mark as recently used
+        except OSError:
+            pass
+        return os.path.abspath(target)
+
+    def store(self, key, outputdir, outputfilename):
+        """Add 'outputfilename', built in 'outputdir', to the cache under
+        the given 'key'.  Then prune the cache if it is too large."""
+        relpath = os.path.relpath(outputfilename, outputdir)
+        try:
+            os.makedirs(self.path)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        tmpdir = tempfile.mkdtemp(prefix='.tmp-', dir=self.path)
+        try:
+            shutil.copy2(outputfilename,
+                         os.path.join(tmpdir, os.path.basename(relpath)))
+            with open(os.path.join(tmpdir, 'output'), 'w') as f:
+                f.write(relpath)
+            os.rename(tmpdir, self._entry(key))
+        except OSError:
+            # most probably, another process stored the same key first
+            shutil.rmtree(tmpdir, ignore_errors=True)
+        self.prune()
+
+    def entries(self):
+        """Return a list of (key, module_file, size, mtime), from the
+        least recently used to the most recently used."""
+        result = []
+        try:
+            names = os.listdir(self.path)
+        except OSError:
+            return result
+        for key in names:
+            if key.startswith('.'):
+                continue     # temporary or trash directories
+            entry = self._entry(key)
+            try:
+                with open(os.path.join(entry, 'output')) as f:
+                    relpath = f.read()
+                size = 0
+                for name in os.listdir(entry):
+                    size += os.path.getsize(os.path.join(entry, name))
+                mtime = os.path.getmtime(entry)
+            except (IOError, OSError):
+                continue     # incomplete or being removed
+            result.append((key, relpath, size, mtime))
+        result.sort(key=lambda item: item[3])
+        return result
+
+    def total_size(self):
+        return sum([item[2] for item in self.entries()])
+
+    def prune(self, max_size=None):
+        """Remove the least recently used entries until the total size
+        is at most 'max_size' (by default, the cache's 'max_size').
+        Returns the number of removed entries."""
+        if max_size is None:
+            max_size = self.max_size
+        entries = self.entries()
+        total = sum([item[2] for item in entries])
+        removed = 0
+        for key, relpath, size, mtime in entries:
+            if total <= max_size:
+                break
+            self._remove(key)
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        return self.prune(0)
+
+    def _remove(self, key):
+        # move it first into a fresh trash directory, so that other
+        # processes don't see a half-removed entry, and then delete
+        trash = tempfile.mkdtemp(prefix='.trash-', dir=self.path)
+        try:
+            try:
+                os.rename(self._entry(key), os.path.join(trash, key))
+            except OSError:
+                pass     # already removed by another process
+        finally:
+            shutil.rmtree(trash, ignore_errors=True)
+
+
+def _copy_file_atomically(src, dst):
+    dstdir = os.path.dirname(dst)
+    if dstdir and not os.path.isdir(dstdir):
+        os.makedirs(dstdir)
+    tmp = '%s.%d.tmp' % (dst, os.getpid())
+    shutil.copy2(src, tmp)
+    try:
+        if hasattr(os, 'replace'):
+            os.replace(tmp, dst)
+        else:
+            if sys.platform == 'win32' and os.path.exists(dst):
+                os.unlink(dst)
+            os.rename(tmp, dst)
+    except OSError:
+        os.unlink(tmp)
+        raise
+
+
+def _format_size(size):
+    for unit in ['bytes', 'KB', 'MB']:
+        if size < 1024 * 10:
+            return '%d %s' % (size, unit)
+        size //= 1024
+    return '%d GB' % (size,)
+
+def main(argv=None):
+    import optparse, time
+    parser = optparse.OptionParser(
+        usage='%prog [--dir DIR] list|stats|prune|clear [--max-size SIZE]')
+    parser.add_option('--dir', default=os.environ.get(ENV_DIR),
+                      help='the cache directory (default: $%s)' % ENV_DIR)
+    parser.add_option('--max-size', default=None,
+                      help='for "prune": the maximum total size, like 100M '
+                           '(default: $%s, or %s)' % (
+                               ENV_MAX_SIZE, _format_size(DEFAULT_MAX_SIZE)))
+    options, args = parser.parse_args(argv)
+    if len(args) != 1 or args[0] not in ('list', 'stats', 'prune', 'clear'):
+        parser.error('expected one command: list, stats, prune or clear')
+    if not options.dir:
+        parser.error('no cache directory: use --dir or set $%s' % ENV_DIR)
+    max_size = None
+    if options.max_size is not None:
+        max_size = parse_size(options.max_size)
+    cache = BuildCache(options.dir, max_size)
+    command = args[0]
+    if command == 'list':
+        for key, relpath, size, mtime in cache.entries():
+            print('%s  %s  %10s  %s' % (
+                key[:16], time.strftime('%Y-%m-%d %H:%M:%S',
+                                        time.localtime(mtime)),
+                _format_size(size), relpath))
+    elif command == 'stats':
+        entries = cache.entries()
+        print('directory: %s' % (cache.path,))
+        print('entries:   %d' % (len(entries),))
+        print('size:      %s' % (_format_size(
+            sum([item[2] for item in entries])),))
+        print('max size:  %s' % (_format_size(cache.max_size),))
+    elif command == 'prune':
+        print('removed %d entries' % (cache.prune(),))
+    elif command == 'clear':
+        print('removed %d entries' % (cache.clear(),))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
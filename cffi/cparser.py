@@ -6,6 +6,10 @@ try:
 except ImportError:
     import pycparser
 import weakref, re, sys
+try:
+    import cPickle as _pickle
+except ImportError:
+    import pickle as _pickle      # Python 3
 
 try:
     if sys.version_info < (3,):
@@ -45,6 +49,15 @@ def _get_parser():
         _parser_cache = pycparser.CParser()
     return _parser_cache
 
+def _is_private(st):
+    # for the CFFI_CDEF_CACHE files: True if the result of os.stat()
+    # says that it belongs to us and is not writable by other users.
+    # There is no such check on Windows.
+    import os
+    if not hasattr(os, 'getuid'):
+        return True
+    return st.st_uid == os.getuid() and not (st.st_mode & 0o022)
+
 def _workaround_for_old_pycparser(csource):
     # Workaround for a pycparser issue (fixed between pycparser 2.10 and
     # 2.14): "char*const***" gives us a wrong syntax tree, the same as
@@ -306,16 +319,95 @@ class Parser(object):
             msg = 'parse error\n%s' % (msg,)
         raise CDefError(msg)
 
-    def parse(self, csource, override=False, packed=False, dllexport=False):
+    def parse(self, csource, override=False, packed=False, dllexport=False,
+              release_gil=True):
         prev_options = self._options
         try:
             self._options = {'override': override,
                              'packed': packed,
-                             'dllexport': dllexport}
-            self._internal_parse(csource)
+                             'dllexport': dllexport,
+                             'release_gil': release_gil}
+            cache_file = self._get_cache_file(csource)
+            if cache_file is None or not self._load_cached_state(cache_file):
+                self._internal_parse(csource)
+                if cache_file is not None:
+                    self._store_cached_state(cache_file)
         finally:
             self._options = prev_options
 
+    # The on-disk cache of parse results, enabled by setting the
+    # environment variable CFFI_CDEF_CACHE to a directory name.  It is
+    # only used for the first parse() done by a Parser: it stores the
+    # complete state of the Parser afterwards.  For the following
+    # parse()s, the result would depend on the existing model objects,
+    # which must keep their identity.  As the files are unpickled, the
+    # directory and the files must belong to the current user and not be
+    # writable by anybody else; otherwise the cache is not used.
+
+    _STATE_ATTRIBUTES = ['_declarations', '_included_declarations',
+                         '_anonymous_counter', '_int_constants',
+                         '_recomplete', '_uses_new_feature']
+
+    def _get_cache_file(self, csource):
+        import os, hashlib
+        from . import __version__
+        cachedir = os.environ.get('CFFI_CDEF_CACHE')
+        if not cachedir:
+            return None
+        if os.path.isdir(cachedir) and not _is_private(os.stat(cachedir)):
+            import warnings
+            warnings.warn("CFFI_CDEF_CACHE: not using the directory %r, "
+                          "which belongs to another user or is writable "
+                          "by other users" % (cachedir,))
+            return None
+        if (self._declarations or self._included_declarations or
+                self._anonymous_counter or self._int_constants or
+                self._recomplete):
+            return None       # not the first parse()
+        key = repr((__version__, getattr(pycparser, '__version__', None),
+                    sys.version, sorted(self._options.items()), csource))
+        if not isinstance(key, bytes):
+            key = key.encode('utf-8')
+        return os.path.join(cachedir, 'cdef-%s.pickle' % (
+            hashlib.sha256(key).hexdigest(),))
+
+    def _load_cached_state(self, cache_file):
+        import os
+        try:
+            with open(cache_file, 'rb') as f:
+                if not _is_private(os.fstat(f.fileno())):
+                    return False
+                state = _pickle.load(f)
+        except Exception:
+            return False      # missing, corrupted, or incompatible file
+        for name in self._STATE_ATTRIBUTES:
+            setattr(self, name, state[name])
+        return True
+
+    def _store_cached_state(self, cache_file):
+        import os, tempfile
+        state = {}
+        for name in self._STATE_ATTRIBUTES:
+            state[name] = getattr(self, name)
+        cachedir = os.path.dirname(cache_file)
+        try:
+            if not os.path.isdir(cachedir):
+                os.makedirs(cachedir, 0o700)
+            fd, tmpname = tempfile.mkstemp(dir=cachedir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    _pickle.dump(state, f, _pickle.HIGHEST_PROTOCOL)
+                if hasattr(os, 'replace'):
+                    os.replace(tmpname, cache_file)
+                else:
+                    os.rename(tmpname, cache_file)
+            except:
+                os.unlink(tmpname)
+                raise
+        except (EnvironmentError, _pickle.PicklingError, TypeError,
+                AttributeError, RuntimeError):
+            pass      # the cache is only an optimization
+
     def _internal_parse(self, csource):
         ast, macros, csource = self._parse(csource)
         # add the macros
@@ -420,7 +512,10 @@ class Parser(object):
             tag = 'extern_python_plus_c '
         else:
             tag = 'function '
-        self._declare(tag + decl.name, tp)
+        if tag == 'function ' and not self._options.get('release_gil', True):
+            self._declare(tag + decl.name, tp, quals=model.Q_KEEP_GIL)
+        else:
+            self._declare(tag + decl.name, tp)
 
     def _parse_decl(self, decl):
         node = decl.type
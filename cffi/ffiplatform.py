@@ -1,4 +1,4 @@
-import sys, os
+import sys, os, time
 from .error import VerificationError
 
 
@@ -13,20 +13,43 @@ def get_extension(srcfilename, modname, sources=(), **kwds):
         allsources.append(os.path.normpath(src))
     return Extension(name=modname, sources=allsources, **kwds)
 
-def compile(tmpdir, ext, compiler_verbose=0, debug=None):
-    """Compile a C extension module using distutils."""
+def compile(tmpdir, ext, compiler_verbose=0, debug=None, timings=None):
+    """Compile a C extension module.  Normally, this invokes directly the
+    compiler and linker found by distutils (see _DirectDriver); in the
+    cases not supported by the direct driver, or if the environment
+    variable CFFI_BUILD_DRIVER is set to 'distutils', it runs the
+    complete distutils 'build_ext' command instead.
+
+    If 'timings' is None, the timings of this build are reported (see
+    report_timings()).  Otherwise, they are added to 'timings', a
+    BuildTimings instance, and the caller should report them."""
 
     _hack_at_distutils()
-    saved_environ = os.environ.copy()
-    try:
-        outputfilename = _build(tmpdir, ext, compiler_verbose, debug)
-        outputfilename = os.path.abspath(outputfilename)
-    finally:
-        # workaround for a distutils bugs where some env vars can
-        # become longer and longer every time it is used
-        for key, value in saved_environ.items():
-            if os.environ.get(key) != value:
-                os.environ[key] = value
+    if debug is None:
+        debug = sys.flags.debug
+    report = timings is None
+    if report:
+        timings = BuildTimings(ext.name)
+    driver = _get_direct_driver(tmpdir, ext, timings)
+    if driver is not None:
+        outputfilename = driver.build(tmpdir, ext, compiler_verbose, debug,
+                                      timings)
+    else:
+        timings.driver = 'distutils'
+        saved_environ = os.environ.copy()
+        try:
+            t = timings.start()
+            outputfilename = _build(tmpdir, ext, compiler_verbose, debug)
+            timings.stop('distutils build_ext', t)
+        finally:
+            # workaround for a distutils bugs where some env vars can
+            # become longer and longer every time it is used
+            for key, value in saved_environ.items():
+                if os.environ.get(key) != value:
+                    os.environ[key] = value
+    outputfilename = os.path.abspath(outputfilename)
+    if report:
+        report_timings(timings)
     return outputfilename
 
 def _build(tmpdir, ext, compiler_verbose=0, debug=None):
@@ -59,6 +82,167 @@ def _build(tmpdir, ext, compiler_verbose=0, debug=None):
     #
     return soname
 
+# ____________________________________________________________
+
+# the environment variables read by distutils' customize_compiler()
+COMPILER_ENVIRON_VARS = ['CC', 'CXX', 'CFLAGS', 'CPPFLAGS', 'LDFLAGS',
+                         'LDSHARED', 'CCSHARED', 'AR', 'ARFLAGS']
+
+class _DirectDriver(object):
+    """Compiles and links extension modules by calling directly the
+    CCompiler object, configured like in distutils' 'build_ext' command.
+    Finding this configuration is done only once per interpreter (and
+    per value of the environment variables like CC or CFLAGS), instead
+    of once per build as in _build()."""
+
+    def __init__(self):
+        from distutils.core import Distribution
+        from distutils.ccompiler import new_compiler
+        from distutils.sysconfig import customize_compiler
+        #
+        self.dist = Distribution()
+        self.cmd = cmd = self.dist.get_command_obj('build_ext')
+        cmd.ensure_finalized()
+        self.compiler = compiler = new_compiler(compiler=cmd.compiler,
+                                                force=True)
+        customize_compiler(compiler)
+        # like in build_ext.run()
+        if cmd.include_dirs is not None:
+            compiler.set_include_dirs(cmd.include_dirs)
+        if cmd.define is not None:
+            for (name, value) in cmd.define:
+                compiler.define_macro(name, value)
+        if cmd.undef is not None:
+            for macro in cmd.undef:
+                compiler.undefine_macro(macro)
+        if cmd.libraries is not None:
+            compiler.set_libraries(cmd.libraries)
+        if cmd.library_dirs is not None:
+            compiler.set_library_dirs(cmd.library_dirs)
+        if cmd.rpath is not None:
+            compiler.set_runtime_library_dirs(cmd.rpath)
+        if cmd.link_objects is not None:
+            compiler.set_link_objects(cmd.link_objects)
+
+    def supports(self, ext):
+        if self.compiler.compiler_type != 'unix':
+            return False     # e.g. MSVC: manifests, export symbols...
+        if sys.platform in ('darwin', 'cygwin'):
+            return False     # more compiler flags fixing in distutils
+        if getattr(ext, 'swig_opts', None) or [
+                src for src in ext.sources if src.endswith('.i')]:
+            return False
+        # a 'setup.cfg' in the current directory or a '~/.pydistutils.cfg'
+        # could change the options of 'build_ext'
+        if self.dist.find_config_files():
+            return False
+        return True
+
+    def build(self, tmpdir, ext, compiler_verbose, debug, timings):
+        # like build_ext.build_extension()
+        import distutils.errors, distutils.log
+        timings.driver = 'direct'
+        compiler = self.compiler
+        cmd = self.cmd
+        sources = sorted(ext.sources)
+        # like build_ext.get_ext_fullpath()
+        modpath = ext.name.split('.')
+        ext_path = os.path.join(tmpdir, *modpath[:-1] +
+                                [cmd.get_ext_filename(modpath[-1])])
+        macros = ext.define_macros[:]
+        for undef in ext.undef_macros:
+            macros.append((undef,))
+        try:
+            old_level = distutils.log.set_threshold(0) or 0
+            try:
+                distutils.log.set_verbosity(compiler_verbose)
+                distutils.log.info("building '%s' extension", ext.name)
+                objects = []
+                for source in sources:
+                    t = timings.start()
+                    objects += compiler.compile(
+                        [source], output_dir=tmpdir, macros=macros,
+                        include_dirs=ext.include_dirs, debug=debug,
+                        extra_postargs=ext.extra_compile_args or [],
+                        depends=ext.depends)
+                    timings.stop('compile %s' % (os.path.basename(source),),
+                                 t)
+                if ext.extra_objects:
+                    objects.extend(ext.extra_objects)
+                language = ext.language or compiler.detect_language(sources)
+                t = timings.start()
+                compiler.link_shared_object(
+                    objects, ext_path,
+                    libraries=cmd.get_libraries(ext),
+                    library_dirs=ext.library_dirs,
+                    runtime_library_dirs=ext.runtime_library_dirs,
+                    extra_postargs=ext.extra_link_args or [],
+                    export_symbols=cmd.get_export_symbols(ext),
+                    debug=debug, build_temp=tmpdir, target_lang=language)
+                timings.stop('link', t)
+            finally:
+                distutils.log.set_threshold(old_level)
+        except (distutils.errors.CompileError,
+                distutils.errors.LinkError) as e:
+            raise VerificationError('%s: %s' % (e.__class__.__name__, e))
+        return ext_path
+
+_direct_drivers = {}
+
+def _get_direct_driver(tmpdir, ext, timings):
+    if os.environ.get('CFFI_BUILD_DRIVER', 'direct') != 'direct':
+        return None
+    key = tuple([os.environ.get(name) for name in COMPILER_ENVIRON_VARS])
+    try:
+        driver = _direct_drivers[key]
+    except KeyError:
+        t = timings.start()
+        try:
+            driver = _DirectDriver()
+        except Exception:
+            driver = None      # unexpected distutils version or platform
+        timings.stop('find compiler configuration', t)
+        _direct_drivers[key] = driver
+    if driver is None or not driver.supports(ext):
+        return None
+    return driver
+
+# ____________________________________________________________
+
+class BuildTimings(object):
+    """The time spent in the various steps of building one module."""
+
+    def __init__(self, module_name):
+        self.module_name = module_name
+        self.driver = None
+        self.steps = []     # list of (step name, seconds)
+
+    def start(self):
+        return time.time()
+
+    def stop(self, step, start_time):
+        self.steps.append((step, time.time() - start_time))
+
+    def total(self):
+        return sum([seconds for step, seconds in self.steps])
+
+    def __str__(self):
+        lines = ['cffi build of %r (%s driver): %.3fs' % (
+            self.module_name, self.driver, self.total())]
+        for step, seconds in self.steps:
+            lines.append('    %-40s %.3fs' % (step, seconds))
+        return '\n'.join(lines)
+
+last_build_timings = None
+
+def report_timings(timings):
+    """Record 'timings' as 'last_build_timings' and, if the environment
+    variable CFFI_BUILD_TIMINGS is set, print them to stderr."""
+    global last_build_timings
+    last_build_timings = timings
+    if os.environ.get('CFFI_BUILD_TIMINGS'):
+        sys.stderr.write('%s\n' % (timings,))
+
 try:
     from os.path import samefile
 except ImportError:
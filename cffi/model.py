@@ -8,6 +8,8 @@ from .error import CDefError, VerificationError, VerificationMissing
 Q_CONST    = 0x01
 Q_RESTRICT = 0x02
 Q_VOLATILE = 0x04
+# not a C qualifier: set on functions declared with cdef(release_gil=False)
+Q_KEEP_GIL = 0x08
 
 def qualify(quals, replace_with):
     if quals & Q_CONST:
@@ -88,6 +90,9 @@ class VoidType(BaseType):
     def __init__(self):
         self.c_name_with_marker = 'void&'
 
+    def __reduce__(self):
+        return 'void_type'     # unpickle as the same global instance
+
     def build_backend_type(self, ffi, finishlist):
         return global_cache(self, ffi, 'new_void_type')
 
@@ -6,6 +6,7 @@ from .cffi_opcode import *
 VERSION_BASE = 0x2601
 VERSION_EMBEDDED = 0x2701
 VERSION_CHAR16CHAR32 = 0x2801
+VERSION_FASTCALL = 0x2901
 
 
 class GlobalExpr:
@@ -122,6 +123,7 @@ class TypenameExpr:
 
 class Recompiler:
     _num_externpy = 0
+    _uses_fastcall = False
 
     def __init__(self, ffi, module_name, target_is_python=False):
         self.ffi = ffi
@@ -432,8 +434,20 @@ class Recompiler:
         prnt('PyMODINIT_FUNC')
         prnt('PyInit_%s(void)' % (base_module_name,))
         prnt('{')
-        prnt('  return _cffi_init("%s", 0x%x, &_cffi_type_context);' % (
-            self.module_name, self._version))
+        if self._uses_fastcall and self._version < VERSION_FASTCALL:
+            # only needed here: on PyPy and on CPython 2, and with the
+            # default Py_LIMITED_API, OP_CPYTHON_BLTN_F is the same as
+            # OP_CPYTHON_BLTN_V and the module works with older backends
+            prnt('#ifdef _CFFI_USE_FASTCALL')
+            prnt('  return _cffi_init("%s", 0x%x, &_cffi_type_context);' % (
+                self.module_name, VERSION_FASTCALL))
+            prnt('#else')
+            prnt('  return _cffi_init("%s", 0x%x, &_cffi_type_context);' % (
+                self.module_name, self._version))
+            prnt('#endif')
+        else:
+            prnt('  return _cffi_init("%s", 0x%x, &_cffi_type_context);' % (
+                self.module_name, self._version))
         prnt('}')
         prnt('#else')
         prnt('PyMODINIT_FUNC')
@@ -509,6 +523,53 @@ class Recompiler:
         # the footer
         prnt(')')
 
+    def write_abi_bundle_to_f(self, f):
+        # Same content as write_py_source_to_f(), but in the binary
+        # format that _cffi_backend.FFI(_bundle=...) decodes directly
+        # (see cdl_load_bundle() in c/cdlopen.c).  The included ffis are
+        # not recorded; pass them as FFI(_bundle=..., _includes=(..)).
+        import ast, struct
+        def int4(n):
+            return struct.pack('>i', n)
+        def entry(data):
+            return int4(len(data)) + data + b'\0'
+        #
+        out = [b'\0cffiabi', int4(self._version)]
+        self._version = None
+        self.cffi_types = tuple(self.cffi_types)    # don't change any more
+        types = ast.literal_eval(self._to_py(
+            ''.join([op.as_python_bytes() for op in self.cffi_types])))
+        out.append(int4(len(types) // 4))
+        out.append(types)
+        #
+        globs = ast.literal_eval('(%s,)' % ','.join(
+            [e.as_python_expr() for e in self._lsts["global"]]))
+        out.append(int4(len(globs) // 2))
+        for i in range(0, len(globs), 2):
+            value = globs[i + 1]
+            value_mask = value & 0xFFFFFFFFFFFFFFFF
+            out.append(entry(globs[i]))
+            out.append(int4(value <= 0))
+            out.append(struct.pack('>II', value_mask >> 32,
+                                   value_mask & 0xFFFFFFFF))
+        #
+        struct_unions = [ast.literal_eval(e.as_python_expr())
+                         for e in self._lsts["struct_union"]]
+        out.append(int4(len(struct_unions)))
+        out.append(int4(sum([len(desc) - 1 for desc in struct_unions])))
+        for desc in struct_unions:
+            out.append(int4(len(desc) - 1))
+            for data in desc:
+                out.append(entry(data))
+        #
+        for step_name in ["enum", "typename"]:
+            lst = self._lsts[step_name]
+            out.append(int4(len(lst)))
+            for e in lst:
+                out.append(entry(ast.literal_eval(e.as_python_expr())))
+        #
+        f.write(b''.join(out))
+
     # ----------
 
     def _gettypenum(self, type):
@@ -689,8 +750,16 @@ class Recompiler:
         #
         prnt('#ifndef PYPY_VERSION')        # ------------------------------
         #
+        if numargs > 1:
+            prnt('#ifdef _CFFI_USE_FASTCALL')
+            prnt('static PyObject *')
+            prnt('_cffi_f_%s(PyObject *self, PyObject *const *args, '
+                 'Py_ssize_t nargs)' % (name,))
+            prnt('#else')
         prnt('static PyObject *')
         prnt('_cffi_f_%s(PyObject *self, PyObject *%s)' % (name, argname))
+        if numargs > 1:
+            prnt('#endif')
         prnt('{')
         #
         context = 'argument of %s' % name
@@ -718,10 +787,18 @@ class Recompiler:
             for i in rng:
                 prnt('  PyObject *arg%d;' % i)
             prnt()
+            prnt('#ifdef _CFFI_USE_FASTCALL')
+            prnt('  if (nargs != %d)' % len(rng))
+            prnt('    return _cffi_fastcall_nargs_error("%s", %d, nargs);' % (
+                name, len(rng)))
+            for i in rng:
+                prnt('  arg%d = args[%d];' % (i, i))
+            prnt('#else')
             prnt('  if (!PyArg_UnpackTuple(args, "%s", %d, %d, %s))' % (
                 name, len(rng), len(rng),
                 ', '.join(['&arg%d' % i for i in rng])))
             prnt('    return NULL;')
+            prnt('#endif')
         prnt()
         #
         for i, type in enumerate(tp.args):
@@ -729,13 +806,18 @@ class Recompiler:
                                        'return NULL')
             prnt()
         #
-        prnt('  Py_BEGIN_ALLOW_THREADS')
-        prnt('  _cffi_restore_errno();')
+        # functions declared with cdef(release_gil=False) are called
+        # directly: no GIL release, and errno is left untouched
+        keep_gil = self._current_quals & model.Q_KEEP_GIL
+        if not keep_gil:
+            prnt('  Py_BEGIN_ALLOW_THREADS')
+            prnt('  _cffi_restore_errno();')
         call_arguments = ['x%d' % i for i in range(len(tp.args))]
         call_arguments = ', '.join(call_arguments)
         prnt('  { %s%s(%s); }' % (result_code, name, call_arguments))
-        prnt('  _cffi_save_errno();')
-        prnt('  Py_END_ALLOW_THREADS')
+        if not keep_gil:
+            prnt('  _cffi_save_errno();')
+            prnt('  Py_END_ALLOW_THREADS')
         prnt()
         #
         prnt('  (void)self; /* unused */')
@@ -813,7 +895,8 @@ class Recompiler:
         elif numargs == 1:
             meth_kind = OP_CPYTHON_BLTN_O   # 'METH_O'
         else:
-            meth_kind = OP_CPYTHON_BLTN_V   # 'METH_VARARGS'
+            meth_kind = OP_CPYTHON_BLTN_F   # 'METH_FASTCALL' if supported,
+            self._uses_fastcall = True      # otherwise 'METH_VARARGS'
         self._lsts["global"].append(
             GlobalExpr(name, '_cffi_f_%s' % name,
                        CffiOp(meth_kind, type_index),
@@ -1411,6 +1494,33 @@ def make_py_source(ffi, module_name, target_py_file, verbose=False):
     return _make_c_or_py_source(ffi, module_name, None, target_py_file,
                                 verbose)
 
+def make_abi_bundle(ffi, module_name, target_file, verbose=False):
+    if verbose:
+        print("generating %s" % (target_file,))
+    recompiler = Recompiler(ffi, module_name, target_is_python=True)
+    recompiler.collect_type_table()
+    recompiler.collect_step_tables()
+    f = io.BytesIO()
+    recompiler.write_abi_bundle_to_f(f)
+    output = f.getvalue()
+    try:
+        with open(target_file, 'rb') as f1:
+            if f1.read(len(output) + 1) != output:
+                raise IOError
+        if verbose:
+            print("(already up-to-date)")
+        return False     # already up-to-date
+    except IOError:
+        tmp_file = '%s.~%d' % (target_file, os.getpid())
+        with open(tmp_file, 'wb') as f1:
+            f1.write(output)
+        try:
+            os.rename(tmp_file, target_file)
+        except OSError:
+            os.unlink(target_file)
+            os.rename(tmp_file, target_file)
+        return True
+
 def _modname_to_file(outputdir, modname, extension):
     parts = modname.split('.')
     try:
@@ -1472,9 +1582,37 @@ def _patch_for_target(patchlist, target):
                 lambda self, ext_name: target)
 
 
+def _compile_with_cache(ext, build_cache, args, timings):
+    # called with the current directory set to 'tmpdir'
+    from . import buildcache
+    target, embedding, compiler_verbose, debug = args
+    cache = buildcache.get_build_cache(build_cache)
+    if cache is None:
+        return ffiplatform.compile('.', ext, compiler_verbose, debug,
+                                   timings)
+    if debug is None:
+        debug = sys.flags.debug
+    t = timings.start()
+    key = cache.compute_key(ext, (target, embedding, bool(debug)))
+    outputfilename = cache.lookup(key, '.')
+    timings.stop('build cache lookup', t)
+    if outputfilename is not None:
+        timings.driver = 'build cache'
+        if compiler_verbose:
+            print('using the cached build %s' % (
+                os.path.join(cache.path, key),))
+        return outputfilename
+    outputfilename = ffiplatform.compile('.', ext, compiler_verbose, debug,
+                                         timings)
+    t = timings.start()
+    cache.store(key, os.getcwd(), outputfilename)
+    timings.stop('build cache store', t)
+    return outputfilename
+
 def recompile(ffi, module_name, preamble, tmpdir='.', call_c_compiler=True,
               c_file=None, source_extension='.c', extradir=None,
-              compiler_verbose=1, target=None, debug=None, **kwds):
+              compiler_verbose=1, target=None, debug=None,
+              build_cache=None, **kwds):
     if not isinstance(module_name, str):
         module_name = module_name.encode('ascii')
     if ffi._windows_unicode:
@@ -1499,8 +1637,11 @@ def recompile(ffi, module_name, preamble, tmpdir='.', call_c_compiler=True,
                 target = '*'
         #
         ext = ffiplatform.get_extension(ext_c_file, module_name, **kwds)
+        timings = ffiplatform.BuildTimings(module_name)
+        t = timings.start()
         updated = make_c_source(ffi, module_name, preamble, c_file,
                                 verbose=compiler_verbose)
+        timings.stop('generate C source', t)
         if call_c_compiler:
             patchlist = []
             cwd = os.getcwd()
@@ -1516,11 +1657,12 @@ def recompile(ffi, module_name, preamble, tmpdir='.', call_c_compiler=True,
                         msg = 'setting the current directory to'
                     print('%s %r' % (msg, os.path.abspath(tmpdir)))
                 os.chdir(tmpdir)
-                outputfilename = ffiplatform.compile('.', ext,
-                                                     compiler_verbose, debug)
+                outputfilename = _compile_with_cache(ext, build_cache, (
+                    target, embedding, compiler_verbose, debug), timings)
             finally:
                 os.chdir(cwd)
                 _unpatch_meths(patchlist)
+            ffiplatform.report_timings(timings)
             return outputfilename
         else:
             return ext, updated
@@ -112,6 +112,7 @@ def _add_c_module(dist, ffi, module_name, source, source_extension, kwds):
     allsources.extend(kwds.pop('sources', []))
     kwds = _set_py_limited_api(Extension, kwds)
     ext = Extension(name=module_name, sources=allsources, **kwds)
+    ext._cffi_module = True
 
     def make_mod(tmpdir, pre_run=None):
         c_file = os.path.join(tmpdir, module_name + source_extension)
@@ -139,6 +140,8 @@ def _add_c_module(dist, ffi, module_name, source, source_extension, kwds):
                 pre_run = getattr(self, 'pre_run', None)
                 ext.sources[0] = make_mod(self.build_temp, pre_run)
             base_class.run(self)
+        def build_extensions(self):
+            _build_extensions(self, base_class)
     dist.cmdclass['build_ext'] = build_ext_make_mod
     # NB. multiple runs here will create multiple 'build_ext_make_mod'
     # classes.  Even in this case the 'build_ext' command should be
@@ -146,6 +149,155 @@ def _add_c_module(dist, ffi, module_name, source, source_extension, kwds):
     # called again.
 
 
+def _get_build_jobs(cmd):
+    """Return the number of cffi modules to compile in parallel: the value
+    of the environment variable CFFI_BUILD_JOBS if set, or else the
+    '--parallel/-j' option of 'build_ext' (Python >= 3.5).  A value of 0
+    means the number of CPUs."""
+    jobs = os.environ.get('CFFI_BUILD_JOBS')
+    if jobs:
+        try:
+            jobs = int(jobs)
+        except ValueError:
+            error("CFFI_BUILD_JOBS must be an integer, got %r" % (jobs,))
+    else:
+        jobs = getattr(cmd, 'parallel', None)
+        if jobs is True:
+            jobs = 0
+        elif not jobs:
+            return 1
+    if jobs <= 0:
+        try:
+            import multiprocessing
+            jobs = multiprocessing.cpu_count()
+        except (ImportError, NotImplementedError):
+            jobs = 1
+    return jobs
+
+def _build_extensions(cmd, base_class):
+    # There is one 'build_ext_make_mod' class per C module, each one
+    # inheriting from the previous one; only the most derived one does
+    # the work below.
+    if getattr(cmd, '_cffi_building_extensions', False):
+        base_class.build_extensions(cmd)
+        return
+    cmd._cffi_building_extensions = True
+    try:
+        jobs = _get_build_jobs(cmd)
+        cffi_exts = [ext for ext in cmd.extensions
+                     if getattr(ext, '_cffi_module', False)]
+        if jobs <= 1 or len(cffi_exts) <= 1:
+            base_class.build_extensions(cmd)
+            return
+        cmd.check_extensions_list(cmd.extensions)
+        all_exts = cmd.extensions
+        other_exts = [ext for ext in all_exts if ext not in cffi_exts]
+        if other_exts:
+            cmd.extensions = other_exts
+            try:
+                base_class.build_extensions(cmd)
+            finally:
+                cmd.extensions = all_exts
+        _build_cffi_extensions_parallel(cmd, cffi_exts, jobs)
+    finally:
+        cmd._cffi_building_extensions = False
+
+def _spawn_captured(cmdline, output, dry_run):
+    # like distutils.spawn.spawn(), but the output of the command is
+    # recorded in the list 'output' together with the command line
+    import subprocess
+    from distutils.errors import DistutilsExecError
+    cmdline = list(cmdline)
+    if dry_run:
+        output.append((cmdline, ''))
+        return
+    try:
+        p = subprocess.Popen(cmdline, stdout=subprocess.PIPE,
+                             stderr=subprocess.STDOUT)
+    except OSError as e:
+        output.append((cmdline, ''))
+        raise DistutilsExecError("command %r failed: %s" % (cmdline[0], e))
+    out = p.communicate()[0]
+    if not isinstance(out, str):
+        out = out.decode(sys.getfilesystemencoding() or 'utf-8', 'replace')
+    output.append((cmdline, out))
+    if p.returncode != 0:
+        raise DistutilsExecError("command %r failed with exit status %d"
+                                 % (cmdline[0], p.returncode))
+
+def _build_cffi_extensions_parallel(cmd, exts, jobs):
+    """Compile the cffi modules 'exts' with 'jobs' compiler processes
+    running at the same time.  The output of the compiler is printed
+    afterwards in the order of 'exts', and all errors are reported,
+    not only the first one."""
+    import threading
+    from distutils.errors import (CCompilerError, DistutilsError,
+                                  CompileError)
+    from distutils import log
+
+    compiler = cmd.compiler
+    local = threading.local()
+    orig_spawn = compiler.spawn
+    def spawn(cmdline, **kwds):
+        output = getattr(local, 'output', None)
+        if output is None:
+            return orig_spawn(cmdline, **kwds)
+        _spawn_captured(cmdline, output, compiler.dry_run)
+
+    lock = threading.Lock()
+    pending = list(range(len(exts)))
+    outputs = [[] for ext in exts]
+    errors = [None] * len(exts)
+    crashes = []
+    def worker():
+        while True:
+            with lock:
+                if not pending:
+                    return
+                i = pending.pop(0)
+            local.output = outputs[i]
+            try:
+                cmd.build_extension(exts[i])
+            except (CCompilerError, DistutilsError) as e:
+                errors[i] = e
+            except:
+                crashes.append(sys.exc_info())
+            local.output = None
+
+    log.info("building %d cffi modules with %d parallel jobs" %
+             (len(exts), min(jobs, len(exts))))
+    compiler.spawn = spawn
+    try:
+        threads = [threading.Thread(target=worker)
+                   for i in range(min(jobs, len(exts)))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        compiler.spawn = orig_spawn
+    if crashes:
+        exc_type, exc_value, tb = crashes[0]
+        raise exc_value
+
+    failed = []
+    for ext, output, e in zip(exts, outputs, errors):
+        for cmdline, out in output:
+            log.info(' '.join(cmdline))
+            if out:
+                sys.stderr.write(out)
+        sys.stderr.flush()
+        if e is not None:
+            if ext.optional:
+                cmd.warn('building cffi module %r failed: %s' % (ext.name, e))
+            else:
+                log.error('building cffi module %r failed: %s' % (ext.name, e))
+                failed.append('%s: %s' % (ext.name, e))
+    if failed:
+        raise CompileError("%d cffi module(s) failed to build:\n    %s" % (
+            len(failed), '\n    '.join(failed)))
+
+
 def _add_py_module(dist, ffi, module_name):
     from distutils.dir_util import mkpath
     from setuptools.command.build_py import build_py
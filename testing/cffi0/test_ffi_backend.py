@@ -58,6 +58,49 @@ class TestFFI(backend_tests.BackendTests,
         assert tb.tb_frame.f_code.co_name == 'cb'
         assert tb.tb_frame.f_locals['n'] == 234
 
+    def test_callback_pool(self):
+        ffi = FFI(backend=self.Backend())
+        pool = ffi.callback_pool("int(*)(int, int)", 2)
+        assert pool.ctype is ffi.typeof("int(*)(int, int)")
+        cb = pool.acquire(lambda x, y: x - y if y else x + "", error=-1)
+        assert cb(50, 8) == 42
+        assert cb(50, 0) == -1
+        pool.release(cb)
+        cb = pool.acquire(lambda x, y: x * y)
+        assert cb(6, 7) == 42
+        assert (pool.size, pool.available) == (2, 1)
+
+    def test_handle_table(self):
+        ffi = FFI(backend=self.Backend())
+        table = ffi.handle_table()
+        x = ["foo"]
+        h = table.new(x)
+        assert ffi.typeof(h) is ffi.typeof("void *")
+        assert table.get(h) is x
+        assert table.release(h) is x
+        py.test.raises(ValueError, table.release, h)
+
+    def test_new_uninitialized(self):
+        ffi = FFI(backend=self.Backend())
+        ffi.cdef("struct foo_s { int a; short b[3]; };")
+        p = ffi.new_uninitialized("struct foo_s *", {'b': [4, 5, 6]})
+        assert ffi.typeof(p) is ffi.typeof("struct foo_s *")
+        assert list(p.b) == [4, 5, 6]
+        p = ffi.new_uninitialized("char[]", 2 * 1024 * 1024)
+        assert len(ffi.buffer(p)) == 2 * 1024 * 1024
+
+    def test_arena(self):
+        ffi = FFI(backend=self.Backend())
+        ffi.cdef("struct foo_s { int a; short b[3]; };")
+        with ffi.arena(block_size=256) as arena:
+            p = arena.new("struct foo_s *", {'a': 42})
+            assert ffi.typeof(p) is ffi.typeof("struct foo_s *")
+            assert p.a == 42
+            assert list(p.b) == [0, 0, 0]
+            items = [arena.new("struct foo_s *") for i in range(100)]
+            assert arena.blocks > 1
+        assert arena.closed
+
     def test_ffi_new_allocator_2(self):
         ffi = FFI(backend=self.Backend())
         seen = []
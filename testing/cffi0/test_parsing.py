@@ -1,5 +1,5 @@
 import py, sys, re
-from cffi import FFI, FFIError, CDefError, VerificationError
+from cffi import FFI, FFIError, CDefError, VerificationError, model
 from .backend_tests import needs_dlopen_none
 
 
@@ -466,3 +466,78 @@ def test_error_invalid_syntax_for_cdef():
     e = py.test.raises(CDefError, ffi.cdef, 'void foo(void) {}')
     assert str(e.value) == ('<cdef source string>:1: unexpected <FuncDef>: '
                             'this construct is valid C but not valid in cdef()')
+
+def test_cdef_cache(monkeypatch):
+    import os
+    from cffi import cparser
+    from testing.udir import udir
+    cachedir = udir.join('test_cdef_cache')
+    monkeypatch.setenv('CFFI_CDEF_CACHE', str(cachedir))
+    csource = """
+        typedef struct { int a; void *p; } foo_t;
+        struct bar { foo_t *f; struct bar *next; };
+        enum e { E0, E1=5 };
+        #define FOO 42
+        static const int BAZ;
+        void g(struct bar *, void (*)(int, void *));
+    """
+    ffi1 = FFI(backend=FakeBackend())
+    ffi1.cdef(csource)
+    assert len(os.listdir(str(cachedir))) == 1
+    ffi3 = FFI(backend=FakeBackend())
+    ffi3.cdef("typedef int myint_t;")
+    # a second parse of the same source doesn't need pycparser
+    def no_parser():
+        raise AssertionError("should have been found in the cache")
+    monkeypatch.setattr(cparser, '_get_parser', no_parser)
+    ffi2 = FFI(backend=FakeBackend())
+    ffi2.cdef(csource)
+    decls1 = ffi1._parser._declarations
+    decls2 = ffi2._parser._declarations
+    assert sorted(decls2) == sorted(decls1)
+    for key in decls1:
+        assert repr(decls2[key]) == repr(decls1[key])
+    assert ffi2._parser._int_constants == {'FOO': 42, 'E0': 0, 'E1': 5}
+    tp, _ = decls2['function g']
+    assert tp.args[1].args[1].totype is model.void_type
+    tp, _ = decls2['struct bar']
+    assert tp.fldtypes[1].totype is tp
+    # the options are part of the key
+    py.test.raises(AssertionError, FFI(backend=FakeBackend()).cdef,
+                   csource, packed=True)
+    # only the first cdef() of an ffi uses the cache
+    py.test.raises(AssertionError, ffi3.cdef, csource)
+
+def test_cdef_cache_not_private(monkeypatch):
+    import os, stat, warnings
+    if not hasattr(os, 'getuid'):
+        py.test.skip("no check on this platform")
+    from cffi import cparser
+    from testing.udir import udir
+    cachedir = udir.join('test_cdef_cache_not_private')
+    monkeypatch.setenv('CFFI_CDEF_CACHE', str(cachedir))
+    csource = "typedef struct { int a; } foo_t;"
+    FFI(backend=FakeBackend()).cdef(csource)
+    assert stat.S_IMODE(os.stat(str(cachedir)).st_mode) & 0o077 == 0
+    [cache_file] = os.listdir(str(cachedir))
+    cache_file = os.path.join(str(cachedir), cache_file)
+    def no_parser():
+        raise AssertionError("should have been found in the cache")
+    monkeypatch.setattr(cparser, '_get_parser', no_parser)
+    FFI(backend=FakeBackend()).cdef(csource)
+    # a cache file writable by other users is ignored
+    os.chmod(cache_file, 0o666)
+    py.test.raises(AssertionError, FFI(backend=FakeBackend()).cdef, csource)
+    os.chmod(cache_file, 0o600)
+    FFI(backend=FakeBackend()).cdef(csource)
+    # so is a directory writable by other users, with a warning
+    os.chmod(str(cachedir), 0o777)
+    try:
+        with warnings.catch_warnings(record=True) as log:
+            warnings.simplefilter("always")
+            py.test.raises(AssertionError, FFI(backend=FakeBackend()).cdef,
+                           csource)
+    finally:
+        os.chmod(str(cachedir), 0o700)
+    assert len(log) == 1
+    assert "writable by other users" in str(log[0].message)
@@ -23,3 +23,45 @@ def test_flatten():
     assert flatten([4, 5]) == "2l4i5i"
     assert flatten({4: 5}) == "1d4i5i"
     assert flatten({"foo": ("bar", "baaz")}) == "1d3sfoo2l3sbar4sbaaz"
+
+def _compile_module(name, monkeypatch, driver):
+    from cffi import ffiplatform
+    from testing.udir import udir
+    monkeypatch.setenv('CFFI_BUILD_DRIVER', driver)
+    tmpdir = udir.join('test_platform_' + name)
+    tmpdir.ensure(dir=1)
+    src = tmpdir.join(name + '.c')
+    src.write("int foo(void) { return 42; }\n")
+    ext = ffiplatform.get_extension(str(src), name)
+    return ffiplatform.compile(str(tmpdir), ext)
+
+def test_compile_direct_driver(monkeypatch):
+    from cffi import ffiplatform
+    fn1 = _compile_module('_test_platform_direct', monkeypatch, 'direct')
+    timings = ffiplatform.last_build_timings
+    assert os.path.isfile(fn1)
+    if timings.driver == 'direct':
+        steps = [step for step, seconds in timings.steps]
+        assert 'compile _test_platform_direct.c' in steps
+        assert 'link' in steps
+    else:
+        assert timings.driver == 'distutils'   # e.g. on Windows
+    assert timings.total() >= 0.0
+    assert str(timings).startswith(
+        "cffi build of '_test_platform_direct' (%s driver): " %
+        (timings.driver,))
+    #
+    fn2 = _compile_module('_test_platform_distutils', monkeypatch,
+                          'distutils')
+    timings = ffiplatform.last_build_timings
+    assert timings.driver == 'distutils'
+    assert [step for step, seconds in timings.steps] == [
+        'distutils build_ext']
+    assert (os.path.basename(fn1).replace('_direct', '') ==
+            os.path.basename(fn2).replace('_distutils', ''))
+
+def test_compile_timings_printed(monkeypatch, capsys):
+    monkeypatch.setenv('CFFI_BUILD_TIMINGS', '1')
+    _compile_module('_test_platform_timings', monkeypatch, 'direct')
+    out, err = capsys.readouterr()
+    assert "cffi build of '_test_platform_timings'" in err
@@ -0,0 +1,92 @@
+import os, py
+from cffi import FFI, ffiplatform
+from cffi.buildcache import BuildCache, parse_size, main
+from testing.udir import udir
+
+
+def _make_ffi(value=42):
+    ffi = FFI()
+    ffi.cdef("int get_value(void);")
+    ffi.set_source("_test_buildcache", "int get_value(void) { return %d; }"
+                   % (value,))
+    return ffi
+
+def test_parse_size():
+    assert parse_size("123") == 123
+    assert parse_size(" 2k") == 2048
+    assert parse_size("3M") == 3 * 1024 * 1024
+    assert parse_size("1G") == 1024 ** 3
+
+def test_miss_then_hit(monkeypatch):
+    cachedir = udir.join('buildcache-hit')
+    cache = BuildCache(str(cachedir))
+    tmpdir1 = udir.join('buildcache-hit-1')
+    fn1 = _make_ffi().compile(tmpdir=str(tmpdir1), build_cache=cache)
+    assert len(cache.entries()) == 1
+    #
+    def no_compile(*args, **kwds):
+        raise AssertionError("should have been found in the cache")
+    monkeypatch.setattr(ffiplatform, 'compile', no_compile)
+    tmpdir2 = udir.join('buildcache-hit-2')
+    fn2 = _make_ffi().compile(tmpdir=str(tmpdir2), build_cache=str(cachedir))
+    assert fn2 != fn1
+    assert os.path.basename(fn2) == os.path.basename(fn1)
+    assert fn2.startswith(str(tmpdir2))
+    with open(fn1, 'rb') as f1:
+        with open(fn2, 'rb') as f2:
+            assert f1.read() == f2.read()
+    # a different source is a cache miss
+    tmpdir3 = udir.join('buildcache-hit-3')
+    py.test.raises(AssertionError, _make_ffi(43).compile,
+                   tmpdir=str(tmpdir3), build_cache=cache)
+    # no cache at all
+    py.test.raises(AssertionError, _make_ffi().compile,
+                   tmpdir=str(tmpdir3), build_cache=False)
+
+def test_environment_variable(monkeypatch):
+    cachedir = udir.join('buildcache-env')
+    monkeypatch.setenv('CFFI_BUILD_CACHE', str(cachedir))
+    _make_ffi(44).compile(tmpdir=str(udir.join('buildcache-env-1')))
+    assert len(BuildCache(str(cachedir)).entries()) == 1
+
+def test_prune():
+    cachedir = udir.join('buildcache-prune')
+    cache = BuildCache(str(cachedir))
+    for i in range(3):
+        _make_ffi(100 + i).compile(
+            tmpdir=str(udir.join('buildcache-prune-%d' % i)),
+            build_cache=cache)
+    entries = cache.entries()
+    assert len(entries) == 3
+    oldest = entries[0][0]
+    os.utime(str(cachedir.join(oldest)), (0, 0))
+    # the oldest entry is removed first
+    assert cache.prune(cache.total_size() - 1) == 1
+    keys = [entry[0] for entry in cache.entries()]
+    assert len(keys) == 2 and oldest not in keys
+    assert [p for p in os.listdir(str(cachedir)) if p.startswith('.')] == []
+    # storing a new entry prunes according to 'max_size'
+    cache.max_size = 1
+    _make_ffi(103).compile(tmpdir=str(udir.join('buildcache-prune-3')),
+                           build_cache=cache)
+    assert cache.entries() == []
+    assert cache.clear() == 0
+    # removing an entry already removed by another process
+    cache._remove('0' * 40)
+    assert [p for p in os.listdir(str(cachedir)) if p.startswith('.')] == []
+
+def test_command_line(capsys):
+    cachedir = udir.join('buildcache-cli')
+    cache = BuildCache(str(cachedir))
+    _make_ffi(200).compile(tmpdir=str(udir.join('buildcache-cli-1')),
+                           build_cache=cache)
+    main(['--dir', str(cachedir), 'stats'])
+    out, err = capsys.readouterr()
+    assert 'entries:   1\n' in out
+    main(['--dir', str(cachedir), 'list'])
+    out, err = capsys.readouterr()
+    assert '_test_buildcache' in out
+    main(['--dir', str(cachedir), 'prune', '--max-size', '1K'])
+    out, err = capsys.readouterr()
+    assert out == 'removed 1 entries\n'
+    py.test.raises(SystemExit, main, ['--dir', str(cachedir), 'foo'])
@@ -31,6 +31,55 @@ def test_ffi_cache_type():
     assert ffi.typeof("int[][10]") is ffi.typeof("int[][10]")
     assert ffi.typeof("int(*)()") is ffi.typeof("int(*)()")
 
+def test_ffi_types_cache_info():
+    ffi = _cffi1_backend.FFI()
+    info = ffi.types_cache_info()
+    assert info == {'hits': 0, 'misses': 0, 'evictions': 0, 'size': 0,
+                    'maxsize': info['maxsize'], 'pinned': 0}
+    maxsize = info['maxsize']
+    t1 = ffi.typeof("int")
+    t2 = ffi.typeof("int *")
+    assert ffi.typeof("int *") is t2
+    info = ffi.types_cache_info()
+    assert (info['hits'], info['misses']) == (1, 2)
+    assert (info['size'], info['pinned']) == (1, 1)
+    # the cache of non-canonical strings is bounded
+    for i in range(maxsize * 2):
+        ffi.typeof("char[%d]" % i)
+        ffi.typeof("int *")     # used all the time, never evicted
+    info = ffi.types_cache_info()
+    assert info['size'] <= maxsize
+    assert info['evictions'] >= maxsize
+    assert info['pinned'] == 1
+    assert ffi.typeof("int") is t1
+    misses = ffi.types_cache_info()['misses']
+    assert ffi.typeof("int *") is t2
+    assert ffi.typeof("char[%d]" % (maxsize * 2 - 1)).length == maxsize*2-1
+    assert ffi.types_cache_info()['misses'] == misses
+    ffi.typeof("char[0]")
+    assert ffi.types_cache_info()['misses'] == misses + 1
+
+def test_ffi_types_cache_eviction_during_call():
+    import gc
+    ffi = _cffi1_backend.FFI()
+    maxsize = ffi.types_cache_info()['maxsize']
+    class Evil(object):
+        def __init__(self, value):
+            self.value = value
+        def __index__(self):
+            # evict every non-canonical type from the cache
+            for i in range(maxsize * 2):
+                ffi.typeof("char[%d]" % i)
+            gc.collect()
+            return self.value
+        __int__ = __index__
+    p = ffi.cast("unsigned short(*)(int, long, char)", Evil(42))
+    assert ffi.getctype(ffi.typeof(p)) == "unsigned short(*)(int, long, char)"
+    assert int(ffi.cast("intptr_t", p)) == 42
+    p = ffi.new("long long[]", Evil(5))
+    assert ffi.getctype(ffi.typeof(p)) == "long long[]"
+    assert len(p) == 5 and list(p) == [0] * 5
+
 def test_ffi_type_not_immortal():
     import weakref, gc
     ffi = _cffi1_backend.FFI()
@@ -69,6 +118,19 @@ def test_ffi_invalid():
     # array of 10 times an "int[]" is invalid
     py.test.raises(ValueError, ffi.typeof, "int[10][]")
 
+def test_ffi_complex_type():
+    # more than FFI_COMPLEXITY_OUTPUT=64 opcodes, and more than the
+    # limit of 1200 from previous versions
+    ffi = _cffi1_backend.FFI()
+    for n in [10, 100, 2000]:
+        t = ffi.typeof("int(*)(%s)" % (", ".join(["long *"] * n),))
+        assert len(t.args) == n
+        assert t.args[-1] is ffi.typeof("long *")
+    t = ffi.typeof("int" + "[1]" * 700)
+    assert ffi.sizeof(t) == ffi.sizeof("int")
+    e = py.test.raises(ffi.error, ffi.typeof, "int(*)(%s" % ("int, " * 200))
+    assert str(e.value).startswith("identifier expected")
+
 def test_ffi_docstrings():
     # check that all methods of the FFI class have a docstring.
     check_type = type(_cffi1_backend.FFI.new)
@@ -161,6 +223,80 @@ def test_ffi_callback_onerror():
     py.test.raises(TypeError, ffi.callback, "int(int)",
                    lambda x: x, onerror=42)   # <- not callable
 
+def test_ffi_callback_pool():
+    ffi = _cffi1_backend.FFI()
+    pool = ffi.callback_pool("int(int)", 3)
+    assert pool.size == pool.available == 3
+    assert pool.ctype is ffi.typeof("int(*)(int)")
+    cb1 = pool.acquire(lambda x: x + 42)
+    assert ffi.typeof(cb1) is pool.ctype
+    assert cb1(10) == 52
+    cb2 = pool.acquire(lambda x: x + "", error=-66)
+    assert cb2(10) == -66
+    assert pool.available == 1
+    # release and re-acquire: the same trampoline, bound to a new function
+    addr = int(ffi.cast("intptr_t", cb1))
+    pool.release(cb1)
+    assert pool.available == 2
+    py.test.raises(ValueError, pool.release, cb1)
+    py.test.raises(ValueError, pool.release,
+                   ffi.callback("int(int)", lambda x: x))
+    cb3 = pool.acquire(lambda x: x * 2)
+    assert int(ffi.cast("intptr_t", cb3)) == addr
+    assert cb3(10) == 20
+    # calling a released callback does not crash
+    pool.release(cb2)
+    assert cb2(10) == 0
+    # the pool grows when empty
+    cbs = [pool.acquire(lambda x, i=i: x + i) for i in range(5)]
+    assert pool.size == 6 and pool.available == 0
+    assert [cb(100) for cb in cbs] == [100, 101, 102, 103, 104]
+    py.test.raises(TypeError, pool.acquire, 42)
+    py.test.raises(TypeError, pool.acquire, lambda x: x, onerror=42)
+    assert pool.available == 0
+    assert repr(pool) == "<_cffi_backend.CallbackPool 'int(*)(int)' 0/6>"
+
+def test_ffi_callback_pool_release_by_identity():
+    ffi = _cffi1_backend.FFI()
+    pool = ffi.callback_pool("int(*)(int)", 1)
+    def fn(x):
+        return x + 1
+    cb = pool.acquire(fn)
+    assert repr(cb).startswith("<cdata 'int(*)(int)' calling <function ")
+    # a cast of 'cb' compares equal to it, but is not the callback itself
+    cb_copy = ffi.cast("int(*)(int)", cb)
+    assert cb_copy == cb
+    py.test.raises(ValueError, pool.release, cb_copy)
+    py.test.raises(ValueError, pool.release, 42)
+    assert pool.available == 0
+    assert cb(10) == 11
+    pool.release(cb)
+    cb2 = pool.acquire(lambda x: x * 3)
+    assert cb2 is cb
+    assert cb2(10) == 30
+
+def test_ffi_callback_pool_onerror():
+    ffi = _cffi1_backend.FFI()
+    seen = []
+    pool = ffi.callback_pool("int(*)(int)")
+    assert pool.size == 0
+    cb = pool.acquire(lambda x: x + "", onerror=lambda *args: seen.append(args)
+                                                              or 7)
+    assert cb(10) == 7
+    assert seen[0][0] is TypeError
+
+def test_ffi_native_callback():
+    ffi = _cffi1_backend.FFI()
+    target = ffi.callback("int(*)(int *, int)", lambda p, x: p[0] * x)
+    p = ffi.new("int *", 6)
+    cb = ffi.callback("int(int)", target, userdata=p)
+    assert ffi.typeof(cb) is ffi.typeof("int(*)(int)")
+    assert cb(7) == 42
+    py.test.raises(TypeError, ffi.callback, "int(int)", target,
+                   onerror=lambda *args: 0, userdata=p)
+    py.test.raises(TypeError, ffi.callback, "int(int)", userdata=p)
+    py.test.raises(TypeError, ffi.callback, "long(int)", target, userdata=p)
+
 def test_ffi_getctype():
     ffi = _cffi1_backend.FFI()
     assert ffi.getctype("int") == "int"
@@ -405,6 +541,40 @@ def test_ffi_new_allocator_4():
     alloc5 = ffi.new_allocator(myalloc5)
     py.test.raises(MemoryError, alloc5, "int[5]")
 
+def test_ffi_handle_table():
+    ffi = _cffi1_backend.FFI()
+    table = ffi.handle_table()
+    x = ["foo"]
+    h = table.new(x)
+    assert ffi.typeof(h) is ffi.typeof("void *")
+    assert table.get(ffi.cast("void *", ffi.cast("uintptr_t", h))) is x
+    assert table.release(h) is x
+    py.test.raises(ValueError, table.get, h)
+    assert len(table) == 0
+
+def test_ffi_new_uninitialized():
+    ffi = _cffi1_backend.FFI()
+    p = ffi.new_uninitialized("int[5]", [1, 2])
+    assert ffi.typeof(p) is ffi.typeof("int[5]")
+    assert list(p)[:2] == [1, 2]
+    p = ffi.new_uninitialized("char[]", 4 * 1024 * 1024)
+    assert ffi.sizeof(p) == 4 * 1024 * 1024
+    p[4 * 1024 * 1024 - 1] = b"x"
+    assert ffi.buffer(p)[-1:] == b"x"
+
+def test_ffi_arena():
+    ffi = _cffi1_backend.FFI()
+    with ffi.arena() as arena:
+        p = arena.new("int[10]", [5, 6])
+        assert ffi.typeof(p) is ffi.typeof("int[10]")
+        assert list(p) == [5, 6] + [0] * 8
+        q = arena.new(ffi.typeof("char *"), b"x")
+        assert q[0] == b"x"
+        assert arena.allocated >= 42
+    assert arena.closed
+    py.test.raises(ValueError, arena.new, "int *")
+    py.test.raises(ffi.error, ffi.arena().new, "struct unknown_s *")
+
 def test_bool_issue228():
     ffi = _cffi1_backend.FFI()
     fntype = ffi.typeof("int(*callback)(bool is_valid)")
@@ -245,3 +245,72 @@ def test_anonymous_union_inside_struct():
     assert ffi.offsetof("struct NVGcolor", "g") == FLOAT
     assert ffi.offsetof("struct NVGcolor", "b") == FLOAT * 2
     assert ffi.offsetof("struct NVGcolor", "a") == FLOAT * 3
+
+def _load_abi_bundle(data):
+    import _cffi_backend
+    return _cffi_backend.FFI('re_python_pysrc', _bundle=data)
+
+def test_abi_bundle():
+    fn = str(tmpdir.join('re_python_pysrc.cffiabi'))
+    original_ffi.emit_abi_bundle(fn)
+    with open(fn, 'rb') as f:
+        data = f.read()
+    assert data.startswith(b'\x00cffiabi')
+    ffi = _load_abi_bundle(data)
+    from re_python_pysrc import ffi as ffi_py
+    assert ffi.integer_const('FOOBAR') == -42
+    assert ffi.integer_const('BIGPOS') == 420000000000
+    assert ffi.integer_const('BIGNEG') == -420000000000
+    assert ffi.integer_const('BB') == 1
+    for name in ['bar_t', 'struct foo_s', 'enum foo_e', 'struct with_union',
+                 'union with_struct', 'struct NVGcolor']:
+        assert repr(ffi.typeof(name)) == repr(ffi_py.typeof(name))
+    assert ffi.offsetof('struct NVGcolor', 'b') == 8
+    assert ffi.list_types() == ffi_py.list_types()
+    lib = ffi.dlopen(extmod)
+    assert lib.add42(-10) == 32
+    assert lib.globalvar42 == 1234
+    assert ffi.string(lib.globalconsthello) == b"hello"
+    assert lib.FOOBAZ == -43
+    assert lib.CC == 2
+    assert sorted(dir(lib)) == sorted(dir(ffi_py.dlopen(extmod)))
+    # emitting again does not rewrite an up-to-date file
+    assert recompiler.make_abi_bundle(original_ffi, 're_python_pysrc',
+                                      fn) is False
+
+def test_abi_bundle_mmap():
+    import mmap
+    fn = str(tmpdir.join('re_python_pysrc_mmap.cffiabi'))
+    original_ffi.emit_abi_bundle(fn)
+    with open(fn, 'rb') as f:
+        m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    ffi = _load_abi_bundle(m)
+    py.test.raises(BufferError, m.close)      # kept alive by the ffi
+    lib = ffi.dlopen(extmod)
+    assert lib.add42(1) == 43
+    assert ffi.sizeof('bar_t') == ffi.sizeof('int')
+    del lib, ffi
+    import gc; gc.collect()
+    m.close()
+
+def test_abi_bundle_corrupted():
+    import _cffi_backend
+    fn = str(tmpdir.join('re_python_pysrc_bad.cffiabi'))
+    original_ffi.emit_abi_bundle(fn)
+    with open(fn, 'rb') as f:
+        data = f.read()
+    e = py.test.raises(ImportError, _load_abi_bundle, b'not a bundle')
+    assert 'not an ABI bundle' in str(e.value)
+    for i in range(len(data)):
+        py.test.raises(ImportError, _load_abi_bundle, data[:i])
+    py.test.raises(ImportError, _load_abi_bundle, data + b'\x00')
+    # no crash with arbitrary garbage in the counts and lengths
+    for i in range(12, len(data), 4):
+        bad = data[:i] + b'\x7f\xff\xff\xff' + data[i+4:]
+        try:
+            _load_abi_bundle(bad)
+        except ImportError:
+            pass
+    e = py.test.raises(TypeError, _cffi_backend.FFI, 're_python_pysrc',
+                       _version=0x2601, _bundle=data)
+    assert '_bundle' in str(e.value)
@@ -1,7 +1,7 @@
 
 import sys, os, py
 from cffi import FFI, VerificationError, FFIError, CDefError
-from cffi import recompiler
+from cffi import recompiler, model
 from testing.udir import udir
 from testing.support import u, long
 from testing.support import FdWriteCapture, StdErrCapture
@@ -1596,6 +1596,124 @@ def test_extern_python_1():
     assert lib.boz() is None
     assert seen == ["Boz"]
 
+def test_extern_python_stats():
+    import _cffi_backend
+    ffi = FFI()
+    ffi.cdef("""
+        extern "Python" int bar(int);
+        int callbar(int);
+    """)
+    lib = verify(ffi, 'test_extern_python_stats', """
+        static int bar(int);
+        static int callbar(int x) { return bar(x); }
+    """)
+    compiled_ffi = sys.modules['_CFFI_test_extern_python_stats'].ffi
+    stats = _cffi_backend.get_extern_python_stats(compiled_ffi, "bar")
+    assert stats == {'hits': 0, 'misses': 0, 'size': 0, 'maxsize': 4}
+
+    @ffi.def_extern()
+    def bar(x):
+        return x + 1
+    for i in range(10):
+        assert lib.callbar(i) == i + 1
+    stats = _cffi_backend.get_extern_python_stats(compiled_ffi, "bar")
+    assert stats['misses'] == 1
+    assert stats['hits'] == 9
+    assert stats['size'] == 1
+
+    # redefining the function drops the cached entry
+    @ffi.def_extern(name="bar")
+    def bar2(x):
+        return x + 2
+    stats = _cffi_backend.get_extern_python_stats(compiled_ffi, "bar")
+    assert stats['size'] == 0
+    assert lib.callbar(5) == 7
+    stats = _cffi_backend.get_extern_python_stats(compiled_ffi, "bar")
+    assert stats['misses'] == 2
+    assert stats['size'] == 1
+
+    py.test.raises(ffi.error, _cffi_backend.get_extern_python_stats,
+                   compiled_ffi, "callbar")
+    py.test.raises(ffi.error, _cffi_backend.get_extern_python_stats,
+                   compiled_ffi, "nonexistent")
+
+def test_realize_lib():
+    import _cffi_backend
+    ffi = FFI()
+    ffi.cdef("int f1(int); int f2(int); int gvar;\n#define FOO 42")
+    lib = verify(ffi, 'test_realize_lib', """
+        static int f1(int x) { return x + 1; }
+        static int f2(int x) { return x + 2; }
+        static int gvar = 5;
+        #define FOO 42
+    """)
+    compiled_ffi = sys.modules['_CFFI_test_realize_lib'].ffi
+    stats = _cffi_backend.get_lib_stats(lib)
+    assert stats['lazy'] == stats['eager'] == stats['realized'] == 0
+    assert stats['total'] == 4
+    assert lib.f1(10) == 11
+    stats = _cffi_backend.get_lib_stats(lib)
+    assert stats['lazy'] == 1
+    assert stats['lazy_time'] >= 0.0
+    #
+    assert compiled_ffi.realize_lib(lib, ["f1", "FOO"]) == 1
+    assert compiled_ffi.realize_lib(lib, names=["f1", "FOO"]) == 0
+    assert compiled_ffi.realize_lib(lib) == 2
+    assert compiled_ffi.realize_lib(lib) == 0
+    stats = _cffi_backend.get_lib_stats(lib)
+    assert stats['lazy'] == 1
+    assert stats['eager'] == 3
+    assert stats['eager_time'] >= 0.0
+    assert stats['realized'] == 4
+    assert lib.f2(10) == 12 and lib.gvar == 5 and lib.FOO == 42
+    assert _cffi_backend.get_lib_stats(lib)['lazy'] == 1
+    #
+    py.test.raises(AttributeError, compiled_ffi.realize_lib, lib, ["nope"])
+    py.test.raises(TypeError, compiled_ffi.realize_lib, lib, [42])
+    py.test.raises(TypeError, compiled_ffi.realize_lib, lib, 42)
+    py.test.raises(TypeError, compiled_ffi.realize_lib, compiled_ffi)
+    py.test.raises(TypeError, _cffi_backend.get_lib_stats, compiled_ffi)
+
+def test_realize_lib_at_import():
+    import _cffi_backend
+    ffi = FFI()
+    ffi.cdef("int f1(int);\n#define FOO 42")
+    os.environ['CFFI_EAGER_LIB'] = '1'
+    try:
+        lib = verify(ffi, 'test_realize_lib_at_import', """
+            static int f1(int x) { return x + 1; }
+            #define FOO 42
+        """)
+    finally:
+        del os.environ['CFFI_EAGER_LIB']
+    stats = _cffi_backend.get_lib_stats(lib)
+    assert stats['eager'] == stats['realized'] == 2
+    assert lib.f1(10) == 11
+    assert _cffi_backend.get_lib_stats(lib)['lazy'] == 0
+
+def test_realize_lib_at_import_bad_constant():
+    import _cffi_backend
+    ffi = FFI()
+    ffi.cdef("int f1(int);\n#define FOO 42")
+    os.environ['CFFI_EAGER_LIB'] = '1'
+    try:
+        lib = verify(ffi, 'test_realize_lib_at_import_bad_constant', """
+            static int f1(int x) { return x + 1; }
+            #define FOO 43
+        """)
+    finally:
+        del os.environ['CFFI_EAGER_LIB']
+    # the import worked, and 'FOO' was left for later
+    stats = _cffi_backend.get_lib_stats(lib)
+    assert stats['eager'] == stats['realized'] == 1
+    assert lib.f1(10) == 11
+    py.test.raises(ffi.error, getattr, lib, "FOO")
+    # an explicit realize_lib() reports the error
+    compiled_ffi = sys.modules['_CFFI_test_realize_lib_at_import_bad_constant'
+                               ].ffi
+    py.test.raises(ffi.error, compiled_ffi.realize_lib, lib)
+    py.test.raises(ffi.error, compiled_ffi.realize_lib, lib, ["FOO"])
+
 def test_extern_python_bogus_name():
     ffi = FFI()
     ffi.cdef("int abc;")
@@ -2305,3 +2423,202 @@ def test_realize_struct_error():
         typedef int foo_t; struct foo_s { void (*x)(foo_t); };
     """)
     py.test.raises(TypeError, ffi.new, "struct foo_s *")
+
+def test_call_many():
+    ffi = FFI()
+    ffi.cdef("int add3(int, int, short); void nothing(void);")
+    lib = verify(ffi, "test_call_many", """
+        int add3(int a, int b, short c) { return a + b + c; }
+        void nothing(void) { }
+    """)
+    a = ffi.new("int[]", [1, 2, 3])
+    b = ffi.new("int[]", [10, 20, 30])
+    c = ffi.new("short[]", [100, 200, 300])
+    r = ffi.new("int[3]")
+    ffi.call_many(lib.add3, [a, b, c], r)
+    assert list(r) == [111, 222, 333]
+    ffi.call_many(ffi.addressof(lib, "add3"), [b, a, c], r, 1)
+    assert list(r) == [111, 222, 333]
+    ffi.call_many(lib.nothing, [], length=5)
+    py.test.raises(TypeError, ffi.call_many, lib.add3, [a, c, c], r)
+    py.test.raises(TypeError, ffi.call_many, len, [a], r)
+
+def test_unpack_field():
+    ffi = FFI()
+    ffi.cdef("""
+        struct vec_s { float x, y; };
+        struct particle_s { char tag; int id; struct vec_s pos;
+                            unsigned flags: 3; };
+    """)
+    verify(ffi, "test_unpack_field", """
+        struct vec_s { float x, y; };
+        struct particle_s { char tag; int id; struct vec_s pos;
+                            unsigned flags: 3; };
+    """)
+    p = ffi.new("struct particle_s[5]")
+    for i in range(5):
+        p[i].id = 100 + i
+        p[i].pos.y = i * 0.5
+        p[i].flags = i
+    ids = ffi.unpack_field(p, "id")
+    assert ffi.typeof(ids) is ffi.typeof("int[5]")
+    assert list(ids) == [100, 101, 102, 103, 104]
+    assert list(ffi.unpack_field(p, "pos.y", 3)) == [0.0, 0.5, 1.0]
+    flags = ffi.new("unsigned int[6]")
+    assert ffi.unpack_field(p, "flags", result=flags) is flags
+    assert list(flags) == [0, 1, 2, 3, 4, 0]
+
+def _get_meth_flags(builtin_func):
+    # read 'm_ml->ml_flags' of a CPython builtin function object
+    import ctypes
+    ptrsize = ctypes.sizeof(ctypes.c_void_p)
+    ml = ctypes.c_void_p.from_address(id(builtin_func) + 2 * ptrsize).value
+    return ctypes.c_int.from_address(ml + 2 * ptrsize).value
+
+def test_fastcall_wrappers():
+    METH_VARARGS, METH_FASTCALL = 0x0001, 0x0080
+    check_flags = ('__pypy__' not in sys.builtin_module_names and
+                   sys.version_info >= (3, 7))
+    all_macros = [
+        ([], False),      # the default Py_LIMITED_API: no fastcall
+        ([("_CFFI_NO_LIMITED_API", None)], True)]
+    if sys.version_info >= (3, 10):
+        all_macros.append(([("Py_LIMITED_API", "0x030a0000")], True))
+    for i, (define_macros, fastcall) in enumerate(all_macros):
+        ffi = FFI()
+        ffi.cdef("int add3(int, int, int); double sub2(double, double);")
+        lib = verify(ffi, "test_fastcall_wrappers_%d" % i, """
+            int add3(int a, int b, int c) { return a + b + c; }
+            double sub2(double a, double b) { return a - b; }
+        """, define_macros=define_macros)
+        if check_flags:
+            flags = _get_meth_flags(lib.add3)
+            if fastcall:
+                assert flags & METH_FASTCALL
+            else:
+                assert flags & METH_VARARGS
+                assert not (flags & METH_FASTCALL)
+        assert lib.add3(1, 20, 300) == 321
+        assert lib.sub2(5.5, 2.0) == 3.5
+        e = py.test.raises(TypeError, lib.add3, 1, 2)
+        assert str(e.value) == "add3 expected 3 arguments, got 2"
+        e = py.test.raises(TypeError, lib.sub2, 1, 2, 3)
+        assert str(e.value) == "sub2 expected 2 arguments, got 3"
+        py.test.raises(TypeError, lib.add3, 1, 2, "x")
+        assert ffi.addressof(lib, "add3")(4, 5, 6) == 15
+
+def test_fastcall_init_version():
+    # the module only requires the version of the backend that supports
+    # OP_CPYTHON_BLTN_F if it really contains METH_FASTCALL functions
+    if sys.version_info < (3,):
+        py.test.skip("only for Python 3")
+    import sysconfig
+    from cffi import ffiplatform
+    ffi = FFI()
+    ffi.cdef("int add(int, int);")
+    ffi.set_source("test_fastcall_init_version",
+                   "int add(int a, int b) { return a + b; }")
+    c_file = str(udir.join('test_fastcall_init_version.c'))
+    ffi.emit_c_code(c_file)
+    with open(c_file) as f:
+        source = f.read()
+    assert '#ifdef _CFFI_USE_FASTCALL' in source
+    #
+    try:
+        from distutils.ccompiler import new_compiler
+        from distutils.sysconfig import customize_compiler
+        compiler = new_compiler()
+        customize_compiler(compiler)
+    except Exception as e:
+        py.test.skip("no C compiler found: %s" % (e,))
+    def init_line(macros):
+        out_file = c_file + '.%d.i' % len(macros)
+        try:
+            compiler.preprocess(c_file, out_file, macros=macros,
+                include_dirs=[sysconfig.get_paths()['include'],
+                              os.path.dirname(ffiplatform.__file__)])
+        except Exception as e:
+            py.test.skip("cannot run the C preprocessor: %s" % (e,))
+        with open(out_file) as f:
+            lines = [line.strip() for line in f
+                     if '_cffi_init("test_fastcall_init_version"' in line]
+        return lines
+    lines = init_line([])
+    assert lines == ['return _cffi_init("test_fastcall_init_version", '
+                     '0x2601, &_cffi_type_context);']
+    if sys.version_info >= (3, 7) and '__pypy__' not in sys.builtin_module_names:
+        lines = init_line([("_CFFI_NO_LIMITED_API", None)])
+        assert lines == ['return _cffi_init("test_fastcall_init_version", '
+                         '0x2901, &_cffi_type_context);']
+
+def test_cdef_release_gil_false():
+    ffi = FFI()
+    ffi.cdef("int set_errno_released(int);")
+    ffi.cdef("int set_errno_kept(int);", release_gil=False)
+    assert ffi._parser._declarations['function set_errno_released'][1] == 0
+    assert (ffi._parser._declarations['function set_errno_kept'][1] ==
+            model.Q_KEEP_GIL)
+    lib = verify(ffi, "test_cdef_release_gil_false", """
+        #include <errno.h>
+        int set_errno_released(int x) { errno = x; return x + 1; }
+        int set_errno_kept(int x) { errno = x; return x + 1; }
+    """)
+    ffi.errno = 0
+    assert lib.set_errno_released(42) == 43
+    assert ffi.errno == 42
+    ffi.errno = 0
+    assert lib.set_errno_kept(43) == 44
+    assert ffi.errno == 0     # not saved
+    assert ffi.addressof(lib, "set_errno_kept")(44) == 45
+
+def test_native_callback():
+    if sys.platform == 'win32':
+        py.test.skip("uses pthreads")
+    ffi = FFI()
+    ffi.cdef("""
+        struct counter_s { long total; };
+        int add_to_counter(struct counter_s *, int);
+        int call_in_threads(int (*)(int), int);
+    """, release_gil=False)
+    lib = verify(ffi, "test_native_callback", """
+        #include <pthread.h>
+        struct counter_s { long total; };
+        static pthread_mutex_t lock = PTHREAD_MUTEX_INITIALIZER;
+        int add_to_counter(struct counter_s *c, int x) {
+            pthread_mutex_lock(&lock);
+            c->total += x;
+            pthread_mutex_unlock(&lock);
+            return x;
+        }
+        static int (*thread_cb)(int);
+        static void *thread_main(void *arg) {
+            int i;
+            for (i = 0; i < 1000; i++)
+                thread_cb(1);
+            return NULL;
+        }
+        int call_in_threads(int (*cb)(int), int nthreads) {
+            pthread_t th[8];
+            int i;
+            thread_cb = cb;
+            for (i = 0; i < nthreads; i++)
+                pthread_create(&th[i], NULL, thread_main, NULL);
+            for (i = 0; i < nthreads; i++)
+                pthread_join(th[i], NULL);
+            return nthreads;
+        }
+    """, extra_link_args=['-lpthread'])
+    counter = ffi.new("struct counter_s *")
+    cb = ffi.callback("int(int)", ffi.addressof(lib, "add_to_counter"),
+                      userdata=counter)
+    assert cb(5) == 5
+    assert counter.total == 5
+    # 'call_in_threads' holds the GIL (release_gil=False): the threads
+    # would deadlock if the callback tried to acquire it
+    assert lib.call_in_threads(cb, 8) == 8
+    assert counter.total == 8005
+    py.test.raises(TypeError, ffi.callback, "int(int)", lib.add_to_counter,
+                   userdata=counter)
+    py.test.raises(TypeError, ffi.callback, "int(int)",
+                   ffi.addressof(lib, "add_to_counter"), error=-1,
+                   userdata=counter)
@@ -29,7 +29,7 @@ class TestDist(object):
         if hasattr(self, 'saved_cwd'):
             os.chdir(self.saved_cwd)
 
-    def run(self, args, cwd=None):
+    def run(self, args, cwd=None, extra_env={}, expect_failure=False):
         env = os.environ.copy()
         # a horrible hack to prevent distutils from finding ~/.pydistutils.cfg
         # (there is the --no-user-cfg option, but not in Python 2.6...)
@@ -39,7 +39,15 @@ class TestDist(object):
             if 'PYTHONPATH' in env:
                 newpath += os.pathsep + env['PYTHONPATH']
             env['PYTHONPATH'] = newpath
-        subprocess.check_call([self.executable] + args, cwd=cwd, env=env)
+        env.update(extra_env)
+        if not expect_failure:
+            subprocess.check_call([self.executable] + args, cwd=cwd, env=env)
+            return
+        p = subprocess.Popen([self.executable] + args, cwd=cwd, env=env,
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        output = p.communicate()[0].decode('utf-8', 'replace')
+        assert p.returncode != 0
+        return output
 
     def _prepare_setuptools(self):
         if hasattr(TestDist, '_setuptools_ready'):
@@ -415,3 +423,65 @@ class TestDist(object):
                                    'src1': {'pack3': {'__init__.py': None,
                                                       '_build.py': None,
                                                       'mymod.SO': None}}})
+
+    def _make_setuptools_api_many(self, broken=()):
+        self._prepare_setuptools()
+        os.mkdir("src4")
+        os.mkdir(os.path.join("src4", "pack4"))
+        with open(os.path.join("src4", "pack4", "__init__.py"), "w") as f:
+            pass
+        specs = []
+        for i in range(4):
+            code = "int get%d(void) { return %d; }" % (i, i)
+            if i in broken:
+                code += "\n#error broken module %d" % (i,)
+            with open(os.path.join("src4", "pack4", "_build%d.py" % i),
+                      "w") as f:
+                f.write("""if 1:
+                    import cffi
+                    ffi = cffi.FFI()
+                    ffi.cdef("int get%d(void);")
+                    ffi.set_source("pack4.mod%d", %r)
+                """ % (i, i, code))
+            specs.append("src4/pack4/_build%d.py:ffi" % i)
+        with open("setup.py", "w") as f:
+            f.write("""if 1:
+                from setuptools import setup
+                setup(name='example4',
+                      version='0.1',
+                      packages=['pack4'],
+                      package_dir={'': 'src4'},
+                      cffi_modules=%r)
+            """ % (specs,))
+
+    @chdir_to_tmp
+    def test_setuptools_api_parallel(self):
+        self._make_setuptools_api_many()
+        self.run(["setup.py", "build_ext", "-i"],
+                 extra_env={'CFFI_BUILD_JOBS': '3'})
+        self.check_produced_files({'setup.py': None,
+                                   'build': '?',
+                                   'src4': {'pack4': {'__init__.py': None,
+                                                      '_build0.py': None,
+                                                      '_build1.py': None,
+                                                      '_build2.py': None,
+                                                      '_build3.py': None,
+                                                      'mod0.SO': None,
+                                                      'mod1.SO': None,
+                                                      'mod2.SO': None,
+                                                      'mod3.SO': None}}})
+
+    @chdir_to_tmp
+    def test_setuptools_api_parallel_errors(self):
+        self._make_setuptools_api_many(broken=(1, 3))
+        output = self.run(["setup.py", "build_ext", "-i"],
+                          extra_env={'CFFI_BUILD_JOBS': '4'},
+                          expect_failure=True)
+        assert "2 cffi module(s) failed to build" in output
+        assert "pack4.mod1: " in output
+        assert "pack4.mod3: " in output
+        assert "pack4.mod0: " not in output
+        # the compiler output is printed in the order of the modules
+        i1 = output.index("broken module 1")
+        i3 = output.index("broken module 3")
+        assert i1 < i3